@@ -0,0 +1,41 @@
+"""
+Buffered ingestion for Get Started activity events.
+
+/api/activity/log/ is unauthenticated and hit on every modal open, so events are
+queued in-process and written with bulk_create by a background BatchWriter
+instead of one INSERT per request. Set ACTIVITY_LOG_BUFFERED=0 to write
+synchronously (e.g. when debugging).
+"""
+from django.conf import settings
+
+from .batch_writer import BatchWriter
+from .models import GetStartedEvent
+
+BUFFERED = getattr(settings, 'ACTIVITY_LOG_BUFFERED', True)
+
+activity_writer = BatchWriter(
+    GetStartedEvent,
+    name='activity',
+    max_queue=getattr(settings, 'ACTIVITY_LOG_MAX_QUEUE', 10000),
+    batch_size=getattr(settings, 'ACTIVITY_LOG_BATCH_SIZE', 200),
+    flush_interval=getattr(settings, 'ACTIVITY_LOG_FLUSH_SECONDS', 2.0),
+)
+
+
+def log_event(event_type, role='', ip_address=None, user_agent=''):
+    """Record a Get Started event. Returns False if the buffer was full and the event dropped."""
+    event = GetStartedEvent(
+        event_type=event_type,
+        role=role,
+        ip_address=ip_address,
+        user_agent=user_agent[:500],
+    )
+    if not BUFFERED:
+        event.save()
+        return True
+    return activity_writer.put(event)
+
+
+def ingestion_stats():
+    """Buffer counters (enqueued, dropped, written, failed, queued) for the admin API."""
+    return activity_writer.stats()
@@ -9,6 +9,7 @@ from .models import (
     Loan,
     Repayment,
     ChatInteraction,
+    JobCheckpoint,
 )
 
 User = get_user_model()
@@ -65,4 +66,10 @@ class RepaymentAdmin(admin.ModelAdmin):
 
 @admin.register(ChatInteraction)
 class ChatInteractionAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'language', 'created_at')
+    list_display = ('id', 'user', 'language', 'model_latency_ms', 'translation_latency_ms', 'model_available', 'created_at')
+    list_filter = ('language', 'model_available', 'reply_cache_hit', 'translation_cache_hit')
+
+
+@admin.register(JobCheckpoint)
+class JobCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('name', 'position', 'updated_at')
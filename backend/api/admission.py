@@ -0,0 +1,214 @@
+"""
+Admission control for the expensive AllowAny endpoints (chat and ML scoring).
+
+`@admission_controlled(pool)` sits under @api_view (so request.user is resolved)
+and runs two checks before the view:
+
+1. Rate: a token bucket per client. Authenticated users are keyed by user id,
+   anonymous callers by client IP (get_client_ip). Users get their own, larger
+   bucket, so farmers behind one cooperative NAT do not share the anonymous
+   limit. An empty bucket answers 429 with Retry-After set to the time until
+   the next token.
+2. Concurrency: a cap on requests of the pool running at once (chat and scoring
+   are separate pools). The last `reserved` slots are kept for authenticated
+   farmers. When the pool is full, a farmer may wait up to
+   ADMISSION_PRIORITY_WAIT_MS for a slot; everyone else gets 503 at once, with
+   Retry-After estimated from recent service times. The rate token is refunded
+   on a 503.
+
+Rejections are immediate, so overload turns into fast 429/503s rather than a
+growing queue, and admitted requests keep their normal latency. Limits are per
+worker process. Pools are configured in settings.ADMISSION_POOLS and built on
+first use; ADMISSION_ENABLED=0 turns the layer off.
+"""
+import functools
+import math
+import threading
+import time
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import request_metrics
+from .authentication import resolve_role
+
+# Seed for the service-time estimate behind Retry-After on 503, before any request finished
+DEFAULT_SERVICE_SECONDS = 1.0
+_EWMA_WEIGHT = 0.2
+
+
+def get_client_ip(request):
+    """
+    Extract client IP from request. By default (NUM_PROXIES = 0) this is
+    REMOTE_ADDR and X-Forwarded-For is ignored, since any client can set it.
+    Behind n trusted reverse proxies (NUM_PROXIES = n), the address appended by
+    the outermost of them is used, so clients still cannot spoof it.
+    """
+    xff = request.META.get('HTTP_X_FORWARDED_FOR')
+    num_proxies = getattr(settings, 'NUM_PROXIES', 0) or 0
+    if xff and num_proxies > 0:
+        addrs = [a.strip() for a in xff.split(',')]
+        return addrs[-min(num_proxies, len(addrs))] or None
+    addr = request.META.get('REMOTE_ADDR')
+    return addr if addr else None
+
+
+class TokenBuckets:
+    """Token buckets keyed by client, refilled lazily; the oldest keys are dropped beyond max_keys."""
+
+    def __init__(self, rate, burst, max_keys):
+        self.rate = rate      # tokens per second
+        self.burst = burst    # bucket size
+        self.max_keys = max_keys
+        self._buckets = {}    # key -> [tokens, last refill (monotonic)]
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Take one token; returns 0 when allowed, else seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.pop(next(iter(self._buckets)))
+                bucket = self._buckets[key] = [float(self.burst), now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            return (1 - bucket[0]) / self.rate if self.rate > 0 else 60.0
+
+    def refund(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(self.burst, bucket[0] + 1)
+
+
+class ConcurrencyLimiter:
+    """At most `limit` holders; the last `reserved` slots only for priority callers, who may wait briefly."""
+
+    def __init__(self, limit, reserved, priority_wait):
+        self.limit = limit
+        self.reserved = min(reserved, limit)
+        self.priority_wait = priority_wait
+        self.in_flight = 0
+        self.service_seconds = DEFAULT_SERVICE_SECONDS
+        self._cond = threading.Condition()
+
+    def acquire(self, priority):
+        """Returns seconds waited, or None when rejected."""
+        with self._cond:
+            cap = self.limit if priority else self.limit - self.reserved
+            if self.in_flight < cap:
+                self.in_flight += 1
+                return 0.0
+            if not priority or self.priority_wait <= 0:
+                return None
+            started = time.monotonic()
+            deadline = started + self.priority_wait
+            while self.in_flight >= self.limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if self.in_flight >= self.limit:
+                        return None
+            self.in_flight += 1
+            return time.monotonic() - started
+
+    def release(self, held_seconds):
+        with self._cond:
+            self.in_flight -= 1
+            self.service_seconds += _EWMA_WEIGHT * (held_seconds - self.service_seconds)
+            self._cond.notify()
+
+    def retry_after(self):
+        """Rough seconds until a slot frees up: about one service time."""
+        return self.service_seconds
+
+
+class Pool:
+    def __init__(self, name, config, max_keys, priority_wait):
+        self.name = name
+        self.anon = TokenBuckets(config['anon_per_min'] / 60, config['anon_burst'], max_keys)
+        self.user = TokenBuckets(config['user_per_min'] / 60, config['user_burst'], max_keys)
+        self.limiter = ConcurrencyLimiter(config['concurrency'], config.get('reserved', 0), priority_wait)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name):
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = _pools[name] = Pool(
+                    name,
+                    settings.ADMISSION_POOLS[name],
+                    getattr(settings, 'ADMISSION_MAX_CLIENTS', 50000),
+                    getattr(settings, 'ADMISSION_PRIORITY_WAIT_MS', 500) / 1000,
+                )
+    return pool
+
+
+def load(pool_name):
+    """Fraction of the pool's concurrency in use (including the caller), 0 when admission is off."""
+    if not getattr(settings, 'ADMISSION_ENABLED', True):
+        return 0.0
+    limiter = get_pool(pool_name).limiter
+    return limiter.in_flight / limiter.limit if limiter.limit else 1.0
+
+
+def reset():
+    """Drop all buckets and limiters (settings changes, benchmarks)."""
+    with _pools_lock:
+        _pools.clear()
+
+
+def _reject(pool_name, reason, http_status, message, retry_after):
+    retry_after = max(1, math.ceil(retry_after))
+    request_metrics.registry.inc('admission_rejected_total', pool=pool_name, reason=reason)
+    response = Response({'error': message, 'retry_after': retry_after}, status=http_status)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def admission_controlled(pool_name):
+    """Rate-limit and cap concurrency of a view in the named pool (see module docstring)."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'ADMISSION_ENABLED', True):
+                return view(request, *args, **kwargs)
+            pool = get_pool(pool_name)
+            user = request.user
+            if user.is_authenticated:
+                buckets, key = pool.user, user.pk
+                priority = (getattr(request, 'role', None) or resolve_role(user)) == 'farmer'
+            else:
+                buckets, key = pool.anon, get_client_ip(request) or 'unknown'
+                priority = False
+
+            wait = buckets.take(key)
+            if wait:
+                return _reject(pool_name, 'rate', status.HTTP_429_TOO_MANY_REQUESTS,
+                               'Too many requests, slow down', wait)
+            waited = pool.limiter.acquire(priority)
+            if waited is None:
+                buckets.refund(key)
+                return _reject(pool_name, 'busy', status.HTTP_503_SERVICE_UNAVAILABLE,
+                               'Server busy, try again shortly', pool.limiter.retry_after())
+            if waited:
+                request_metrics.add('admission.wait', waited)
+            started = time.monotonic()
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                pool.limiter.release(time.monotonic() - started)
+        return wrapper
+    return decorator
@@ -0,0 +1,153 @@
+"""
+Admin dashboard analytics: role/status counts and time-bucketed trends.
+
+Counts come from one conditional-aggregation query per table. Trend series
+(applications, approvals, disbursed amounts, Get Started events) are rolled up
+per day or week and cached briefly, so a polling dashboard costs a constant,
+small number of queries.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncWeek
+from django.utils import timezone
+
+from .models import GetStartedEvent, Loan, LoanApplication, UserProfile
+
+BUCKETS = ('day', 'week')
+DEFAULT_BUCKET = 'day'
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+# Seconds the trend rollup stays cached between dashboard polls
+TRENDS_CACHE_SECONDS = getattr(settings, 'ADMIN_STATS_CACHE_SECONDS', 60)
+
+_CACHE_PREFIX = 'admin_stats:trends'
+
+
+def role_counts():
+    """Farmers, MFIs and admins in a single aggregate query."""
+    return UserProfile.objects.aggregate(
+        farmers=Count('id', filter=Q(role='farmer')),
+        microfinance=Count('id', filter=Q(role='microfinance')),
+        admins=Count('id', filter=Q(role='admin')),
+    )
+
+
+def application_status_counts():
+    """Pending, approved, rejected and total applications in a single aggregate query."""
+    return LoanApplication.objects.aggregate(
+        pending=Count('id', filter=Q(status='pending')),
+        approved=Count('id', filter=Q(status='approved')),
+        rejected=Count('id', filter=Q(status='rejected')),
+        total=Count('id'),
+    )
+
+
+def _trunc(bucket, field):
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+    if bucket == 'week':
+        return TruncWeek(field, tzinfo=tz)
+    return TruncDate(field, tzinfo=tz)
+
+
+def _bucket_start(day, bucket):
+    """Normalise a date to the start of its bucket (Monday for weeks, as TruncWeek does)."""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def _as_date(value):
+    # TruncWeek returns a datetime, TruncDate a date
+    return value.date() if hasattr(value, 'date') and callable(value.date) else value
+
+
+def _grouped(qs, bucket, field, **aggregates):
+    """Run one GROUP BY bucket query and return {bucket_date: {name: value}}."""
+    rows = (
+        qs.annotate(period=_trunc(bucket, field))
+        .values('period')
+        .annotate(**aggregates)
+        .order_by('period')
+    )
+    out = {}
+    for row in rows:
+        period = row.pop('period')
+        if period is not None:
+            out[_as_date(period)] = row
+    return out
+
+
+def _build_trends(bucket, days):
+    now = timezone.now()
+    since = now - timedelta(days=days)
+    applications = _grouped(
+        LoanApplication.objects.filter(created_at__gte=since),
+        bucket, 'created_at', n=Count('id'),
+    )
+    approvals = _grouped(
+        LoanApplication.objects.filter(status='approved', reviewed_at__gte=since),
+        bucket, 'reviewed_at', n=Count('id'),
+    )
+    disbursed = _grouped(
+        Loan.objects.annotate(disbursed_on=Coalesce('disbursed_at', 'created_at')).filter(disbursed_on__gte=since),
+        bucket, 'disbursed_on', amount=Sum('amount'), n=Count('id'),
+    )
+    get_started = _grouped(
+        GetStartedEvent.objects.filter(created_at__gte=since),
+        bucket, 'created_at', n=Count('id'),
+    )
+
+    # Fill empty buckets so charts get a continuous axis
+    local_today = timezone.localdate(now) if settings.USE_TZ else now.date()
+    step = timedelta(days=7 if bucket == 'week' else 1)
+    period = _bucket_start(local_today - timedelta(days=days), bucket)
+    end = _bucket_start(local_today, bucket)
+    series = []
+    while period <= end:
+        d = disbursed.get(period, {})
+        series.append({
+            'period': period.isoformat(),
+            'applications': applications.get(period, {}).get('n', 0),
+            'approvals': approvals.get(period, {}).get('n', 0),
+            'loans_disbursed': d.get('n', 0),
+            'amount_disbursed': float(d.get('amount') or 0),
+            'get_started_events': get_started.get(period, {}).get('n', 0),
+        })
+        period += step
+    return {
+        'bucket': bucket,
+        'days': days,
+        'generated_at': now.isoformat(),
+        'series': series,
+    }
+
+
+def trends(bucket=DEFAULT_BUCKET, days=DEFAULT_DAYS):
+    """Time-bucketed series for the admin dashboard, served from a short-lived cached rollup."""
+    if bucket not in BUCKETS:
+        bucket = DEFAULT_BUCKET
+    days = max(1, min(int(days), MAX_DAYS))
+    key = f'{_CACHE_PREFIX}:{bucket}:{days}'
+    data = cache.get(key)
+    if data is None:
+        data = _build_trends(bucket, days)
+        cache.set(key, data, TRENDS_CACHE_SECONDS)
+    return data
+
+
+def admin_stats(bucket=DEFAULT_BUCKET, days=DEFAULT_DAYS):
+    """Full payload for GET /api/admin/stats/."""
+    roles = role_counts()
+    apps = application_status_counts()
+    return {
+        'users': {
+            'farmers': roles['farmers'],
+            'microfinance': roles['microfinance'],
+            'admins': roles['admins'],
+        },
+        'applications': apps,
+        'trends': trends(bucket, days),
+    }
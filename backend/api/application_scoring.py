@@ -0,0 +1,102 @@
+"""
+Asynchronous scoring of submitted loan applications ('scoring' queue of api/job_queue.py).
+
+POST /api/farmer/applications/ saves the application with status 'scoring' and enqueues a
+job in the same transaction (SCORING_ASYNC=1). `manage.py runjobs` claims jobs in batches;
+score_jobs() runs all three models and the TreeSHAP explanation for the whole batch with
+one vectorized score_batch() call, writes the results with one UPDATE per row batch and
+moves the applications to 'pending', where MFIs review them.
+"""
+import logging
+
+from django.utils import timezone
+
+from . import job_queue, response_cache
+from .db_utils import bulk_update_rows
+from .explanations import eligibility_reason
+from .models import LoanApplication
+
+logger = logging.getLogger(__name__)
+
+QUEUE = 'scoring'
+UPDATE_FIELDS = ('eligibility_approved', 'eligibility_reason', 'risk_score', 'recommended_amount', 'status', 'updated_at')
+SCORING_FAILED_REASON = 'Automatic scoring failed; please review this application manually.'
+
+
+def enqueue(app):
+    """Queue scoring of a just-saved application (call inside the transaction that saved it)."""
+    return job_queue.enqueue(QUEUE, {'application_id': app.id})
+
+
+def score_applications(apps):
+    """Score applications in place with one vectorized call per model (sets AI fields, status 'pending')."""
+    from .ml_service import application_to_ml_payload, score_batch
+
+    payloads = [application_to_ml_payload(app) for app in apps]
+    scores = score_batch(payloads, explain=True)
+    now = timezone.now()
+    for app, payload, approved, risk, amount, factors in zip(
+        apps, payloads, scores['approved'], scores['risk_score'], scores['recommended_amount'], scores['factors'],
+    ):
+        approved = bool(approved)
+        app.eligibility_approved = approved
+        app.eligibility_reason = eligibility_reason(payload, approved, factors)
+        app.risk_score = float(risk)
+        app.recommended_amount = round(float(amount), 2) if approved else None
+        app.status = 'pending'
+        app.updated_at = now
+
+
+def score_jobs(jobs):
+    """Job handler: score the batch's applications and write them back; returns {job id: error}."""
+    by_app = {}
+    for job in jobs:
+        by_app.setdefault(job.payload.get('application_id'), []).append(job)
+    # Applications already scored (e.g. by a job whose claim expired mid-write) or deleted are skipped
+    apps = list(LoanApplication.objects.filter(id__in=[i for i in by_app if i is not None], status='scoring'))
+    errors = {job.id: 'job payload has no application_id' for job in by_app.pop(None, [])}
+    if not apps:
+        return errors
+
+    try:
+        score_applications(apps)
+        scored = apps
+    except FileNotFoundError:
+        raise  # models missing: the whole batch is retried later
+    except Exception:
+        # One bad payload should not hold back the rest: score one by one to find it
+        logger.exception("Batch scoring of %d applications failed; scoring individually", len(apps))
+        scored = []
+        for app in apps:
+            try:
+                score_applications([app])
+                scored.append(app)
+            except Exception as exc:
+                errors.update({job.id: f'{type(exc).__name__}: {exc}' for job in by_app[app.id]})
+
+    # Only applications still in 'scoring' are written: a worker whose claim expired must not move an
+    # application that another worker already scored (and an MFI may have reviewed) back to 'pending'
+    bulk_update_rows(LoanApplication, scored, UPDATE_FIELDS, where={'status': 'scoring'})
+    _invalidate(scored)
+    return errors
+
+
+def scoring_failed(jobs):
+    """Jobs out of attempts: hand the applications to MFI review unscored rather than leave them in 'scoring'."""
+    apps = list(LoanApplication.objects.filter(id__in=[job.payload.get('application_id') for job in jobs],
+                                               status='scoring'))
+    now = timezone.now()
+    for app in apps:
+        app.eligibility_reason = SCORING_FAILED_REASON
+        app.status = 'pending'
+        app.updated_at = now
+    bulk_update_rows(LoanApplication, apps, ('eligibility_reason', 'status', 'updated_at'), where={'status': 'scoring'})
+    _invalidate(apps)
+
+
+def _invalidate(apps):
+    # bulk updates bypass the signals that expire cached dashboards
+    for user_id in {app.user_id for app in apps}:
+        response_cache.invalidate_user(user_id)
+    if apps:
+        response_cache.invalidate_global()
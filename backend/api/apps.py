@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from config.database import apply_sqlite_pragmas
+
+        from . import signals  # noqa: F401
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='api.apply_sqlite_pragmas')
@@ -0,0 +1,171 @@
+"""
+Token authentication that resolves user, profile and role in one query.
+
+DRF's TokenAuthentication loads token + user, then every dashboard view touches
+user.agrifin_profile (role) and often user.farmer_profile, each a separate
+query. CachedTokenAuthentication loads all of them with one joined query and
+keeps the resolved identity in a short-TTL per-process cache. The cache holds
+field values only; every request gets its own fresh User, Token and profile
+instances, so a view that modifies them never leaks into concurrent requests.
+Entries are invalidated by signals (api/signals.py) when a token is deleted or
+a user's role/profile changes; the TTL bounds staleness across worker processes.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .models import FarmerProfile, UserProfile
+
+CACHE_TTL_SECONDS = getattr(settings, 'AUTH_CACHE_TTL_SECONDS', 30)
+CACHE_MAX_ENTRIES = getattr(settings, 'AUTH_CACHE_MAX_ENTRIES', 10000)
+
+_cache = {}  # token key -> (expires_at, user_id, snapshot, role)
+_by_user = {}  # user id -> token keys in _cache
+_lock = threading.Lock()
+
+# Reverse one-to-one relations loaded with the user and restored on cache hits
+_PROFILE_RELATIONS = (('agrifin_profile', UserProfile), ('farmer_profile', FarmerProfile))
+
+
+def resolve_role(user):
+    """Return role: from UserProfile, or 'admin' if staff/superuser."""
+    cached = getattr(user, '_agrifin_role', None)
+    if cached is not None:
+        return cached
+    try:
+        return user.agrifin_profile.role
+    except UserProfile.DoesNotExist:
+        return 'admin' if (user.is_staff or user.is_superuser) else 'farmer'
+
+
+def invalidate_token(key):
+    with _lock:
+        _pop(key)
+
+
+def invalidate_user(user_id):
+    with _lock:
+        for key in list(_by_user.get(user_id, ())):
+            _pop(key)
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        _by_user.clear()
+
+
+def _pop(key):
+    """Remove one entry and its user index; caller holds _lock."""
+    entry = _cache.pop(key, None)
+    if entry is None:
+        return
+    keys = _by_user.get(entry[1])
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del _by_user[entry[1]]
+
+
+def _values(instance):
+    return tuple(getattr(instance, f.attname) for f in instance._meta.concrete_fields)
+
+
+def _from_values(model, db, values):
+    return model.from_db(db, [f.attname for f in model._meta.concrete_fields], values)
+
+
+def _snapshot(user, token):
+    """Field values of token, user and loaded profiles; no model instances are kept."""
+    profiles = []
+    for name, model in _PROFILE_RELATIONS:
+        try:
+            profile = getattr(user, name)
+        except model.DoesNotExist:
+            profile = None
+        profiles.append(None if profile is None else _values(profile))
+    return token._state.db, _values(token), _values(user), tuple(profiles)
+
+
+def _restore(snapshot, token_model, user_model):
+    """Fresh token/user/profile instances from a snapshot, wired up as select_related would."""
+    db, token_values, user_values, profiles = snapshot
+    user = _from_values(user_model, db, user_values)
+    for (name, model), values in zip(_PROFILE_RELATIONS, profiles):
+        relation = getattr(user_model, name).related
+        profile = None if values is None else _from_values(model, db, values)
+        relation.set_cached_value(user, profile)
+        if profile is not None:
+            relation.field.set_cached_value(profile, user)
+    token = _from_values(token_model, db, token_values)
+    token_model.user.field.set_cached_value(token, user)
+    return user, token
+
+
+def _cache_get(key):
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        with _lock:
+            _pop(key)
+        return None
+    return entry
+
+
+def _cache_put(key, user, token, role):
+    snapshot = _snapshot(user, token)
+    with _lock:
+        if len(_cache) >= CACHE_MAX_ENTRIES:
+            # Drop expired entries first, then the oldest if still full
+            now = time.monotonic()
+            for k in [k for k, e in _cache.items() if e[0] < now]:
+                _pop(k)
+            if len(_cache) >= CACHE_MAX_ENTRIES:
+                _pop(next(iter(_cache)))
+        _pop(key)
+        _cache[key] = (time.monotonic() + CACHE_TTL_SECONDS, user.pk, snapshot, role)
+        _by_user.setdefault(user.pk, set()).add(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication with a joined user/profile lookup, a local TTL cache and `request.role`."""
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            role = resolve_role(result[0])
+            request.role = role
+            # Also visible on the underlying HttpRequest (middleware, logging)
+            request._request.role = role
+        return result
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        entry = _cache_get(key)
+        if entry is not None:
+            user, token = _restore(entry[2], model, model.user.field.related_model)
+            user._agrifin_role = entry[3]
+            return user, token
+
+        try:
+            token = model.objects.select_related(
+                'user',
+                'user__agrifin_profile',
+                'user__farmer_profile',
+            ).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        user = token.user
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        role = resolve_role(user)
+        user._agrifin_role = role
+        _cache_put(key, user, token, role)
+        return user, token
@@ -0,0 +1,155 @@
+"""
+Background batched writer for fire-and-forget model inserts.
+
+Request handlers append unsaved model instances to a bounded in-process queue
+and return immediately. A daemon thread flushes the queue with bulk_create
+when it reaches `batch_size` rows or every `flush_interval` seconds, whichever
+comes first, and once more at interpreter shutdown. When the queue is full new
+rows are dropped and counted rather than blocking the request.
+
+Note: auto_now_add fields are stamped at flush time, so timestamps may lag the
+originating request by up to `flush_interval` seconds.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """Queue model instances and bulk_create them from a background thread."""
+
+    def __init__(self, model, name=None, max_queue=10000, batch_size=200, flush_interval=2.0):
+        self.model = model
+        self.name = name or model._meta.label_lower
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+        self._counters = {
+            'enqueued': 0,
+            'dropped': 0,
+            'written': 0,
+            'failed': 0,
+            'flushes': 0,
+        }
+        self._last_flush_at = None
+        self._last_error = None
+
+    # ----- producer side -----
+
+    def put(self, obj):
+        """Enqueue an unsaved instance. Returns False (and counts a drop) if the buffer is full."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(obj)
+        except queue.Full:
+            self._incr('dropped')
+            return False
+        self._incr('enqueued')
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    # ----- consumer side -----
+
+    def flush(self):
+        """Drain the queue into the database. Returns number of rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                written += self._write(batch)
+        return written
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            close_old_connections()
+            with transaction.atomic():
+                self.model.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception as exc:
+            self._incr('failed', len(batch))
+            self._last_error = f"{type(exc).__name__}: {exc}"
+            logger.exception("%s: failed to write %d buffered rows", self.name, len(batch))
+            return 0
+        self._incr('written', len(batch))
+        self._incr('flushes')
+        self._last_flush_at = time.time()
+        return len(batch)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:  # pragma: no cover - never let the flusher die
+                logger.exception("%s: flush loop error", self.name)
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+                return
+            # Threads do not survive fork (e.g. gunicorn preload); start one per process.
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name=f'batch-writer:{self.name}', daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+
+    def shutdown(self):
+        """Flush whatever is still buffered. Registered with atexit for worker shutdown."""
+        try:
+            n = self.flush()
+            if n:
+                logger.info("%s: flushed %d buffered rows on shutdown", self.name, n)
+        except Exception:  # pragma: no cover - interpreter is going away
+            logger.exception("%s: flush on shutdown failed", self.name)
+
+    # ----- metrics -----
+
+    def _incr(self, key, n=1):
+        with self._lock:
+            self._counters[key] += n
+
+    def stats(self):
+        """Counters and queue depth for admin visibility."""
+        with self._lock:
+            data = dict(self._counters)
+        data.update({
+            'name': self.name,
+            'queued': self._queue.qsize(),
+            'max_queue': self.max_queue,
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval,
+            'last_flush_at': self._last_flush_at,
+            'last_error': self._last_error,
+        })
+        return data
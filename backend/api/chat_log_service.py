@@ -0,0 +1,50 @@
+"""
+Asynchronous persistence of ChatInteraction records.
+
+The chat view already spends seconds in translation and T5 generation, so
+interactions are handed to a background BatchWriter instead of adding an
+INSERT to the response path. Set CHAT_LOG_ENABLED=0 to disable logging.
+"""
+from django.conf import settings
+
+from .batch_writer import BatchWriter
+from .models import ChatInteraction
+
+ENABLED = getattr(settings, 'CHAT_LOG_ENABLED', True)
+
+chat_writer = BatchWriter(
+    ChatInteraction,
+    name='chat',
+    max_queue=getattr(settings, 'CHAT_LOG_MAX_QUEUE', 5000),
+    batch_size=getattr(settings, 'CHAT_LOG_BATCH_SIZE', 100),
+    flush_interval=getattr(settings, 'CHAT_LOG_FLUSH_SECONDS', 5.0),
+)
+
+
+def log_interaction(
+    message,
+    reply,
+    language='en',
+    user=None,
+    model_latency_ms=None,
+    translation_latency_ms=None,
+    model_available=True,
+    reply_cache_hit=False,
+    translation_cache_hit=False,
+):
+    """Queue a chat interaction for batched insert. Returns False if disabled or dropped."""
+    if not ENABLED:
+        return False
+    if user is not None and not getattr(user, 'is_authenticated', False):
+        user = None
+    return chat_writer.put(ChatInteraction(
+        user=user,
+        message=message,
+        reply=reply or '',
+        language=(language or 'en')[:5],
+        model_latency_ms=model_latency_ms,
+        translation_latency_ms=translation_latency_ms,
+        model_available=model_available,
+        reply_cache_hit=reply_cache_hit,
+        translation_cache_hit=translation_cache_hit,
+    ))
@@ -1,12 +1,38 @@
 """
 Load the saved T5 chatbot model (saved-model/) and generate replies.
 Model is from Financial_LLM_Chatbot.ipynb (Flan-T5-small fine-tuned on Bitext mortgage/loans).
+
+Decoding is chosen per request from DECODING_PROFILES, ordered from most to least expensive:
+- beam: 3 beams, stops when all beams finished; deterministic.
+- greedy: one hypothesis; deterministic.
+- sample: temperature sampling (the original behaviour); varies between calls.
+- short: greedy, stops at the first sentence end after MIN_SHORT_TOKENS tokens; the cheapest,
+  used when the server is under pressure.
+
+decode_reply() also takes a DecodeBudget: a token cap and a wall-clock deadline. TF generate
+cannot be interrupted mid-decode, so the deadline is enforced up front. A per-profile moving
+average of seconds per generated token converts the remaining time into a token cap, and when
+not even MIN_BUDGET_TOKENS fit, decoding falls back to a cheaper profile. Replies cut off by a
+token cap are trimmed back to their last complete sentence. Deterministic profiles are served
+from a small LRU reply cache (CHAT_REPLY_CACHE_SIZE).
+
+With CHAT_GENERATION_MODE='xla', generate runs as an XLA-compiled tf.function. Each distinct
+input shape and token cap needs its own graph, so inputs are padded to CHAT_INPUT_BUCKETS and
+caps rounded down to CHAT_XLA_TOKEN_BUCKETS. Inputs are tokenized through api/tokenization.py
+(memoized ids, reusable padded buffers). start_warmup() compiles the graphs the chat view
+uses in a background thread when the server starts; requests that need a graph the warm-up has
+not reached yet run eagerly.
 """
+import collections
 import logging
+import threading
+import time
 from pathlib import Path
 
 from django.conf import settings
 
+from . import request_metrics
+
 logger = logging.getLogger(__name__)
 
 # Saved model dir: project root / saved-model (same as notebook output). Resolved to absolute path.
@@ -20,6 +46,60 @@ MAX_INPUT_LENGTH = 256
 DEFAULT_MAX_NEW_TOKENS = 128
 DEFAULT_TEMPERATURE = 0.7
 
+# generate() arguments per profile; 'max_new_tokens' caps the profile below DEFAULT_MAX_NEW_TOKENS
+DECODING_PROFILES = {
+    'beam': {'deterministic': True, 'generate': {'num_beams': 3, 'do_sample': False, 'early_stopping': True}},
+    'greedy': {'deterministic': True, 'generate': {'num_beams': 1, 'do_sample': False}},
+    'sample': {'deterministic': False, 'generate': {'do_sample': True, 'temperature': DEFAULT_TEMPERATURE}},
+    'short': {'deterministic': True, 'generate': {'num_beams': 1, 'do_sample': False}, 'max_new_tokens': 48,
+              'stop_at_sentence_end': True},
+}
+DEFAULT_PROFILE = getattr(settings, 'CHAT_DECODING_PROFILE', 'greedy')
+BY_LANGUAGE = getattr(settings, 'CHAT_DECODING_BY_LANGUAGE', {})
+# Share of the chat pool's concurrency in use from which choose_profile() picks a cheaper profile
+DEGRADE_LOAD = getattr(settings, 'CHAT_DEGRADE_LOAD', 0.75)
+# Cheaper profile to fall back to when the budget is too tight
+DEGRADE_TO = {'beam': 'greedy', 'greedy': 'short', 'sample': 'short', 'short': None}
+MIN_SHORT_TOKENS = 12
+MIN_BUDGET_TOKENS = 8
+SENTENCE_END = '.!?'
+# Seconds per generated token assumed before the first measurement (flan-t5-small on CPU), per beam
+INITIAL_TOKEN_SECONDS = getattr(settings, 'CHAT_TOKEN_SECONDS_ESTIMATE', 0.02)
+REPLY_CACHE_SIZE = getattr(settings, 'CHAT_REPLY_CACHE_SIZE', 1024)
+_EWMA_WEIGHT = 0.2
+
+# 'eager' calls model.generate as is; 'xla' runs it as one jit-compiled tf.function, with inputs padded
+# up to an input bucket and token caps rounded down to a token bucket so only a few graphs get traced
+GENERATION_MODE = getattr(settings, 'CHAT_GENERATION_MODE', 'eager')
+INPUT_BUCKETS = tuple(sorted({b for b in getattr(settings, 'CHAT_INPUT_BUCKETS', ()) if b < MAX_INPUT_LENGTH} | {MAX_INPUT_LENGTH}))
+TOKEN_BUCKETS = tuple(sorted(getattr(settings, 'CHAT_XLA_TOKEN_BUCKETS', (16, 48, DEFAULT_MAX_NEW_TOKENS))))
+
+
+class DecodeBudget:
+    """Token cap and absolute wall-clock deadline (time.monotonic()) for one reply; None = unlimited."""
+
+    def __init__(self, max_new_tokens=None, deadline=None):
+        self.max_new_tokens = max_new_tokens
+        self.deadline = deadline
+
+    @classmethod
+    def from_now(cls, max_new_tokens=None, seconds=None):
+        return cls(max_new_tokens, time.monotonic() + seconds if seconds is not None else None)
+
+
+ChatReply = collections.namedtuple('ChatReply', 'text profile tokens stopped cache_hit')
+ChatReply.__doc__ = "Generated reply; stopped is 'eos', 'sentence' or 'budget'."
+
+_token_seconds = {}   # profile -> moving average of seconds per generated token
+_reply_cache = collections.OrderedDict()
+_reply_cache_lock = threading.Lock()
+_sentence_end_ids = None
+_encoder = None
+_xla = {'model': None, 'generate': None}
+_compiled = set()     # (profile, input bucket, max_new_tokens, temperature) keys already traced
+_compile_lock = threading.Lock()
+_warmup_thread = None
+
 _tokenizer = None
 _model = None
 _load_error = None
@@ -52,8 +132,9 @@ def _load_chatbot():
             # Some 4.x versions expose TF T5 only from the submodule
             from transformers.models.t5.modeling_tf_t5 import TFT5ForConditionalGeneration
         tokenizer_path = str(CHATBOT_MODEL_DIR)
-        _tokenizer = T5TokenizerFast.from_pretrained(tokenizer_path)
-        _model = TFT5ForConditionalGeneration.from_pretrained(tokenizer_path)
+        with request_metrics.stage('t5.load'):
+            _tokenizer = T5TokenizerFast.from_pretrained(tokenizer_path)
+            _model = TFT5ForConditionalGeneration.from_pretrained(tokenizer_path)
         logger.info("Chatbot model loaded from %s", tokenizer_path)
         return True
     except Exception as e:
@@ -62,44 +143,281 @@ def _load_chatbot():
         return False
 
 
-def generate_reply(message, language='en', max_new_tokens=None, temperature=None):
+def generate_reply(message, language='en', max_new_tokens=None, temperature=None, profile=None, budget=None):
     """
-    Generate a chatbot reply using the saved T5 model.
+    Generate a chatbot reply using the saved T5 model; returns the text or None.
     NOTE: The core model is trained primarily on English; callers that
     need other languages should translate externally (see translation_service).
     The `language` argument is accepted for backwards compatibility but
     is currently not used to change generation behaviour.
+    An explicit `temperature` selects sampling (or greedy for 0), as before profiles existed.
+    """
+    if profile is None and temperature is not None:
+        profile = 'sample' if temperature > 0 else 'greedy'
+    if max_new_tokens is not None:
+        budget = DecodeBudget(max_new_tokens, budget.deadline if budget else None)
+    result = decode_reply(message, profile=profile, budget=budget, temperature=temperature)
+    return result.text if result else None
+
+
+def decode_reply(message, profile=None, budget=None, temperature=None):
+    """
+    Generate a reply with a decoding profile (default CHAT_DECODING_PROFILE) within `budget`.
+    Returns a ChatReply, or None when the model is unavailable or generation failed.
     """
     if not message or not str(message).strip():
         return None
     if not _load_chatbot():
         return None
-    max_new_tokens = max_new_tokens if max_new_tokens is not None else DEFAULT_MAX_NEW_TOKENS
-    temperature = temperature if temperature is not None else DEFAULT_TEMPERATURE
+    profile = profile if profile in DECODING_PROFILES else DEFAULT_PROFILE
+    budget = budget or DecodeBudget()
+    profile, max_new_tokens = _fit_budget(profile, budget)
+    if GENERATION_MODE == 'xla':
+        max_new_tokens = _token_bucket(max_new_tokens)
+    spec = DECODING_PROFILES[profile]
+    input_text = INPUT_PREFIX + str(message).strip()
+
+    cache_key = (profile, max_new_tokens, input_text)
+    if spec['deterministic'] and REPLY_CACHE_SIZE > 0:
+        with _reply_cache_lock:
+            cached = _reply_cache.get(cache_key)
+            if cached is not None:
+                _reply_cache.move_to_end(cache_key)
+                return cached._replace(cache_hit=True)
 
     try:
-        import tensorflow as tf
-
-        input_text = INPUT_PREFIX + str(message).strip()
-        inputs = _tokenizer(
-            [input_text],
-            return_tensors='tf',
-            padding=True,
-            truncation=True,
-            max_length=MAX_INPUT_LENGTH,
-        )
-        outputs = _model.generate(
+        with request_metrics.stage('t5.tokenize'):
+            batch, = _get_encoder().batch([input_text], pad_to_bucket=GENERATION_MODE == 'xla')
+        token_ids = _generate(profile, batch.input_ids, batch.attention_mask, max_new_tokens, temperature)
+        with request_metrics.stage('t5.decode'):
+            reply = _tokenizer.decode(token_ids, skip_special_tokens=True)
+    except Exception:
+        logger.exception("Chatbot generation failed")
+        return None
+
+    reply = reply.strip() if reply else ''
+    if token_ids and token_ids[-1] == _tokenizer.eos_token_id:
+        stopped = 'eos'
+    elif spec.get('stop_at_sentence_end') and reply and reply[-1] in SENTENCE_END:
+        stopped = 'sentence'
+    else:
+        stopped = 'budget'
+        reply = _trim_to_sentence(reply)
+    if not reply:
+        return None
+    result = ChatReply(reply, profile, len(token_ids), stopped, False)
+    if spec['deterministic'] and REPLY_CACHE_SIZE > 0:
+        with _reply_cache_lock:
+            _reply_cache[cache_key] = result
+            while len(_reply_cache) > REPLY_CACHE_SIZE:
+                _reply_cache.popitem(last=False)
+    return result
+
+
+def _get_encoder():
+    """TokenEncoder for the loaded tokenizer (rebuilt when the tokenizer is swapped, e.g. by benchmarks)."""
+    global _encoder
+    if _encoder is None or _encoder.tokenizer is not _tokenizer:
+        from .tokenization import TokenEncoder
+        _encoder = TokenEncoder(_tokenizer, 't5', MAX_INPUT_LENGTH, buckets=INPUT_BUCKETS, dtype='int32')
+    return _encoder
+
+
+def _generate(profile, input_ids, attention_mask, max_new_tokens, temperature=None):
+    """Run generate() on one padded input (1 x length arrays) with the profile's settings; returns the generated ids without padding."""
+    import tensorflow as tf
+
+    spec = DECODING_PROFILES[profile]
+    generate_kwargs = dict(spec['generate'])
+    if temperature is not None and profile == 'sample':
+        generate_kwargs['temperature'] = temperature
+    if spec.get('stop_at_sentence_end'):
+        generate_kwargs['eos_token_id'] = [_tokenizer.eos_token_id] + _sentence_end_token_ids()
+        generate_kwargs['min_length'] = MIN_SHORT_TOKENS
+
+    generate, compiling = _model.generate, False
+    if GENERATION_MODE == 'xla':
+        key = (profile, input_ids.shape[1], max_new_tokens, generate_kwargs.get('temperature'))
+        generate, compiling = _compiled_generate(key)
+    inputs = {'input_ids': tf.constant(input_ids), 'attention_mask': tf.constant(attention_mask)}
+    if generate == _model.generate:
+        # Eager only: a compiled graph takes tensors, and encoding inside it is cheap
+        from .encoder_cache import cache
+
+        def encode():
+            with request_metrics.stage('t5.encode'):
+                return _model.get_encoder()(**inputs, return_dict=True)
+        inputs['encoder_outputs'], _ = cache.get_or_encode('t5', _model, input_ids, encode)
+    started = time.monotonic()
+    # A graph's first call traces and compiles it; timed apart so it does not skew t5.generate or the budget estimate
+    with request_metrics.stage('t5.compile' if compiling else 't5.generate'):
+        outputs = generate(
             **inputs,
             max_new_tokens=max_new_tokens,
-            temperature=temperature,
-            do_sample=temperature > 0,
             pad_token_id=_tokenizer.pad_token_id,
+            **generate_kwargs,
         )
-        reply = _tokenizer.batch_decode(outputs, skip_special_tokens=True)[0]
-        return reply.strip() if reply else None
+    elapsed = time.monotonic() - started
+    token_ids = [int(t) for t in outputs[0].numpy()[1:] if int(t) != _tokenizer.pad_token_id]
+    if not compiling:
+        _observe_token_seconds(profile, elapsed, len(token_ids))
+    return token_ids
+
+
+def _compiled_generate(key):
+    """
+    (generate function, whether this call compiles `key`) in 'xla' mode. Until the startup warm-up
+    has finished, keys it has not compiled yet run eagerly rather than compiling on the request path.
+    """
+    with _compile_lock:
+        if _xla['model'] is not _model:
+            import tensorflow as tf
+            _xla['model'], _xla['generate'] = _model, tf.function(_model.generate, jit_compile=True)
+            _compiled.clear()
+        if key in _compiled:
+            return _xla['generate'], False
+        if is_warming_up() and threading.current_thread() is not _warmup_thread:
+            return _model.generate, False
+        _compiled.add(key)
+        return _xla['generate'], True
 
+
+def _token_bucket(max_new_tokens):
+    """Largest token bucket within the cap (the smallest bucket if none fits)."""
+    fits = [b for b in TOKEN_BUCKETS if b <= max_new_tokens]
+    return fits[-1] if fits else TOKEN_BUCKETS[0]
+
+
+def warmup_profiles():
+    """Profiles the chat view picks without a client override: the configured ones and those they degrade to."""
+    profiles = []
+    for profile in (DEFAULT_PROFILE, *BY_LANGUAGE.values()):
+        while profile in DECODING_PROFILES and profile not in profiles:
+            profiles.append(profile)
+            profile = DEGRADE_TO[profile]
+    return profiles
+
+
+def warm_up(profiles=None):
+    """
+    Compile the XLA generation graph of each profile (default warmup_profiles()) for every input
+    bucket and every token bucket up to the profile's cap. Returns {(profile, input bucket, tokens): seconds};
+    empty in 'eager' mode or without a model.
+    """
+    if GENERATION_MODE != 'xla' or not _load_chatbot():
+        return {}
+    import numpy as np
+
+    timings = {}
+    for profile in profiles or warmup_profiles():
+        cap = DECODING_PROFILES[profile].get('max_new_tokens', DEFAULT_MAX_NEW_TOKENS)
+        for tokens in sorted({b for b in TOKEN_BUCKETS if b <= cap} | {_token_bucket(cap)}):
+            for length in INPUT_BUCKETS:
+                started = time.monotonic()
+                input_ids = np.full((1, length), _tokenizer.eos_token_id, dtype='int32')
+                _generate(profile, input_ids, np.ones_like(input_ids), tokens)
+                timings[(profile, length, tokens)] = time.monotonic() - started
+    return timings
+
+
+def start_warmup():
+    """Run warm_up() in a background thread (called when the WSGI/ASGI application starts)."""
+    global _warmup_thread
+    if GENERATION_MODE != 'xla' or not getattr(settings, 'CHAT_XLA_WARMUP', True) or _warmup_thread is not None:
+        return
+    _warmup_thread = threading.Thread(target=_run_warmup, name='chatbot-xla-warmup', daemon=True)
+    _warmup_thread.start()
+
+
+def is_warming_up():
+    return _warmup_thread is not None and _warmup_thread.is_alive()
+
+
+def _run_warmup():
+    started = time.monotonic()
+    try:
+        compiled = warm_up()
     except Exception:
-        return None
+        logger.exception("Chatbot XLA warm-up failed")
+        return
+    logger.info("Compiled %d chatbot generation graphs in %.1fs", len(compiled), time.monotonic() - started)
+
+
+def choose_profile(language='en', requested=None, load=0.0):
+    """
+    Decoding profile for a chat request: the client's choice, else CHAT_DECODING_BY_LANGUAGE,
+    else CHAT_DECODING_PROFILE; one step cheaper past CHAT_DEGRADE_LOAD, 'short' at full load.
+    """
+    profile = requested or BY_LANGUAGE.get(language) or DEFAULT_PROFILE
+    if profile not in DECODING_PROFILES:
+        profile = 'greedy'
+    if load >= 1:
+        return 'short'
+    if load >= DEGRADE_LOAD:
+        return cheaper_profile(profile)
+    return profile
+
+
+def cheaper_profile(profile, steps=1):
+    """The profile `steps` rungs down the degradation ladder (never below the cheapest)."""
+    for _ in range(steps):
+        cheaper = DEGRADE_TO.get(profile)
+        if cheaper is None:
+            break
+        profile = cheaper
+    return profile
+
+
+def _fit_budget(profile, budget):
+    """(profile, max_new_tokens) that fits the budget, degrading the profile when time is short."""
+    while True:
+        spec = DECODING_PROFILES[profile]
+        cap = spec.get('max_new_tokens', DEFAULT_MAX_NEW_TOKENS)
+        if budget.max_new_tokens is not None:
+            cap = min(cap, budget.max_new_tokens)
+        if budget.deadline is not None:
+            remaining = budget.deadline - time.monotonic()
+            cap = min(cap, int(remaining / _estimated_token_seconds(profile)))
+        cheaper = DEGRADE_TO.get(profile)
+        if cap >= MIN_BUDGET_TOKENS or cheaper is None:
+            return profile, max(cap, MIN_BUDGET_TOKENS)
+        profile = cheaper
+
+
+def _estimated_token_seconds(profile):
+    estimate = _token_seconds.get(profile)
+    if estimate is None:
+        beams = DECODING_PROFILES[profile]['generate'].get('num_beams', 1)
+        estimate = INITIAL_TOKEN_SECONDS * beams
+    return estimate
+
+
+def _observe_token_seconds(profile, elapsed, tokens):
+    if tokens:
+        previous = _estimated_token_seconds(profile)
+        _token_seconds[profile] = previous + _EWMA_WEIGHT * (elapsed / tokens - previous)
+
+
+def _sentence_end_token_ids():
+    """Vocabulary ids of sentence-final punctuation (with and without the word-start marker)."""
+    global _sentence_end_ids
+    if _sentence_end_ids is None:
+        ids = _tokenizer.convert_tokens_to_ids([p for c in SENTENCE_END for p in (c, '\u2581' + c)])
+        _sentence_end_ids = sorted({i for i in ids if i is not None and i != _tokenizer.unk_token_id})
+    return _sentence_end_ids
+
+
+def _trim_to_sentence(text):
+    """Drop a trailing partial sentence, unless that would remove more than half the reply."""
+    cut = max(text.rfind(c) for c in SENTENCE_END)
+    if cut >= len(text) // 2:
+        return text[:cut + 1]
+    return text
+
+
+def clear_reply_cache():
+    with _reply_cache_lock:
+        _reply_cache.clear()
 
 
 def is_available():
@@ -0,0 +1,94 @@
+"""
+Database helpers for bulk jobs.
+"""
+from django.db import connection, transaction
+
+
+def bulk_update_rows(model, rows, fields, where=None):
+    """
+    Write `fields` of each row (model instance or any object with matching
+    attributes and `id`) with one parameterised UPDATE run via executemany,
+    inside a transaction. `where` ({field: value}) adds conditions: rows that
+    no longer match them in the database are left unchanged.
+
+    QuerySet.bulk_update builds a CASE expression per field whose cost grows
+    with batch size squared on SQLite; executemany stays linear.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    meta = model._meta
+    qn = connection.ops.quote_name
+    model_fields = [meta.get_field(name) for name in fields]
+    assignments = ', '.join(f'{qn(f.column)} = %s' for f in model_fields)
+    where_fields = [meta.get_field(name) for name in (where or {})]
+    conditions = ''.join(f' AND {qn(f.column)} = %s' for f in where_fields)
+    where_params = [f.get_db_prep_save(where[f.name], connection) for f in where_fields]
+    sql = f'UPDATE {qn(meta.db_table)} SET {assignments} WHERE {qn(meta.pk.column)} = %s{conditions}'
+    params = [
+        [f.get_db_prep_save(getattr(r, f.attname), connection) for f in model_fields] + [r.id] + where_params
+        for r in rows
+    ]
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+    return len(rows)
+
+
+def bulk_insert_rows(model, fields, rows, batch_size=5000):
+    """
+    INSERT plain tuples (values in `fields` order; use attnames such as 'loan_id'
+    for foreign keys) with executemany, without building model instances.
+    Returns the number of rows written. Ids are not returned, signals are not
+    sent and auto_now/auto_now_add fields are not filled in.
+
+    Each column is adapted with the field's get_db_prep_save, memoised per
+    distinct value, since dates, amounts and statuses repeat a lot in bulk data.
+    """
+    meta = model._meta
+    qn = connection.ops.quote_name
+    model_fields = [meta.get_field(name) for name in fields]
+    columns = ', '.join(qn(f.column) for f in model_fields)
+    sql = f'INSERT INTO {qn(meta.db_table)} ({columns}) VALUES ({", ".join(["%s"] * len(model_fields))})'
+
+    def adapt(field, memo, value):
+        try:
+            adapted = memo.get(value, memo)  # the memo itself marks a miss
+        except TypeError:  # unhashable
+            return field.get_db_prep_save(value, connection)
+        if adapted is memo:
+            adapted = memo[value] = field.get_db_prep_save(value, connection)
+        return adapted
+
+    written = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                chunk = rows[start:start + batch_size]
+                # Fresh memos per chunk keep memory bounded for columns with unique values
+                memos = [{} for _ in model_fields]
+                params = [
+                    [adapt(f, memo, value) for f, memo, value in zip(model_fields, memos, row)]
+                    for row in chunk
+                ]
+                cursor.executemany(sql, params)
+                written += len(chunk)
+    return written
+
+
+def lock_for_update(queryset):
+    """
+    Return `queryset` locked for the rest of the current transaction (call inside atomic()).
+
+    Uses SELECT ... FOR UPDATE where the backend supports it. SQLite locks the
+    whole database instead: the transaction takes the write lock up front with
+    an UPDATE that matches nothing (waiting up to busy_timeout for other
+    writers), so rows read afterwards cannot change before it commits.
+    """
+    if connection.features.has_select_for_update:
+        return queryset.select_for_update()
+    qn = connection.ops.quote_name
+    meta = queryset.model._meta
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {qn(meta.db_table)} SET {qn(meta.pk.column)} = {qn(meta.pk.column)} WHERE 0 = 1')
+    return queryset
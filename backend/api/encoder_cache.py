@@ -0,0 +1,83 @@
+"""
+Encoder-output cache for the seq2seq models (T5 chatbot, MarianMT translation).
+
+A non-English chat request runs three encoder-decoder models. When a message is
+resubmitted, retried, or decoded again with another profile or token cap, the encoder
+pass over the same tokens is repeated. get_or_encode() keeps recent encoder outputs,
+keyed by model and the exact padded input ids, and generate() is then called with
+`encoder_outputs=` so only the decoder runs.
+
+generate() mutates the encoder output object it is given (beam search replaces
+`last_hidden_state` with a copy repeated per beam), so the cache keeps only the
+tensor and every caller gets a fresh output object wrapping it.
+
+The cache is one LRU shared by all models and bounded by the size of the cached
+tensors (ENCODER_CACHE_MAX_MB; 0 disables it). Cached outputs are read-only and safe to
+share between concurrent requests. Lookups and evictions are counted as
+`encoder_cache_*` counters at GET /api/admin/metrics/.
+"""
+import collections
+import threading
+
+from django.conf import settings
+
+from . import request_metrics
+
+
+class EncoderCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = collections.OrderedDict()  # key -> (encoder outputs, size in bytes)
+        self._lock = threading.Lock()
+
+    def get_or_encode(self, name, model, input_ids, encode):
+        """
+        Encoder outputs for `input_ids` (a 2-D numpy array) of `model`, from the cache or by calling
+        encode(); returns (outputs, hit). `name` labels the metrics.
+        """
+        if self.max_bytes <= 0:
+            return encode(), False
+        # id(model): benchmarks swap models under the same name
+        key = (name, id(model), input_ids.shape, input_ids.tobytes())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        request_metrics.registry.inc('encoder_cache_total', model=name, result='miss' if entry is None else 'hit')
+        if entry is not None:
+            return _fresh(entry[0]), True
+
+        outputs = encode()
+        size = _nbytes(outputs.last_hidden_state)
+        if size > self.max_bytes:
+            return outputs, False
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (outputs, size)
+                self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                request_metrics.registry.inc('encoder_cache_evictions_total', model=name)
+        return _fresh(outputs), False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+def _fresh(outputs):
+    """A new output object of the same type sharing the cached (never modified in place) tensor."""
+    return type(outputs)(last_hidden_state=outputs.last_hidden_state)
+
+
+def _nbytes(tensor):
+    """Size of a torch or TensorFlow tensor in bytes."""
+    if hasattr(tensor, 'nbytes'):
+        return int(tensor.nbytes)
+    return int(tensor.shape.num_elements()) * tensor.dtype.size
+
+
+cache = EncoderCache(int(getattr(settings, 'ENCODER_CACHE_MAX_MB', 64) * 1024 * 1024))
@@ -0,0 +1,451 @@
+"""
+Explanation text catalogue for the ML endpoints in English, French and Kinyarwanda.
+
+Every sentence fragment used by api/explanations.py lives here as a str.format
+template. The catalogue is checked and compiled once at import: each language
+must define the same keys with the same placeholders, and each template is
+stored as its bound `format` method. Rendering an explanation in any language
+is then plain string assembly, with no translation models involved.
+"""
+import string
+
+LANGUAGES = ('en', 'fr', 'rw')
+DEFAULT_LANGUAGE = 'en'
+
+TEMPLATES = {
+    'en': {
+        # Eligibility: rule-based reasons
+        'approved_prefix': 'Approved: The application was approved based on ',
+        'approved_separator': ' ',
+        'ok_credit_strong': 'strong credit score ({credit}).',
+        'ok_credit_acceptable': 'acceptable credit score ({credit}).',
+        'ok_income': 'income supports the requested loan amount and repayment.',
+        'ok_dti': 'manageable debt-to-income ratio ({dti:.0%}).',
+        'ok_employment': 'stable employment status.',
+        'ok_no_defaults': 'no previous loan defaults.',
+        'ok_no_bankruptcy': 'no bankruptcy history.',
+        'ok_payment_history': 'good payment history.',
+        'ok_overall': 'your overall profile meets the eligibility criteria.',
+        'denied_prefix': 'Denied: The application was not approved primarily due to ',
+        'denied_separator': ', ',
+        'no_credit': 'credit score ({credit}).',
+        'no_dti': 'high debt-to-income ratio ({dti:.0%}).',
+        'no_defaults': 'previous loan default(s).',
+        'no_bankruptcy': 'bankruptcy history.',
+        'no_employment': 'employment status.',
+        'no_income': 'income may be insufficient for the requested amount.',
+        'no_payment_history': 'limited or weak payment history.',
+        'no_overall': 'the combined risk factors in your profile.',
+        # Eligibility: reasons from model attributions
+        'attributed_approved': 'Approved: The application was approved mainly because of your {factors}.',
+        'attributed_denied': 'Denied: The application was not approved primarily due to your {factors}.',
+        'list_separator': ', ',
+        'list_last_separator': ' and ',
+        'factor_text': '{label} ({value})',
+        'factor_ratio': '{label} ({value:.0%})',
+        'factor_money': '{label} ({value:,.0f} RWF)',
+        'factor_months': '{label} ({value} months)',
+        'factor_number': '{label} ({value:g})',
+        'eligibility_description': (
+            'Approved means the model predicts the application would be accepted; denied means it would likely be '
+            'rejected. The reason names the application features that contributed most to the model\'s decision; '
+            'factors lists their contributions (positive values push towards approval).'
+        ),
+        # Risk score
+        'band_low': 'Low risk',
+        'band_moderate': 'Moderate risk',
+        'band_higher': 'Higher risk',
+        'interpretation_low': (
+            'The score indicates a lower likelihood of default. '
+            'Lenders may offer more favorable terms for applications in this range.'
+        ),
+        'interpretation_moderate': (
+            'The score indicates a moderate level of default risk. '
+            'Lenders may apply standard terms or request additional assurance.'
+        ),
+        'interpretation_higher': (
+            'The score indicates a higher likelihood of default. '
+            'Lenders may require stronger guarantees or offer different terms.'
+        ),
+        'risk_description': (
+            'Risk score: {score:.1f}. '
+            'This is a relative measure of default risk (higher number = higher risk). '
+            'Interpretation: {band} — {interpretation}'
+        ),
+        'score_meaning': (
+            'Scores are typically in a range where lower values (e.g. below 40) indicate lower default risk '
+            'and higher values (e.g. above 55) indicate higher default risk. '
+            'The exact scale depends on the model training data.'
+        ),
+        # Recommended amount
+        'amount_income': 'your annual income ({income} RWF)',
+        'amount_credit': 'your credit score ({credit})',
+        'amount_dti': 'your debt-to-income ratio ({dti:.0%})',
+        'amount_net_worth': 'your net worth ({net_worth} RWF)',
+        'amount_savings': 'savings and reserves ({savings} RWF)',
+        'amount_employment': 'employment status ({employment})',
+        'amount_duration': 'requested loan duration ({months} months)',
+        'amount_explanation': (
+            'The recommended amount of {amount:.0f} RWF is based on your profile: {factors}. '
+            'The model considers these and other application features to suggest a loan amount '
+            'that aligns with typical approvals for similar profiles while respecting affordability and risk.'
+        ),
+        'amount_basis': (
+            'The recommendation is driven by income, credit score, debt burden, assets, employment, '
+            'and loan term from your application.'
+        ),
+    },
+    'fr': {
+        'approved_prefix': 'Approuvée : la demande a été approuvée sur la base de : ',
+        'approved_separator': ' ',
+        'ok_credit_strong': 'bon score de crédit ({credit}).',
+        'ok_credit_acceptable': 'score de crédit acceptable ({credit}).',
+        'ok_income': 'revenu suffisant pour le montant demandé et son remboursement.',
+        'ok_dti': "ratio d'endettement maîtrisé ({dti:.0%}).",
+        'ok_employment': "situation d'emploi stable.",
+        'ok_no_defaults': 'aucun défaut de paiement antérieur.',
+        'ok_no_bankruptcy': 'aucun antécédent de faillite.',
+        'ok_payment_history': 'bon historique de paiement.',
+        'ok_overall': "votre profil global répond aux critères d'éligibilité.",
+        'denied_prefix': "Refusée : la demande n'a pas été approuvée principalement en raison de : ",
+        'denied_separator': ', ',
+        'no_credit': 'score de crédit ({credit}).',
+        'no_dti': "ratio d'endettement élevé ({dti:.0%}).",
+        'no_defaults': 'défaut(s) de paiement antérieur(s).',
+        'no_bankruptcy': 'antécédents de faillite.',
+        'no_employment': "situation d'emploi.",
+        'no_income': 'revenu possiblement insuffisant pour le montant demandé.',
+        'no_payment_history': 'historique de paiement limité ou faible.',
+        'no_overall': 'la combinaison des facteurs de risque de votre profil.',
+        'attributed_approved': 'Approuvée : la demande a été approuvée principalement grâce aux éléments suivants : {factors}.',
+        'attributed_denied': "Refusée : la demande n'a pas été approuvée principalement en raison des éléments suivants : {factors}.",
+        'list_separator': ', ',
+        'list_last_separator': ' et ',
+        'factor_text': '{label} ({value})',
+        'factor_ratio': '{label} ({value:.0%})',
+        'factor_money': '{label} ({value:,.0f} RWF)',
+        'factor_months': '{label} ({value} mois)',
+        'factor_number': '{label} ({value:g})',
+        'eligibility_description': (
+            "Approuvée signifie que le modèle prévoit l'acceptation de la demande ; refusée signifie qu'elle serait "
+            "probablement rejetée. La raison cite les caractéristiques de la demande qui ont le plus pesé dans la "
+            "décision du modèle ; factors donne leurs contributions (une valeur positive favorise l'approbation)."
+        ),
+        'band_low': 'Risque faible',
+        'band_moderate': 'Risque modéré',
+        'band_higher': 'Risque élevé',
+        'interpretation_low': (
+            'Le score indique une probabilité de défaut plus faible. '
+            'Les prêteurs peuvent proposer des conditions plus favorables pour les demandes dans cette tranche.'
+        ),
+        'interpretation_moderate': (
+            'Le score indique un niveau de risque de défaut modéré. '
+            'Les prêteurs peuvent appliquer des conditions standard ou demander des garanties supplémentaires.'
+        ),
+        'interpretation_higher': (
+            'Le score indique une probabilité de défaut plus élevée. '
+            'Les prêteurs peuvent exiger des garanties plus solides ou proposer des conditions différentes.'
+        ),
+        'risk_description': (
+            'Score de risque : {score:.1f}. '
+            'Il s\'agit d\'une mesure relative du risque de défaut (plus le nombre est élevé, plus le risque est élevé). '
+            'Interprétation : {band} — {interpretation}'
+        ),
+        'score_meaning': (
+            'Les scores se situent généralement dans une plage où les valeurs basses (par ex. moins de 40) indiquent '
+            'un risque de défaut plus faible et les valeurs hautes (par ex. plus de 55) un risque plus élevé. '
+            "L'échelle exacte dépend des données d'entraînement du modèle."
+        ),
+        'amount_income': 'votre revenu annuel ({income} RWF)',
+        'amount_credit': 'votre score de crédit ({credit})',
+        'amount_dti': "votre ratio d'endettement ({dti:.0%})",
+        'amount_net_worth': 'votre patrimoine net ({net_worth} RWF)',
+        'amount_savings': 'votre épargne et vos réserves ({savings} RWF)',
+        'amount_employment': "votre situation d'emploi ({employment})",
+        'amount_duration': 'la durée de prêt demandée ({months} mois)',
+        'amount_explanation': (
+            'Le montant recommandé de {amount:.0f} RWF est basé sur votre profil : {factors}. '
+            'Le modèle prend en compte ces éléments et d\'autres caractéristiques de la demande pour proposer un '
+            'montant conforme aux approbations habituelles pour des profils similaires, dans le respect de la '
+            'capacité de remboursement et du risque.'
+        ),
+        'amount_basis': (
+            "La recommandation repose sur le revenu, le score de crédit, l'endettement, les actifs, l'emploi "
+            'et la durée du prêt indiqués dans votre demande.'
+        ),
+    },
+    'rw': {
+        'approved_prefix': 'Byemejwe: Ubusabe bwemejwe hashingiwe kuri ',
+        'approved_separator': ' ',
+        'ok_credit_strong': 'amanota meza y\'inguzanyo ({credit}).',
+        'ok_credit_acceptable': 'amanota y\'inguzanyo yemewe ({credit}).',
+        'ok_income': 'amafaranga winjiza ahagije ku nguzanyo usaba no kuyishyura.',
+        'ok_dti': 'igipimo cy\'imyenda ugereranyije n\'ibyo winjiza kiri ku rugero rwiza ({dti:.0%}).',
+        'ok_employment': 'akazi gahamye.',
+        'ok_no_defaults': 'nta nguzanyo wigeze unanirwa kwishyura.',
+        'ok_no_bankruptcy': 'nta gihombo cyemewe n\'amategeko wigeze ugira.',
+        'ok_payment_history': 'amateka meza yo kwishyura.',
+        'ok_overall': 'umwirondoro wawe wuzuza ibisabwa.',
+        'denied_prefix': 'Ntibyemejwe: Ubusabe ntibwemejwe ahanini kubera ',
+        'denied_separator': ', ',
+        'no_credit': 'amanota y\'inguzanyo ({credit}).',
+        'no_dti': 'igipimo kiri hejuru cy\'imyenda ugereranyije n\'ibyo winjiza ({dti:.0%}).',
+        'no_defaults': 'inguzanyo wigeze kunanirwa kwishyura.',
+        'no_bankruptcy': 'amateka y\'igihombo.',
+        'no_employment': 'imiterere y\'akazi.',
+        'no_income': 'amafaranga winjiza ashobora kudahagije ku nguzanyo usaba.',
+        'no_payment_history': 'amateka yo kwishyura make cyangwa adahagije.',
+        'no_overall': 'uruhurirane rw\'ibyago biri mu mwirondoro wawe.',
+        'attributed_approved': 'Byemejwe: Ubusabe bwemejwe ahanini kubera ibi bikurikira: {factors}.',
+        'attributed_denied': 'Ntibyemejwe: Ubusabe ntibwemejwe ahanini kubera ibi bikurikira: {factors}.',
+        'list_separator': ', ',
+        'list_last_separator': ' na ',
+        'factor_text': '{label} ({value})',
+        'factor_ratio': '{label} ({value:.0%})',
+        'factor_money': '{label} ({value:,.0f} RWF)',
+        'factor_months': '{label} (amezi {value})',
+        'factor_number': '{label} ({value:g})',
+        'eligibility_description': (
+            'Byemejwe bisobanura ko modeli iteganya ko ubusabe bwakwemerwa; ntibyemejwe bisobanura ko bushobora '
+            'kwangwa. Impamvu ivuga ibiranga ubusabe byagize uruhare runini mu mwanzuro wa modeli; factors '
+            'igaragaza uruhare rwa buri kimwe (agaciro keza gashyigikira kwemerwa).'
+        ),
+        'band_low': 'Ibyago bike',
+        'band_moderate': 'Ibyago biringaniye',
+        'band_higher': 'Ibyago byinshi',
+        'interpretation_low': (
+            'Amanota agaragaza ko amahirwe yo kunanirwa kwishyura ari make. '
+            'Abatanga inguzanyo bashobora gutanga amabwiriza yoroshye ku busabe buri muri iki cyiciro.'
+        ),
+        'interpretation_moderate': (
+            'Amanota agaragaza urwego ruringaniye rw\'ibyago byo kunanirwa kwishyura. '
+            'Abatanga inguzanyo bashobora gukoresha amabwiriza asanzwe cyangwa gusaba izindi ngwate.'
+        ),
+        'interpretation_higher': (
+            'Amanota agaragaza ko amahirwe yo kunanirwa kwishyura ari menshi. '
+            'Abatanga inguzanyo bashobora gusaba ingwate zikomeye cyangwa gutanga andi mabwiriza.'
+        ),
+        'risk_description': (
+            'Amanota y\'ibyago: {score:.1f}. '
+            'Ni igipimo kigereranya ibyago byo kunanirwa kwishyura (umubare munini = ibyago byinshi). '
+            'Igisobanuro: {band} — {interpretation}'
+        ),
+        'score_meaning': (
+            'Amanota akunze kuba ari mu rwego aho agaciro gato (urugero munsi ya 40) kagaragaza ibyago bike '
+            'naho agaciro kanini (urugero hejuru ya 55) kakagaragaza ibyago byinshi. '
+            'Igipimo nyacyo giterwa n\'amakuru modeli yatorejweho.'
+        ),
+        'amount_income': 'amafaranga winjiza ku mwaka ({income} RWF)',
+        'amount_credit': 'amanota yawe y\'inguzanyo ({credit})',
+        'amount_dti': 'igipimo cy\'imyenda yawe ugereranyije n\'ibyo winjiza ({dti:.0%})',
+        'amount_net_worth': 'umutungo wawe mbumbe ({net_worth} RWF)',
+        'amount_savings': 'ubwizigame n\'ibigega ({savings} RWF)',
+        'amount_employment': 'imiterere y\'akazi ({employment})',
+        'amount_duration': 'igihe cy\'inguzanyo wasabye (amezi {months})',
+        'amount_explanation': (
+            'Amafaranga asabwa angana na {amount:.0f} RWF ashingiye ku mwirondoro wawe: {factors}. '
+            'Modeli yifashisha ibi n\'ibindi biranga ubusabe kugira ngo itange inguzanyo ihuye n\'izisanzwe '
+            'zemezwa ku myirondoro isa n\'uwawe, hitawe ku bushobozi bwo kwishyura n\'ibyago.'
+        ),
+        'amount_basis': (
+            'Icyifuzo gishingiye ku mafaranga winjiza, amanota y\'inguzanyo, imyenda, umutungo, akazi '
+            'n\'igihe cy\'inguzanyo biri mu busabe bwawe.'
+        ),
+    },
+}
+
+# Plain-language names for model features, used in attribution-based reasons
+FEATURE_LABELS = {
+    'en': {
+        'Age': 'age',
+        'AnnualIncome': 'annual income',
+        'CreditScore': 'credit score',
+        'Experience': 'work experience',
+        'LoanAmount': 'requested loan amount',
+        'LoanDuration': 'loan duration',
+        'NumberOfDependents': 'number of dependents',
+        'MonthlyDebtPayments': 'monthly debt payments',
+        'CreditCardUtilizationRate': 'credit card utilization',
+        'NumberOfOpenCreditLines': 'open credit lines',
+        'NumberOfCreditInquiries': 'recent credit inquiries',
+        'DebtToIncomeRatio': 'debt-to-income ratio',
+        'BankruptcyHistory': 'bankruptcy history',
+        'PreviousLoanDefaults': 'previous loan defaults',
+        'PaymentHistory': 'payment history',
+        'LengthOfCreditHistory': 'length of credit history',
+        'SavingsAccountBalance': 'savings balance',
+        'CheckingAccountBalance': 'checking account balance',
+        'TotalAssets': 'total assets',
+        'TotalLiabilities': 'total liabilities',
+        'MonthlyIncome': 'monthly income',
+        'UtilityBillsPaymentHistory': 'utility bill payment history',
+        'JobTenure': 'job tenure',
+        'NetWorth': 'net worth',
+        'BaseInterestRate': 'base interest rate',
+        'InterestRate': 'interest rate',
+        'MonthlyLoanPayment': 'monthly loan payment',
+        'TotalDebtToIncomeRatio': 'total debt-to-income ratio',
+        'EmploymentStatus': 'employment status',
+        'EducationLevel': 'education level',
+        'MaritalStatus': 'marital status',
+        'HomeOwnershipStatus': 'home ownership',
+        'LoanPurpose': 'loan purpose',
+    },
+    'fr': {
+        'Age': 'âge',
+        'AnnualIncome': 'revenu annuel',
+        'CreditScore': 'score de crédit',
+        'Experience': 'expérience professionnelle',
+        'LoanAmount': 'montant de prêt demandé',
+        'LoanDuration': 'durée du prêt',
+        'NumberOfDependents': 'nombre de personnes à charge',
+        'MonthlyDebtPayments': 'remboursements mensuels de dettes',
+        'CreditCardUtilizationRate': 'utilisation de la carte de crédit',
+        'NumberOfOpenCreditLines': 'lignes de crédit ouvertes',
+        'NumberOfCreditInquiries': 'demandes de crédit récentes',
+        'DebtToIncomeRatio': "ratio d'endettement",
+        'BankruptcyHistory': 'antécédents de faillite',
+        'PreviousLoanDefaults': 'défauts de paiement antérieurs',
+        'PaymentHistory': 'historique de paiement',
+        'LengthOfCreditHistory': "ancienneté de l'historique de crédit",
+        'SavingsAccountBalance': "solde d'épargne",
+        'CheckingAccountBalance': 'solde du compte courant',
+        'TotalAssets': 'actifs totaux',
+        'TotalLiabilities': 'passifs totaux',
+        'MonthlyIncome': 'revenu mensuel',
+        'UtilityBillsPaymentHistory': 'paiement des factures de services',
+        'JobTenure': "ancienneté dans l'emploi",
+        'NetWorth': 'patrimoine net',
+        'BaseInterestRate': "taux d'intérêt de base",
+        'InterestRate': "taux d'intérêt",
+        'MonthlyLoanPayment': 'mensualité du prêt',
+        'TotalDebtToIncomeRatio': "ratio d'endettement total",
+        'EmploymentStatus': "situation d'emploi",
+        'EducationLevel': "niveau d'études",
+        'MaritalStatus': 'situation familiale',
+        'HomeOwnershipStatus': 'statut de logement',
+        'LoanPurpose': 'objet du prêt',
+    },
+    'rw': {
+        'Age': 'imyaka',
+        'AnnualIncome': 'amafaranga winjiza ku mwaka',
+        'CreditScore': 'amanota y\'inguzanyo',
+        'Experience': 'uburambe ku kazi',
+        'LoanAmount': 'amafaranga y\'inguzanyo wasabye',
+        'LoanDuration': 'igihe cy\'inguzanyo',
+        'NumberOfDependents': 'umubare w\'abo utunze',
+        'MonthlyDebtPayments': 'ubwishyu bw\'imyenda bwa buri kwezi',
+        'CreditCardUtilizationRate': 'ikoreshwa rya karita y\'inguzanyo',
+        'NumberOfOpenCreditLines': 'inguzanyo zifunguye',
+        'NumberOfCreditInquiries': 'ubusabe bw\'inguzanyo buheruka',
+        'DebtToIncomeRatio': 'igipimo cy\'imyenda ugereranyije n\'ibyo winjiza',
+        'BankruptcyHistory': 'amateka y\'igihombo',
+        'PreviousLoanDefaults': 'inguzanyo zananiwe kwishyurwa mbere',
+        'PaymentHistory': 'amateka yo kwishyura',
+        'LengthOfCreditHistory': 'igihe umaze ufata inguzanyo',
+        'SavingsAccountBalance': 'amafaranga ari kuri konti yo kuzigama',
+        'CheckingAccountBalance': 'amafaranga ari kuri konti isanzwe',
+        'TotalAssets': 'umutungo wose',
+        'TotalLiabilities': 'imyenda yose',
+        'MonthlyIncome': 'amafaranga winjiza ku kwezi',
+        'UtilityBillsPaymentHistory': 'kwishyura fagitire z\'amazi n\'umuriro',
+        'JobTenure': 'igihe umaze ku kazi',
+        'NetWorth': 'umutungo mbumbe',
+        'BaseInterestRate': 'inyungu fatizo',
+        'InterestRate': 'inyungu',
+        'MonthlyLoanPayment': 'ubwishyu bw\'inguzanyo bwa buri kwezi',
+        'TotalDebtToIncomeRatio': 'igipimo cy\'imyenda yose ugereranyije n\'ibyo winjiza',
+        'EmploymentStatus': 'imiterere y\'akazi',
+        'EducationLevel': 'urwego rw\'amashuri',
+        'MaritalStatus': 'irangamimerere',
+        'HomeOwnershipStatus': 'imiterere y\'aho utuye',
+        'LoanPurpose': 'icyo inguzanyo igenewe',
+    },
+}
+
+# Localized names for categorical feature values (English values are shown as-is)
+VALUE_LABELS = {
+    'fr': {
+        'Employed': 'salarié',
+        'Self-Employed': 'indépendant',
+        'Unemployed': 'sans emploi',
+        'Associate': 'diplôme de premier cycle court',
+        'Bachelor': 'licence',
+        'High School': 'études secondaires',
+        'Master': 'master',
+        'Divorced': 'divorcé',
+        'Married': 'marié',
+        'Single': 'célibataire',
+        'Mortgage': 'propriétaire avec prêt immobilier',
+        'Own': 'propriétaire',
+        'Rent': 'locataire',
+        'Debt Consolidation': 'regroupement de dettes',
+        'Education': 'études',
+        'Home': 'logement',
+        'Other': 'autre',
+    },
+    'rw': {
+        'Employed': 'afite akazi',
+        'Self-Employed': 'yikorera',
+        'Unemployed': 'nta kazi',
+        'Associate': 'impamyabumenyi y\'icyiciro cya mbere cya kaminuza',
+        'Bachelor': 'impamyabumenyi ya kaminuza',
+        'High School': 'amashuri yisumbuye',
+        'Master': 'impamyabumenyi y\'icyiciro cya gatatu',
+        'Divorced': 'yatandukanye',
+        'Married': 'arubatse',
+        'Single': 'ingaragu',
+        'Mortgage': 'inzu ifitiwe inguzanyo',
+        'Own': 'inzu ye bwite',
+        'Rent': 'akodesha',
+        'Debt Consolidation': 'guhuza imyenda',
+        'Education': 'amashuri',
+        'Home': 'inzu',
+        'Other': 'ibindi',
+    },
+}
+
+
+def _fields(template):
+    return {name for _, name, _, _ in string.Formatter().parse(template) if name}
+
+
+def _compile():
+    """Check every language against English and return {lang: {key: bound format}}."""
+    reference = TEMPLATES[DEFAULT_LANGUAGE]
+    compiled = {}
+    for lang in LANGUAGES:
+        templates = TEMPLATES[lang]
+        missing = set(reference) - set(templates)
+        extra = set(templates) - set(reference)
+        if missing or extra:
+            raise ValueError(f"Explanation catalogue '{lang}': missing {sorted(missing)}, unexpected {sorted(extra)}")
+        for key, text in templates.items():
+            if _fields(text) != _fields(reference[key]):
+                raise ValueError(f"Explanation catalogue '{lang}.{key}': placeholders differ from English")
+        if set(FEATURE_LABELS[lang]) != set(FEATURE_LABELS[DEFAULT_LANGUAGE]):
+            raise ValueError(f"Explanation catalogue '{lang}': feature labels incomplete")
+        compiled[lang] = {key: text.format for key, text in templates.items()}
+    return compiled
+
+
+_COMPILED = _compile()
+
+
+def normalize_language(language):
+    """Return a supported language code, defaulting to English."""
+    language = (language or '').strip().lower()[:2]
+    return language if language in _COMPILED else DEFAULT_LANGUAGE
+
+
+def catalogue(language):
+    """Compiled templates for a language: {key: format callable}."""
+    return _COMPILED[normalize_language(language)]
+
+
+def feature_label(language, feature):
+    return FEATURE_LABELS[normalize_language(language)].get(feature, feature)
+
+
+def value_label(language, value):
+    return VALUE_LABELS.get(normalize_language(language), {}).get(value, value)
@@ -1,7 +1,9 @@
 """
 Human-readable explanations for ML API responses.
 Uses payload features and model output to describe what the result means.
+All text is rendered from the en/fr/rw templates in explanation_catalogue.
 """
+from .explanation_catalogue import catalogue, feature_label, value_label
 
 
 def _num(payload, key, default=0):
@@ -17,10 +19,59 @@ def _str(payload, key, default=""):
     return str(v).strip() if v is not None else default
 
 
-def eligibility_reason(payload, approved):
+_RATIO_FEATURES = {
+    "CreditCardUtilizationRate", "DebtToIncomeRatio", "TotalDebtToIncomeRatio",
+    "UtilityBillsPaymentHistory", "BaseInterestRate", "InterestRate",
+}
+_MONEY_FEATURES = {
+    "AnnualIncome", "LoanAmount", "MonthlyDebtPayments", "SavingsAccountBalance",
+    "CheckingAccountBalance", "TotalAssets", "TotalLiabilities", "MonthlyIncome",
+    "NetWorth", "MonthlyLoanPayment",
+}
+# Attributed features named in a reason
+REASON_FACTORS = 3
+
+
+def _format_factor(t, language, feature, value):
+    label = feature_label(language, feature)
+    if isinstance(value, str):
+        return t["factor_text"](label=label, value=value_label(language, value))
+    if feature in _RATIO_FEATURES:
+        return t["factor_ratio"](label=label, value=value)
+    if feature in _MONEY_FEATURES:
+        return t["factor_money"](label=label, value=value)
+    if feature == "LoanDuration":
+        return t["factor_months"](label=label, value=int(value))
+    return t["factor_number"](label=label, value=round(value, 2))
+
+
+def _join(t, items):
+    if len(items) == 1:
+        return items[0]
+    return t["list_separator"]().join(items[:-1]) + t["list_last_separator"]() + items[-1]
+
+
+def _attributed_reason(t, language, approved, factors):
+    """Reason naming the features that pushed the model towards its decision, or None."""
+    if not factors:
+        return None
+    drivers = [f for f in factors if f["contribution"] != 0 and (f["contribution"] > 0) == bool(approved)]
+    if not drivers:
+        return None
+    named = _join(t, [_format_factor(t, language, f["feature"], f["value"]) for f in drivers[:REASON_FACTORS]])
+    return t["attributed_approved" if approved else "attributed_denied"](factors=named)
+
+
+def eligibility_reason(payload, approved, factors=None, language="en"):
     """
-    Build a short reason for approval or denial based on the application features.
+    Build a short reason for approval or denial. When `factors` (model attributions from
+    ml_service.explain_eligibility) are given, the reason names the features that drove
+    the model's decision; otherwise it falls back to rules on the application features.
     """
+    t = catalogue(language)
+    reason = _attributed_reason(t, language, approved, factors)
+    if reason:
+        return reason
     income = _num(payload, "AnnualIncome", 60000)
     credit = _num(payload, "CreditScore", 620)
     loan_amt = _num(payload, "LoanAmount", 20000)
@@ -33,90 +84,76 @@ def eligibility_reason(payload, approved):
     reasons = []
     if approved:
         if credit >= 650:
-            reasons.append("strong credit score ({}).".format(int(credit)))
+            reasons.append(t["ok_credit_strong"](credit=int(credit)))
         elif credit >= 600:
-            reasons.append("acceptable credit score ({}).".format(int(credit)))
+            reasons.append(t["ok_credit_acceptable"](credit=int(credit)))
         if income >= 50000 and loan_amt > 0 and (income / 12) > loan_amt / 48:
-            reasons.append("income supports the requested loan amount and repayment.")
+            reasons.append(t["ok_income"]())
         if dti <= 0.40:
-            reasons.append("manageable debt-to-income ratio ({:.0%}).".format(dti))
+            reasons.append(t["ok_dti"](dti=dti))
         if employment == "Employed":
-            reasons.append("stable employment status.")
+            reasons.append(t["ok_employment"]())
         if prev_defaults == 0:
-            reasons.append("no previous loan defaults.")
+            reasons.append(t["ok_no_defaults"]())
         if bankruptcy == 0:
-            reasons.append("no bankruptcy history.")
+            reasons.append(t["ok_no_bankruptcy"]())
         if payment_hist >= 20:
-            reasons.append("good payment history.")
+            reasons.append(t["ok_payment_history"]())
         if not reasons:
-            reasons.append("your overall profile meets the eligibility criteria.")
-        return "Approved: The application was approved based on " + " ".join(reasons)
+            reasons.append(t["ok_overall"]())
+        return t["approved_prefix"]() + t["approved_separator"]().join(reasons)
     else:
         if credit < 600:
-            reasons.append("credit score ({}).".format(int(credit)))
+            reasons.append(t["no_credit"](credit=int(credit)))
         if dti > 0.45:
-            reasons.append("high debt-to-income ratio ({:.0%}).".format(dti))
+            reasons.append(t["no_dti"](dti=dti))
         if prev_defaults > 0:
-            reasons.append("previous loan default(s).")
+            reasons.append(t["no_defaults"]())
         if bankruptcy > 0:
-            reasons.append("bankruptcy history.")
+            reasons.append(t["no_bankruptcy"]())
         if employment == "Unemployed":
-            reasons.append("employment status.")
+            reasons.append(t["no_employment"]())
         if income < 30000 and loan_amt > 10000:
-            reasons.append("income may be insufficient for the requested amount.")
+            reasons.append(t["no_income"]())
         if payment_hist < 15:
-            reasons.append("limited or weak payment history.")
+            reasons.append(t["no_payment_history"]())
         if not reasons:
-            reasons.append("the combined risk factors in your profile.")
-        return "Denied: The application was not approved primarily due to " + ", ".join(reasons)
+            reasons.append(t["no_overall"]())
+        return t["denied_prefix"]() + t["denied_separator"]().join(reasons)
 
 
-def risk_score_description(risk_score):
+def eligibility_description(language="en"):
+    return catalogue(language)["eligibility_description"]()
+
+
+def risk_score_description(risk_score, language="en"):
     """
     Return interpretation and description of what the risk score means.
     Higher score = higher default risk. Typical range from model is roughly 30–70+.
     """
+    t = catalogue(language)
     score = float(risk_score)
     if score < 35:
-        band = "Low risk"
-        interpretation = (
-            "The score indicates a lower likelihood of default. "
-            "Lenders may offer more favorable terms for applications in this range."
-        )
+        level = "low"
     elif score < 55:
-        band = "Moderate risk"
-        interpretation = (
-            "The score indicates a moderate level of default risk. "
-            "Lenders may apply standard terms or request additional assurance."
-        )
+        level = "moderate"
     else:
-        band = "Higher risk"
-        interpretation = (
-            "The score indicates a higher likelihood of default. "
-            "Lenders may require stronger guarantees or offer different terms."
-        )
-
-    description = (
-        "Risk score: {:.1f}. "
-        "This is a relative measure of default risk (higher number = higher risk). "
-        "Interpretation: {} — {}"
-    ).format(score, band, interpretation)
+        level = "higher"
+    band = t["band_" + level]()
+    interpretation = t["interpretation_" + level]()
 
     return {
         "interpretation": band,
-        "description": description,
-        "score_meaning": (
-            "Scores are typically in a range where lower values (e.g. below 40) indicate lower default risk "
-            "and higher values (e.g. above 55) indicate higher default risk. "
-            "The exact scale depends on the model training data."
-        ),
+        "description": t["risk_description"](score=score, band=band, interpretation=interpretation),
+        "score_meaning": t["score_meaning"](),
     }
 
 
-def recommend_amount_explanation(payload, recommended_amount):
+def recommend_amount_explanation(payload, recommended_amount, language="en"):
     """
     Explain why this loan amount was recommended based on the main features.
     """
+    t = catalogue(language)
     income = _num(payload, "AnnualIncome", 60000)
     credit = _num(payload, "CreditScore", 620)
     dti = _num(payload, "DebtToIncomeRatio", 0.35)
@@ -127,38 +164,18 @@ def recommend_amount_explanation(payload, recommended_amount):
 
     factors = []
     if income > 0:
-        factors.append(
-            "your annual income ({} RWF)".format(int(income))
-        )
-    factors.append(
-        "your credit score ({})".format(int(credit))
-    )
-    factors.append(
-        "your debt-to-income ratio ({:.0%})".format(dti)
-    )
+        factors.append(t["amount_income"](income=int(income)))
+    factors.append(t["amount_credit"](credit=int(credit)))
+    factors.append(t["amount_dti"](dti=dti))
     if net_worth > 0:
-        factors.append(
-            "your net worth ({} RWF)".format(int(net_worth))
-        )
+        factors.append(t["amount_net_worth"](net_worth=int(net_worth)))
     if savings > 0:
-        factors.append(
-            "savings and reserves ({} RWF)".format(int(savings))
-        )
-    factors.append(
-        "employment status ({})".format(employment)
-    )
+        factors.append(t["amount_savings"](savings=int(savings)))
+    factors.append(t["amount_employment"](employment=value_label(language, employment)))
     if loan_duration > 0:
-        factors.append(
-            "requested loan duration ({} months)".format(int(loan_duration))
-        )
-
-    explanation = (
-        "The recommended amount of {:.0f} RWF is based on your profile: {}. "
-        "The model considers these and other application features to suggest a loan amount "
-        "that aligns with typical approvals for similar profiles while respecting affordability and risk."
-    ).format(float(recommended_amount), ", ".join(factors))
+        factors.append(t["amount_duration"](months=int(loan_duration)))
 
     return {
-        "explanation": explanation,
-        "basis": "The recommendation is driven by income, credit score, debt burden, assets, employment, and loan term from your application.",
+        "explanation": t["amount_explanation"](amount=float(recommended_amount), factors=t["list_separator"]().join(factors)),
+        "basis": t["amount_basis"](),
     }
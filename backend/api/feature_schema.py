@@ -0,0 +1,186 @@
+"""
+Validation and coercion of ML payloads, compiled once from the feature schema.
+
+FeatureSchema is built from the model's feature columns, the categorical options
+and the numeric defaults/bounds in ml_service. `validate(payloads)` processes a
+whole batch at once: all numeric fields are converted with one NumPy call
+(falling back to per-value parsing only for a batch that actually contains bad
+data), categorical fields with one dict lookup per value, and default filling
+and range checks are vectorized. It returns the model matrix together with
+per-field imputation flags and a per-row error report.
+
+Missing fields are imputed with defaults and flagged. Unparseable numbers and
+unknown categories are reported as errors and also imputed, so callers can
+either reject the row or proceed with a warning. Out-of-range numbers are
+reported but left unchanged.
+"""
+import numpy as np
+
+MAX_REPORTED_VALUE_LENGTH = 50
+
+
+class FeatureSchema:
+    def __init__(self, feature_cols, categorical_options, numeric_defaults, numeric_bounds=None):
+        self.columns = list(feature_cols)
+        numeric_bounds = numeric_bounds or {}
+        numeric = [(j, col) for j, col in enumerate(self.columns) if col not in categorical_options]
+        self._numeric_index = np.array([j for j, _ in numeric], dtype=np.int64)
+        self._numeric_names = [col for _, col in numeric]
+        self._defaults = np.array([float(numeric_defaults.get(col, 0)) for col in self._numeric_names])
+        bounds = [numeric_bounds.get(col, (None, None)) for col in self._numeric_names]
+        self._low = np.array([-np.inf if low is None else low for low, _ in bounds], dtype=np.float64)
+        self._high = np.array([np.inf if high is None else high for _, high in bounds], dtype=np.float64)
+        self._categorical = []
+        for j, col in enumerate(self.columns):
+            if col in categorical_options:
+                options = list(categorical_options[col])
+                lookup = {}
+                for code, option in enumerate(options):
+                    lookup[option] = code
+                    lookup[option.casefold()] = code
+                # Missing categories default to the first option (LabelEncoder index 0)
+                self._categorical.append((j, col, options, lookup, 0))
+
+    def validate(self, payloads):
+        """Return a Validation for a list of payload dicts."""
+        payloads = [p if isinstance(p, dict) else {} for p in payloads]
+        n = len(payloads)
+        X = np.empty((n, len(self.columns)), dtype=np.float64)
+        imputed = np.zeros((n, len(self.columns)), dtype=bool)
+        errors = {}
+        self._numeric(payloads, X, imputed, errors)
+        for plan in self._categorical:
+            self._categorical_column(plan, payloads, X, imputed, errors)
+        return Validation(self.columns, X, imputed, errors)
+
+    def _numeric(self, payloads, X, imputed, errors):
+        names = self._numeric_names
+        raw = [list(map(p.get, names)) for p in payloads]
+        # One conversion for the whole numeric block; None becomes NaN
+        try:
+            values = np.array(raw, dtype=np.float64)
+            if values.shape != (len(payloads), len(names)):
+                raise ValueError('nested value')
+        except (TypeError, ValueError):
+            values = self._parse_slowly(raw)
+        fill = ~np.isfinite(values)
+        # Only non-finite cells need a look at the raw value: missing, unparseable or nan/inf
+        for i, k in np.argwhere(fill).tolist():
+            value = raw[i][k]
+            if value is None or value == '':
+                continue
+            if isinstance(value, _Unparseable):
+                _add_error(errors, i, names[k], value.value, 'not a number')
+            else:
+                _add_error(errors, i, names[k], value, 'not a finite number')
+        values = np.where(fill, self._defaults, values)
+        out = ~fill & ((values < self._low) | (values > self._high))
+        if out.any():
+            for i, k in np.argwhere(out).tolist():
+                low, high = self._low[k], self._high[k]
+                _add_error(errors, i, names[k], raw[i][k], 'out of range [{}, {}]'.format(
+                    '' if np.isinf(low) else _number(low), '' if np.isinf(high) else _number(high)))
+        X[:, self._numeric_index] = values
+        imputed[:, self._numeric_index] = fill
+
+    @staticmethod
+    def _parse_slowly(raw):
+        """Per-value fallback for a batch that contains bad data; marks bad cells in `raw`."""
+        values = np.full((len(raw), len(raw[0]) if raw else 0), np.nan)
+        for i, row in enumerate(raw):
+            for k, value in enumerate(row):
+                if value is None or value == '':
+                    continue
+                try:
+                    values[i, k] = float(value)
+                except (TypeError, ValueError):
+                    row[k] = _Unparseable(value)
+        return values
+
+    @staticmethod
+    def _categorical_column(plan, payloads, X, imputed, errors):
+        j, col, options, lookup, default = plan
+        try:
+            # Fast path: every payload carries an exact option
+            X[:, j] = [lookup[p[col]] for p in payloads]
+            return
+        except (KeyError, TypeError):
+            pass
+        codes = np.empty(len(payloads), dtype=np.float64)
+        fill = np.zeros(len(payloads), dtype=bool)
+        for i, p in enumerate(payloads):
+            v = p.get(col)
+            code = lookup.get(v) if isinstance(v, str) else None
+            if code is None:
+                if v is None or v == '':
+                    code, fill[i] = default, True
+                else:
+                    code = lookup.get(str(v).strip().casefold())
+                    if code is None:
+                        _add_error(errors, i, col, v, 'unknown category (options: {})'.format(', '.join(options)))
+                        code, fill[i] = default, True
+            codes[i] = code
+        X[:, j] = codes
+        imputed[:, j] = fill
+
+
+class _Unparseable:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return False
+
+    __hash__ = object.__hash__
+
+
+def _number(x):
+    return int(x) if float(x).is_integer() else float(x)
+
+
+def _add_error(errors, row, field, value, message):
+    errors.setdefault(int(row), []).append({
+        'field': field,
+        'value': str(value)[:MAX_REPORTED_VALUE_LENGTH],
+        'error': message,
+    })
+
+
+class Validation:
+    """Validated batch: model matrix X, imputation flags and per-row errors."""
+
+    def __init__(self, columns, X, imputed, errors):
+        self.columns = columns
+        self.X = X
+        self.imputed = imputed
+        self.errors = errors
+
+    @property
+    def valid(self):
+        """Boolean mask of rows without errors."""
+        mask = np.ones(len(self.X), dtype=bool)
+        if self.errors:
+            mask[list(self.errors)] = False
+        return mask
+
+    def row(self, i):
+        """{'valid', 'errors', 'imputed'} for one row; `imputed` lists fields that were defaulted."""
+        return {
+            'valid': i not in self.errors,
+            'errors': self.errors.get(i, []),
+            'imputed': [self.columns[j] for j in np.flatnonzero(self.imputed[i])],
+        }
+
+    def summary(self):
+        """Batch-level report: counts plus the error list of each invalid row."""
+        return {
+            'rows': len(self.X),
+            'invalid_rows': len(self.errors),
+            'imputed_values': int(self.imputed.sum()),
+            'imputed_by_field': {
+                self.columns[j]: int(count) for j, count in enumerate(self.imputed.sum(axis=0)) if count
+            },
+            'errors': {row: errs for row, errs in sorted(self.errors.items())},
+        }
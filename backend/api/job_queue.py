@@ -0,0 +1,188 @@
+"""
+Database-backed job queue: background work stored in our own database (api.Job), no broker.
+
+Producers call enqueue(queue, payload), normally inside the transaction that writes the
+data the job refers to, so a job never exists without its data and vice versa.
+
+Workers (`manage.py runjobs`) loop over:
+1. claim(queue, limit): pick up to `limit` ready jobs (queued and due, or running with an
+   expired claim) and mark them running under a fresh claim token, with a conditional
+   UPDATE so two workers can never claim the same job. Works on SQLite and PostgreSQL
+   alike. The claim is valid for the visibility timeout; if the worker dies, the jobs
+   become claimable again once it expires.
+2. run_batch(queue, jobs): hand all claimed jobs to the queue's handler at once (so it can
+   batch its work), then mark them done, or queued again with exponential backoff on error.
+   After max_attempts a job is failed and the queue's `on_failed` hook runs.
+
+Handlers are registered in QUEUES by dotted path. A handler takes the list of claimed Jobs
+and returns {job id: error message} for the jobs that failed; raising fails the whole batch.
+
+Queue depth, age of the oldest ready job, recent throughput and latency are computed from
+the table and appended to GET /api/admin/metrics/ (render_metrics()).
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import request_metrics
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+QUEUES = {
+    'scoring': {
+        'handler': 'api.application_scoring.score_jobs',
+        'on_failed': 'api.application_scoring.scoring_failed',
+    },
+}
+MAX_ATTEMPTS = getattr(settings, 'JOB_MAX_ATTEMPTS', 5)
+RETRY_BASE_SECONDS = getattr(settings, 'JOB_RETRY_BASE_SECONDS', 5)
+RETRY_MAX_SECONDS = 600
+# Window for the throughput and latency gauges
+METRICS_WINDOW_SECONDS = 300
+
+
+def enqueue(queue, payload, max_attempts=None, delay_seconds=0):
+    if queue not in QUEUES:
+        raise ValueError(f"Unknown job queue: {queue}")
+    now = timezone.now()
+    return Job.objects.create(
+        queue=queue,
+        payload=payload,
+        max_attempts=max_attempts or MAX_ATTEMPTS,
+        run_after=now + timedelta(seconds=delay_seconds),
+        created_at=now,
+    )
+
+
+def _ready(now):
+    return Q(status=QUEUED, run_after__lte=now) | Q(status=RUNNING, locked_until__lt=now)
+
+
+def claim(queue, limit, worker_id, visibility_timeout):
+    """Claim up to `limit` ready jobs of `queue` for `visibility_timeout` seconds; oldest first."""
+    now = timezone.now()
+    ids = list(
+        Job.objects.filter(_ready(now), queue=queue)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    token = f'{worker_id}:{uuid.uuid4().hex[:12]}'
+    # Re-checking readiness in the UPDATE makes the claim atomic per row: a job taken by another
+    # worker since the SELECT no longer matches
+    Job.objects.filter(_ready(now), id__in=ids).update(
+        status=RUNNING,
+        locked_by=token,
+        locked_until=now + timedelta(seconds=visibility_timeout),
+        attempts=F('attempts') + 1,
+    )
+    jobs = list(Job.objects.filter(locked_by=token, status=RUNNING).order_by('id'))
+    # Jobs whose claims kept expiring (worker crashed or hung on them) are not retried forever
+    expired = [job for job in jobs if job.attempts > job.max_attempts]
+    if expired:
+        _fail(queue, expired, {job.id: 'visibility timeout expired on every attempt' for job in expired})
+    return [job for job in jobs if job.attempts <= job.max_attempts]
+
+
+def run_batch(queue, jobs):
+    """Run the queue's handler on claimed jobs and record the outcome; returns (done, retried, failed) counts."""
+    if not jobs:
+        return 0, 0, 0
+    handler = import_string(QUEUES[queue]['handler'])
+    try:
+        errors = handler(jobs) or {}
+    except Exception as exc:
+        logger.exception("Job handler for queue %s failed on %d job(s)", queue, len(jobs))
+        errors = {job.id: f'{type(exc).__name__}: {exc}' for job in jobs}
+
+    done = [job for job in jobs if job.id not in errors]
+    retry = [job for job in jobs if job.id in errors and job.attempts < job.max_attempts]
+    failed = [job for job in jobs if job.id in errors and job.attempts >= job.max_attempts]
+    now = timezone.now()
+    # Every update is conditional on our claim token: if the claim expired and another worker took
+    # a job over, that worker records its outcome, and the job is not counted here
+    retried = 0
+    with transaction.atomic():
+        finished = Job.objects.filter(id__in=[job.id for job in done], locked_by=jobs[0].locked_by).update(
+            status=DONE, finished_at=now, locked_until=None, last_error='',
+        ) if done else 0
+        for job in retry:
+            backoff = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+            retried += Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+                status=QUEUED, run_after=now + timedelta(seconds=backoff), locked_until=None,
+                last_error=str(errors[job.id])[:2000],
+            )
+    if failed:
+        failed = _fail(queue, failed, errors)
+    return finished, retried, len(failed)
+
+
+def _fail(queue, jobs, errors):
+    """Mark claimed jobs failed and run the queue's on_failed hook; returns the jobs still held by this claim."""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = [
+            job for job in jobs
+            if Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+                status=FAILED, finished_at=now, locked_until=None, last_error=str(errors[job.id])[:2000],
+            )
+        ]
+    if not jobs:
+        return jobs
+    logger.error("%d job(s) in queue %s failed after %d attempts: %s", len(jobs), queue,
+                 jobs[0].max_attempts, errors[jobs[0].id])
+    on_failed = QUEUES[queue].get('on_failed')
+    if on_failed:
+        import_string(on_failed)(jobs)
+    return jobs
+
+
+def prune(older_than_hours):
+    """Delete done jobs finished more than `older_than_hours` ago; failed jobs are kept for inspection."""
+    cutoff = timezone.now() - timedelta(hours=older_than_hours)
+    deleted, _ = Job.objects.filter(status=DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def render_metrics():
+    """Prometheus gauges for every queue, computed from the jobs table."""
+    now = timezone.now()
+    depth = [
+        ({'queue': row['queue'], 'status': row['status']}, row['n'])
+        for row in Job.objects.values('queue', 'status').annotate(n=Count('id')).order_by('queue', 'status')
+    ]
+    oldest = [
+        ({'queue': row['queue']}, (now - row['oldest']).total_seconds())
+        for row in Job.objects.filter(_ready(now)).values('queue').annotate(oldest=Min('run_after')).order_by('queue')
+    ]
+    recent = _latencies_by_queue(
+        Job.objects.filter(status=DONE, finished_at__gte=now - timedelta(seconds=METRICS_WINDOW_SECONDS))
+        .values_list('queue', 'created_at', 'finished_at')
+    )
+    throughput = [({'queue': q}, len(latencies) / METRICS_WINDOW_SECONDS) for q, latencies in recent.items()]
+    latency = [({'queue': q}, sum(latencies) / len(latencies)) for q, latencies in recent.items()]
+    return (
+        request_metrics.render_gauges('jobs', 'Jobs in the database queue by status.', depth)
+        + request_metrics.render_gauges('job_oldest_ready_seconds', 'Age of the oldest job ready to run.', oldest)
+        + request_metrics.render_gauges(
+            'jobs_completed_per_second', f'Jobs completed per second over the last {METRICS_WINDOW_SECONDS}s.', throughput)
+        + request_metrics.render_gauges(
+            'job_latency_seconds', f'Mean enqueue-to-done time of jobs completed in the last {METRICS_WINDOW_SECONDS}s.', latency)
+    )
+
+
+def _latencies_by_queue(rows):
+    """{queue: [seconds from enqueue to done]} from (queue, created_at, finished_at) rows."""
+    by_queue = {}
+    for queue, created_at, finished_at in rows:
+        by_queue.setdefault(queue, []).append((finished_at - created_at).total_seconds())
+    return by_queue
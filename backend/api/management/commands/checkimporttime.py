@@ -0,0 +1,123 @@
+"""
+Import-time budget for a cold start of the Django process.
+Run:
+  python manage.py checkimporttime                      # fails if over budget or a heavy module is imported
+  python manage.py checkimporttime --budget-ms 400 --runs 5 --top 25
+  python manage.py checkimporttime --target migrate --target-args "--check"
+
+Runs `python -X importtime manage.py <target>` (default `check`, which also loads
+the URLconf and every view) in fresh subprocesses, and takes the fastest run so
+disk-cache noise does not fail the check. The total is the sum of the cumulative
+times of top-level imports. The command fails (non-zero exit) when:
+- the total exceeds --budget-ms (IMPORT_TIME_BUDGET_MS), or
+- any --forbid module was imported. These heavy libraries must only be imported
+  by the code that needs them, on first use.
+"""
+import json
+import os
+import re
+import shlex
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Imported lazily by the services that need them; importing any of these at startup is a regression
+DEFAULT_FORBIDDEN = (
+    'numpy', 'joblib', 'sklearn', 'xgboost', 'scipy', 'pandas',
+    'tensorflow', 'torch', 'transformers', 'jsonschema', 'drf_yasg.views',
+)
+_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)\s*$')
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Measure cold-start import time of manage.py with -X importtime and enforce a budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=getattr(settings, 'IMPORT_TIME_BUDGET_MS', 500),
+                            help='Maximum total import time in ms (default: IMPORT_TIME_BUDGET_MS or 500)')
+        parser.add_argument('--runs', type=int, default=3, help='Fresh processes to measure; the fastest counts')
+        parser.add_argument('--target', default='check', help='manage.py command to start (default: check)')
+        parser.add_argument('--target-args', default='', help='Extra arguments for the target command')
+        parser.add_argument('--forbid', action='append',
+                            help=f'Module that must not be imported at startup (repeatable; default: {", ".join(DEFAULT_FORBIDDEN)})')
+        parser.add_argument('--top', type=int, default=15, help='Show the N slowest top-level imports')
+        parser.add_argument('--json', dest='json_output', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        forbidden = tuple(options['forbid'] or DEFAULT_FORBIDDEN)
+        command = [sys.executable, '-X', 'importtime', str(settings.BASE_DIR / 'manage.py'), options['target']]
+        command += shlex.split(options['target_args'])
+
+        best = None
+        for _ in range(max(1, options['runs'])):
+            proc = subprocess.run(command, capture_output=True, text=True, env=os.environ.copy(), cwd=str(settings.BASE_DIR))
+            rows = parse_importtime(proc.stderr)
+            if proc.returncode != 0 or not rows:
+                tail = '\n'.join(line for line in proc.stderr.splitlines() if not line.startswith('import time:'))[-2000:]
+                raise CommandError(f"`{' '.join(command[3:])}` failed (exit {proc.returncode}):\n{tail}")
+            total_us = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+            if best is None or total_us < best[0]:
+                best = (total_us, rows)
+
+        total_us, rows = best
+        imported = {module for module, _, _, _ in rows}
+        offenders = sorted(m for m in forbidden if m in imported)
+        top = sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])[:options['top']]
+        report = {
+            'target': options['target'],
+            'total_ms': round(total_us / 1000, 1),
+            'budget_ms': options['budget_ms'],
+            'modules_imported': len(imported),
+            'forbidden_imported': {m: _import_chain(rows, m) for m in offenders},
+            'slowest': [{'module': m, 'cumulative_ms': round(c / 1000, 1), 'self_ms': round(s / 1000, 1)} for m, s, c, _ in top],
+        }
+
+        if options['json_output']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(f"manage.py {options['target']}: {report['total_ms']} ms of imports "
+                              f"({len(imported)} modules, best of {options['runs']}), budget {options['budget_ms']:g} ms")
+            self.stdout.write(f"  {'module':<45} {'cumulative ms':>14} {'self ms':>9}")
+            for item in report['slowest']:
+                self.stdout.write(f"  {item['module']:<45} {item['cumulative_ms']:>14.1f} {item['self_ms']:>9.1f}")
+            for module, chain in report['forbidden_imported'].items():
+                self.stdout.write(self.style.ERROR(f"  {module} imported at startup via {' -> '.join(chain)}"))
+
+        problems = []
+        if total_us / 1000 > options['budget_ms']:
+            problems.append(f"import time {report['total_ms']} ms exceeds the {options['budget_ms']:g} ms budget")
+        if offenders:
+            problems.append(f"heavy modules imported at startup: {', '.join(offenders)}")
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('Import time within budget'))
+
+
+def _import_chain(rows, module):
+    """Top-level import that (transitively) pulled in `module`, outermost first."""
+    # -X importtime prints children before their parent, so walk forward to find enclosing imports
+    for i, (name, _, _, depth) in enumerate(rows):
+        if name != module:
+            continue
+        chain = [name]
+        for parent, _, _, parent_depth in rows[i + 1:]:
+            if parent_depth < depth:
+                chain.append(parent)
+                depth = parent_depth
+                if depth == 0:
+                    break
+        return list(reversed(chain))
+    return [module]
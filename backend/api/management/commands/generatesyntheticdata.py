@@ -0,0 +1,95 @@
+"""
+Generate synthetic farmers, MFI officers, loan applications, loans, repayment
+schedules, Get Started events and chat interactions for load and scale testing.
+Run:
+  python manage.py generatesyntheticdata --farmers 10000 --applications 30000 --events 50000 --chats 20000
+  python manage.py generatesyntheticdata --farmers 200000 --applications 1000000 --batch-size 10000 --seed 7
+  python manage.py generatesyntheticdata --delete            # remove everything generated with --prefix
+
+Rows are inserted in one transaction per chunk of --batch-size farmers, leaf tables
+with db_utils.bulk_insert_rows (see api/synthetic_data.py); insert speed is
+reported per table.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import response_cache
+from api.synthetic_data import DEFAULT_BATCH_SIZE, DEFAULT_DAYS, DEFAULT_SEED, SyntheticDataGenerator, delete_synthetic
+
+
+class Command(BaseCommand):
+    help = "Insert realistic synthetic data at scale (users, applications, loans, repayments, events, chats)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--farmers', type=int, default=1000, help='Farmer accounts (with profile and farm record)')
+        parser.add_argument('--applications', type=int, help='Loan applications in total (default: 3 per farmer)')
+        parser.add_argument('--mfis', type=int, default=3, help='Microfinance officers who review applications')
+        parser.add_argument('--events', type=int, default=0, help='Get Started activity events')
+        parser.add_argument('--chats', type=int, default=0, help='Chat interactions')
+        parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help='Spread timestamps over this many past days')
+        parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Random seed (same seed, same data)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Farmers per transaction and rows per INSERT')
+        parser.add_argument('--prefix', default='synthetic', help='Username prefix marking generated rows')
+        parser.add_argument(
+            '--score-with-models', action='store_true',
+            help='Score applications with the ML models instead of the built-in heuristic (slower)',
+        )
+        parser.add_argument('--delete', action='store_true', help='Delete rows generated with --prefix and exit')
+        parser.add_argument('--report', help='Write the insert statistics as JSON to this path')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix'].strip()
+        if not prefix:
+            raise CommandError('--prefix must not be empty')
+        if options['delete']:
+            counts = delete_synthetic(prefix, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Deleted {sum(counts.values())} rows: {counts}"))
+            return
+
+        farmers = max(0, options['farmers'])
+        applications = options['applications'] if options['applications'] is not None else farmers * 3
+        if applications and not farmers:
+            raise CommandError('Applications need at least one farmer')
+        if options['chats'] and not farmers:
+            raise CommandError('Chat interactions need at least one farmer')
+        if options['score_with_models']:
+            from api.ml_service import score_batch
+            try:
+                score_batch([])
+            except FileNotFoundError as exc:
+                raise CommandError(str(exc))
+
+        def progress(stats):
+            rows = ', '.join(f"{name} {count}" for name, count in stats.rows.items() if count)
+            self.stdout.write(f"  {rows}")
+
+        generator = SyntheticDataGenerator(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            prefix=prefix,
+            days=options['days'],
+            score_with_models=options['score_with_models'],
+            progress=progress,
+        )
+        self.stdout.write(
+            f"Generating {farmers} farmers, {applications} applications, {options['events']} events, "
+            f"{options['chats']} chats (seed {options['seed']})"
+        )
+        report = generator.generate(
+            farmers=farmers, applications=max(0, applications), mfis=options['mfis'],
+            events=max(0, options['events']), chats=max(0, options['chats']),
+        )
+        # bulk_create skips the save signals that expire cached dashboards
+        response_cache.invalidate_all()
+
+        for name, table in report['tables'].items():
+            rate = f"{table['rows_per_s']:,} rows/s" if table['rows_per_s'] else '-'
+            self.stdout.write(f"  {name:<20} {table['rows']:>10,} rows  {table['seconds']:>8.2f}s  {rate}")
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as out:
+                json.dump(report, out, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserted {report['total_rows']:,} rows in {report['wall_seconds']:.1f}s ({report['rows_per_s'] or 0:,} rows/s, "
+            f"{report['insert_seconds']:.1f}s of it in INSERTs)"
+        ))
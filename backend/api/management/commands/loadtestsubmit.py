@@ -0,0 +1,218 @@
+"""
+Load test for the application-submit path (POST /api/farmer/applications/).
+Measures write throughput, latency percentiles and lock errors for the active
+database profile, or compares several profiles (see config/database.py).
+
+With SCORING_ASYNC (the default) a submit saves the application and queues its
+scoring job, which is what is measured. --stub-models scores inline instead, with
+constant model outputs, so the write path of synchronous scoring is measured.
+
+Run:
+  python manage.py loadtestsubmit --threads 8 --requests 100 --stub-models
+  python manage.py loadtestsubmit --compare sqlite-legacy,sqlite,pgbouncer --stub-models
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+
+from api.models import Job, LoanApplication, UserProfile
+from config.database import PROFILES, current_profile
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+USER_PREFIX = 'loadtest-farmer-'
+SUBMIT_URL = '/api/farmer/applications/'
+SAMPLE_APPLICATION = {
+    'age': 38,
+    'annual_income': 1800000,
+    'credit_score': 640,
+    'loan_amount_requested': 500000,
+    'loan_duration_months': 12,
+    'employment_status': 'Self-Employed',
+    'education_level': 'High School',
+    'marital_status': 'Married',
+    'loan_purpose': 'Other',
+}
+
+
+def _client_host():
+    """A Host header accepted by ALLOWED_HOSTS (the test client defaults to 'testserver')."""
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class Command(BaseCommand):
+    help = "Load-test the loan application submit path and report write throughput per database profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent client threads')
+        parser.add_argument('--requests', type=int, default=100, help='Submissions per thread')
+        parser.add_argument(
+            '--stub-models',
+            action='store_true',
+            help='Score inline (SCORING_ASYNC off) with constant model outputs, so only the write path is measured',
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep the generated users and applications')
+        parser.add_argument('--json', action='store_true', help='Print a single JSON result line')
+        parser.add_argument(
+            '--compare',
+            default='',
+            help=f"Comma-separated profiles to run in subprocesses ({', '.join(PROFILES)}). "
+                 "SQLite profiles use a fresh temporary database file each.",
+        )
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self._compare(options)
+        result = self._run(options)
+        if options['json']:
+            self.stdout.write(json.dumps(result))
+        else:
+            self._print(result)
+
+    # ----- single profile -----
+
+    def _create_users(self, n):
+        users = []
+        for i in range(n):
+            username = f'{USER_PREFIX}{os.getpid()}-{i}@test.agrifinconnect.rw'
+            user = User.objects.create_user(username=username, email=username, password=None)
+            UserProfile.objects.create(user=user, role='farmer')
+            users.append((user, Token.objects.create(user=user).key))
+        return users
+
+    def _run(self, options):
+        n_threads = max(1, options['threads'])
+        per_thread = max(1, options['requests'])
+        users = self._create_users(n_threads)
+        latencies = []
+        codes = {}
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(n_threads + 1)
+        host = _client_host()
+
+        def worker(token):
+            client = Client(raise_request_exception=False)
+            local_lat, local_codes = [], {}
+            start_barrier.wait()
+            for _ in range(per_thread):
+                t0 = time.perf_counter()
+                resp = client.post(
+                    SUBMIT_URL,
+                    data=json.dumps(SAMPLE_APPLICATION),
+                    content_type='application/json',
+                    HTTP_AUTHORIZATION=f'Token {token}',
+                    HTTP_HOST=host,
+                )
+                local_lat.append((time.perf_counter() - t0) * 1000)
+                local_codes[resp.status_code] = local_codes.get(resp.status_code, 0) + 1
+            connection.close()
+            with lock:
+                latencies.extend(local_lat)
+                for code, count in local_codes.items():
+                    codes[code] = codes.get(code, 0) + count
+
+        with ExitStack() as stack:
+            if options['stub_models']:
+                # The view imports these from api.ml_service at call time
+                stack.enter_context(override_settings(SCORING_ASYNC=False))
+                stack.enter_context(mock.patch('api.ml_service.predict_eligibility', return_value=True))
+                stack.enter_context(mock.patch('api.ml_service.explain_eligibility', side_effect=lambda p: [None] * len(p)))
+                stack.enter_context(mock.patch('api.ml_service.predict_risk', return_value=42.0))
+                stack.enter_context(mock.patch('api.ml_service.recommend_amount', return_value=450000.0))
+            threads = [threading.Thread(target=worker, args=(token,)) for _, token in users]
+            for t in threads:
+                t.start()
+            start_barrier.wait()
+            started = time.perf_counter()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - started
+
+        if not options['keep']:
+            app_ids = list(LoanApplication.objects.filter(user__in=[u for u, _ in users]).values_list('id', flat=True))
+            Job.objects.filter(queue='scoring', payload__application_id__in=app_ids).delete()
+            User.objects.filter(id__in=[u.id for u, _ in users]).delete()
+
+        latencies.sort()
+        total = len(latencies)
+        ok = codes.get(201, 0) + codes.get(202, 0)
+        db = connections['default'].settings_dict
+        return {
+            'profile': current_profile(),
+            'engine': db['ENGINE'].rsplit('.', 1)[-1],
+            'conn_max_age': db.get('CONN_MAX_AGE'),
+            'threads': n_threads,
+            'requests': total,
+            'succeeded': ok,
+            'failed': total - ok,
+            'status_codes': {str(k): v for k, v in sorted(codes.items())},
+            'elapsed_s': round(elapsed, 3),
+            'writes_per_s': round(ok / elapsed, 1) if elapsed else 0.0,
+            'latency_ms': {
+                'p50': round(_percentile(latencies, 50), 2),
+                'p95': round(_percentile(latencies, 95), 2),
+                'p99': round(_percentile(latencies, 99), 2),
+                'max': round(latencies[-1], 2) if latencies else 0.0,
+            },
+        }
+
+    def _print(self, r):
+        self.stdout.write(
+            f"[{r['profile']}] {r['succeeded']}/{r['requests']} ok in {r['elapsed_s']}s "
+            f"-> {r['writes_per_s']} writes/s | p50 {r['latency_ms']['p50']}ms "
+            f"p95 {r['latency_ms']['p95']}ms p99 {r['latency_ms']['p99']}ms | codes {r['status_codes']}"
+        )
+
+    # ----- compare profiles -----
+
+    def _compare(self, options):
+        profiles = [p.strip() for p in options['compare'].split(',') if p.strip()]
+        unknown = [p for p in profiles if p not in PROFILES]
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(unknown)}")
+        manage_py = str(settings.BASE_DIR / 'manage.py')
+        child_args = ['--threads', str(options['threads']), '--requests', str(options['requests']), '--json']
+        if options['stub_models']:
+            child_args.append('--stub-models')
+
+        results = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for profile in profiles:
+                env = dict(os.environ, DJANGO_DB_PROFILE=profile)
+                if profile.startswith('sqlite'):
+                    env['DJANGO_DB_NAME'] = os.path.join(tmp, f'{profile}.sqlite3')
+                self.stdout.write(f"Running {profile}...")
+                subprocess.run([sys.executable, manage_py, 'migrate', '--noinput', '-v0'], env=env, check=True)
+                proc = subprocess.run(
+                    [sys.executable, manage_py, 'loadtestsubmit', *child_args],
+                    env=env, check=True, capture_output=True, text=True,
+                )
+                results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+        for r in results:
+            self._print(r)
+        if options['json']:
+            self.stdout.write(json.dumps(results))
@@ -0,0 +1,52 @@
+"""
+Post a mobile-money settlement file (CSV or JSON Lines) against repayment schedules.
+Run: python manage.py postrepayments settlement.csv [--dry-run] [--report unmatched.json]
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.repayment_service import DEFAULT_CHUNK_SIZE, check_utf8, detect_format, iter_rows, post_settlement
+
+
+class Command(BaseCommand):
+    help = "Bulk-post settlement payments to Repayment rows and print a reconciliation report"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Settlement file (.csv, .jsonl or .json)')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Override format detection')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Payments per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Reconcile without writing')
+        parser.add_argument('--report', help='Write the full reconciliation report as JSON to this path')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as fh:
+                check_utf8(fh)
+            with open(options['path'], 'r', encoding='utf-8-sig', newline='') as fh:
+                report = post_settlement(
+                    iter_rows(fh, fmt),
+                    chunk_size=max(1, options['chunk_size']),
+                    dry_run=options['dry_run'],
+                    progress=lambda r: self.stdout.write(f"  {r.rows} rows, {r.matched} matched"),
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except UnicodeDecodeError as exc:
+            raise CommandError(f"Settlement file must be UTF-8 encoded: {exc}")
+        elapsed = time.perf_counter() - started
+
+        data = report.as_dict()
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as out:
+                json.dump(data, out, indent=2)
+        rate = report.rows / elapsed if elapsed else 0.0
+        prefix = "[dry run] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{report.rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/s): "
+            f"{report.matched} matched ({report.paid} paid, {report.partial} partial, {report.overpaid} overpaid), "
+            f"{report.unmatched} unmatched, {report.invalid} invalid; posted {data['amount_posted']:,.2f} RWF"
+        ))
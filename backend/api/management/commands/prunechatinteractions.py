@@ -0,0 +1,55 @@
+"""
+Delete ChatInteraction rows older than the retention window, in chunks.
+Run: python manage.py prunechatinteractions [--days 90] [--chunk-size 5000] [--dry-run]
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import ChatInteraction
+
+
+class Command(BaseCommand):
+    help = "Delete chat interactions older than the retention window in small transactional chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'CHAT_LOG_RETENTION_DAYS', 90),
+            help='Keep interactions newer than this many days (default: CHAT_LOG_RETENTION_DAYS or 90)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows deleted per transaction')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to pause between chunks')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be deleted')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timezone.timedelta(days=options['days'])
+        chunk_size = max(1, options['chunk_size'])
+        expired = ChatInteraction.objects.filter(created_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"{expired.count()} chat interactions older than {cutoff.isoformat()} would be deleted")
+            return
+
+        total = 0
+        started = time.perf_counter()
+        while True:
+            # Select a bounded batch of ids via the created_at index, then delete by primary key
+            ids = list(expired.order_by('created_at').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                deleted, _ = ChatInteraction.objects.filter(id__in=ids).delete()
+            total += deleted
+            self.stdout.write(f"  deleted {deleted} (total {total})")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {total} chat interactions older than {cutoff.isoformat()} in {elapsed:.1f}s"
+        ))
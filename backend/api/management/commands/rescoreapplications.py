@@ -0,0 +1,226 @@
+"""
+Re-score stored loan applications after the models in loan_default_risk_model/ are retrained.
+Run:
+  python manage.py rescoreapplications --dry-run --report rescore_diff.json
+  python manage.py rescoreapplications --workers 4 --chunk-size 2000
+  python manage.py rescoreapplications --resume      # continue after an interruption
+
+Applications are streamed in id order with iterator(chunk_size=...). Each chunk is
+scored with one vectorized call per model (optionally in worker processes), its
+eligibility reasons are rebuilt from batch TreeSHAP attributions, and it is
+written back in one transaction. Applications still waiting for the scoring
+worker (status 'scoring') are skipped. The last written id is stored in JobCheckpoint
+('rescore_applications') after every chunk so --resume can pick up from there.
+"""
+import collections
+import json
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from api import response_cache
+from api.db_utils import bulk_update_rows
+from api.explanations import eligibility_reason
+from api.models import JobCheckpoint, LoanApplication
+from api.ml_service import application_to_ml_payload, score_batch
+
+CHECKPOINT_NAME = 'rescore_applications'
+PAYLOAD_FIELDS = (
+    'id', 'age', 'annual_income', 'credit_score', 'loan_amount_requested', 'loan_duration_months',
+    'employment_status', 'education_level', 'marital_status', 'loan_purpose',
+    'eligibility_approved', 'eligibility_reason', 'risk_score', 'recommended_amount',
+)
+UPDATE_FIELDS = ('eligibility_approved', 'eligibility_reason', 'risk_score', 'recommended_amount', 'updated_at')
+# Changed rows kept in the diff report
+DIFF_DETAIL_LIMIT = 500
+
+
+def _worker_init():
+    import django
+    django.setup()
+
+
+def _score(payloads, explain=True):
+    """Worker entry point: plain lists in, plain lists out (cheap to pickle)."""
+    scores = score_batch(payloads, explain=explain)
+    return (
+        scores['approved'].tolist(),
+        scores['risk_score'].tolist(),
+        scores['recommended_amount'].tolist(),
+        scores['factors'] if explain else [None] * len(payloads),
+    )
+
+
+def _pages(qs, size):
+    """
+    Keyset pagination by id: each page is a fresh bounded query streamed with
+    iterator(chunk_size=...), so no cursor stays open while results are written.
+    """
+    last_id = 0
+    while True:
+        page = list(qs.filter(id__gt=last_id)[:size].iterator(chunk_size=size))
+        if not page:
+            return
+        yield page
+        last_id = page[-1].id
+
+
+class Diff:
+    """Aggregate changes between stored and new scores."""
+
+    def __init__(self):
+        self.scored = 0
+        self.changed = 0
+        self.approval_flips = {'denied_to_approved': 0, 'approved_to_denied': 0, 'newly_scored': 0}
+        self.risk_abs_delta_sum = 0.0
+        self.risk_abs_delta_max = 0.0
+        self.amount_abs_delta_sum = 0.0
+        self.details = []
+
+    def add(self, app, approved, risk, amount):
+        self.scored += 1
+        old_approved = app.eligibility_approved
+        old_risk = app.risk_score
+        old_amount = float(app.recommended_amount) if app.recommended_amount is not None else None
+        risk_delta = abs(risk - old_risk) if old_risk is not None else None
+        amount_delta = abs((amount or 0) - (old_amount or 0))
+        if old_approved is None:
+            self.approval_flips['newly_scored'] += 1
+        elif old_approved != approved:
+            key = 'denied_to_approved' if approved else 'approved_to_denied'
+            self.approval_flips[key] += 1
+        if risk_delta is not None:
+            self.risk_abs_delta_sum += risk_delta
+            self.risk_abs_delta_max = max(self.risk_abs_delta_max, risk_delta)
+        self.amount_abs_delta_sum += amount_delta
+        changed = old_approved != approved or risk_delta is None or risk_delta > 1e-6 or amount_delta > 0.005
+        if changed:
+            self.changed += 1
+            if len(self.details) < DIFF_DETAIL_LIMIT:
+                self.details.append({
+                    'id': app.id,
+                    'eligibility_approved': [old_approved, approved],
+                    'risk_score': [old_risk, round(risk, 4)],
+                    'recommended_amount': [old_amount, round(amount, 2) if amount is not None else None],
+                })
+
+    def as_dict(self):
+        n = self.scored or 1
+        return {
+            'scored': self.scored,
+            'changed': self.changed,
+            'approval_changes': self.approval_flips,
+            'risk_score_mean_abs_delta': round(self.risk_abs_delta_sum / n, 4),
+            'risk_score_max_abs_delta': round(self.risk_abs_delta_max, 4),
+            'recommended_amount_mean_abs_delta': round(self.amount_abs_delta_sum / n, 2),
+            'changed_rows': self.details,
+        }
+
+
+class Command(BaseCommand):
+    help = "Recompute eligibility, risk score and recommended amount for stored loan applications"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Applications per scoring batch and transaction')
+        parser.add_argument('--workers', type=int, default=1, help='Parallel scoring processes (1 = score in-process)')
+        parser.add_argument('--status', choices=['pending', 'approved', 'rejected'], help='Only re-score applications with this status')
+        parser.add_argument('--dry-run', action='store_true', help='Score and report differences without writing')
+        parser.add_argument('--report', help='Write the diff report as JSON to this path')
+        parser.add_argument('--resume', action='store_true', help='Continue after the last checkpointed id')
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options['chunk_size'])
+        workers = max(1, options['workers'])
+        dry_run = options['dry_run']
+        start_after = 0
+        if options['resume']:
+            start_after = int(JobCheckpoint.get_position(CHECKPOINT_NAME) or 0)
+            self.stdout.write(f"Resuming after application id {start_after}")
+
+        qs = LoanApplication.objects.filter(id__gt=start_after).order_by('id').only(*PAYLOAD_FIELDS)
+        if options['status']:
+            qs = qs.filter(status=options['status'])
+        else:
+            # 'scoring' applications belong to the runjobs worker (api/application_scoring.py)
+            qs = qs.exclude(status='scoring')
+        total = qs.count()
+        self.stdout.write(f"{total} applications to re-score ({'dry run' if dry_run else 'writing'}, {workers} worker(s))")
+
+        # Fail fast if models are missing, before forking workers
+        try:
+            score_batch([])
+        except FileNotFoundError as exc:
+            raise CommandError(str(exc))
+
+        pool = None
+        if workers > 1:
+            # Workers only score; all database work stays in this process
+            connections.close_all()
+            pool = multiprocessing.Pool(workers, initializer=_worker_init)
+
+        diff = Diff()
+        started = time.perf_counter()
+        in_flight = collections.deque()
+        max_in_flight = workers * 2
+
+        def finish(apps, scores):
+            self._apply(apps, *scores, diff, dry_run)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"  {diff.scored}/{total} scored, {diff.changed} changed ({diff.scored / elapsed:,.0f} apps/s)")
+
+        try:
+            for apps in _pages(qs, chunk_size):
+                payloads = [application_to_ml_payload(a) for a in apps]
+                if pool is None:
+                    finish(apps, _score(payloads, explain=not dry_run))
+                    continue
+                # Keep a few chunks scoring in workers while this process writes results in order
+                in_flight.append((apps, pool.apply_async(_score, (payloads, not dry_run))))
+                while len(in_flight) >= max_in_flight:
+                    done_apps, result = in_flight.popleft()
+                    finish(done_apps, result.get())
+            while in_flight:
+                done_apps, result = in_flight.popleft()
+                finish(done_apps, result.get())
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if not dry_run:
+            JobCheckpoint.set_position(CHECKPOINT_NAME, '')
+            if diff.changed:
+                # bulk updates bypass the signals that expire cached dashboards
+                response_cache.invalidate_all()
+
+        report = diff.as_dict()
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as out:
+                json.dump(report, out, indent=2, default=str)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{'[dry run] ' if dry_run else ''}Re-scored {diff.scored} applications in {elapsed:.1f}s: "
+            f"{diff.changed} changed, approvals {report['approval_changes']}, "
+            f"mean |risk delta| {report['risk_score_mean_abs_delta']}"
+        ))
+
+    def _apply(self, apps, approved, risk, amount, factors, diff, dry_run):
+        now = timezone.now()
+        for app, ok, r, amt, app_factors in zip(apps, approved, risk, amount, factors):
+            new_amount = amt if ok else None
+            diff.add(app, ok, r, new_amount)
+            if dry_run:
+                continue
+            payload = application_to_ml_payload(app)
+            app.eligibility_approved = ok
+            app.eligibility_reason = eligibility_reason(payload, ok, app_factors)
+            app.risk_score = r
+            app.recommended_amount = round(new_amount, 2) if new_amount is not None else None
+            app.updated_at = now
+        if not dry_run:
+            bulk_update_rows(LoanApplication, apps, UPDATE_FIELDS)
+            JobCheckpoint.set_position(CHECKPOINT_NAME, apps[-1].id)
+
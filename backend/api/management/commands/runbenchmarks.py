@@ -0,0 +1,575 @@
+"""
+In-process benchmark suite for the ML, chat and dashboard hot paths.
+
+Run:
+  python manage.py runbenchmarks --output bench.json
+  python manage.py runbenchmarks --baseline bench.json --threshold 15
+  python manage.py runbenchmarks --only 'ml.*' --iterations 200
+  python manage.py runbenchmarks --sizes 1000,10000 --only 'dashboard*'
+  python manage.py runbenchmarks --chat-model tiny --only 'chat*,translation*'
+
+Everything runs against a throwaway test database (created the same way as for
+`manage.py test`) and requests go through the Django test client, so no server
+or network is needed and the real database is never touched. Dashboard cases
+are run on databases seeded with each of --sizes applications, with the response
+cache disabled so the uncached path is measured.
+
+For every case the report records latency percentiles, throughput and SQL
+queries per call. With --baseline, p50 latency and throughput are compared with
+a stored report and the command fails when a case got slower by more than
+--threshold percent or needs more queries per call.
+"""
+import fnmatch
+import importlib.util
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import types
+from contextlib import ExitStack
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+User = get_user_model()
+
+SAMPLE_PAYLOAD = {
+    'Age': 38,
+    'AnnualIncome': 42000,
+    'CreditScore': 640,
+    'LoanAmount': 15000,
+    'LoanDuration': 24,
+    'EmploymentStatus': 'Self-Employed',
+    'EducationLevel': 'High School',
+    'MaritalStatus': 'Married',
+    'HomeOwnershipStatus': 'Own',
+    'LoanPurpose': 'Other',
+}
+CHAT_MESSAGE = 'How can I qualify for a loan with a low credit score?'
+CANNED_REPLY = 'You can improve your chances by paying existing debts on time and keeping utilisation low.'
+TRANSLATION_TEXT = 'Repay your loan on time to keep a good credit history.'
+TRANSLATION_PAIRS = (('en', 'fr'), ('fr', 'en'), ('en', 'rw'), ('rw', 'en'))
+# Repayments created per seeded loan
+SEED_SCHEDULE_MONTHS = 12
+DASHBOARD_ENDPOINTS = (
+    ('farmer_applications', 'farmer', '/api/farmer/applications/'),
+    ('farmer_loans', 'farmer', '/api/farmer/loans/'),
+    ('farmer_repayments', 'farmer', '/api/farmer/repayments/'),
+    ('mfi_applications', 'mfi', '/api/mfi/applications/?status=pending'),
+    ('mfi_portfolio', 'mfi', '/api/mfi/portfolio/'),
+    ('mfi_portfolio_risk', 'mfi', '/api/mfi/portfolio/risk/?scenarios=2000'),
+    ('admin_stats', 'admin', '/api/admin/stats/'),
+    ('admin_users', 'admin', '/api/admin/users/'),
+)
+
+
+class Skip(Exception):
+    """Raised by a case setup when the case cannot run here (missing model or dependency)."""
+
+
+class Case:
+    def __init__(self, name, setup, units=1):
+        self.name = name
+        # setup() returns the callable to time, or raises Skip
+        self.setup = setup
+        self.units = units
+
+
+def _measure(fn, iterations, warmup, min_time):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        while len(latencies) < iterations or time.perf_counter() - started < min_time:
+            t0 = time.perf_counter()
+            fn()
+            latencies.append((time.perf_counter() - t0) * 1000)
+        elapsed = time.perf_counter() - started
+    lat = np.array(latencies)
+    return {
+        'iterations': len(latencies),
+        'latency_ms': {
+            'p50': round(float(np.percentile(lat, 50)), 4),
+            'p95': round(float(np.percentile(lat, 95)), 4),
+            'p99': round(float(np.percentile(lat, 99)), 4),
+            'mean': round(float(lat.mean()), 4),
+            'min': round(float(lat.min()), 4),
+            'max': round(float(lat.max()), 4),
+        },
+        'throughput_per_s': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'queries_per_call': round(len(queries) / len(latencies), 2),
+    }
+
+
+def _client_call(client, method, path, data=None, token=None, expect=200):
+    headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+
+    def call():
+        if method == 'post':
+            resp = client.post(path, data=json.dumps(data), content_type='application/json', **headers)
+        else:
+            resp = client.get(path, **headers)
+        if resp.status_code != expect:
+            raise CommandError(f"{method.upper()} {path} returned {resp.status_code}: {resp.content[:200]!r}")
+    return call
+
+
+def _ml_loaded():
+    from api import ml_service
+    try:
+        ml_service._load_artifacts()
+    except FileNotFoundError as exc:
+        raise Skip(str(exc))
+    return ml_service
+
+
+# ----- chat / translation models -----
+
+def _stub_translation_module():
+    """Identity translation, so stubbed chat runs need neither transformers nor MarianMT weights."""
+    from api.translation_service import Translation
+    module = types.ModuleType('api.translation_service')
+    module.to_english = lambda text, source_lang: text
+    module.from_english = lambda text, target_lang: text
+    module.translate_to_english = lambda text, source_lang: Translation(text, False)
+    module.translate_from_english = lambda text, target_lang: Translation(text, False)
+    return module
+
+
+def _tiny_chat_model(seed):
+    """Randomly initialised 2-layer T5 with the saved tokenizer: exercises real generation at low cost."""
+    from api import chatbot_service
+    try:
+        import tensorflow as tf
+        from transformers import T5Config, T5TokenizerFast, TFT5ForConditionalGeneration
+    except ImportError as exc:
+        raise Skip(f'tiny chat model needs tensorflow and transformers ({exc})')
+    if not chatbot_service.CHATBOT_MODEL_DIR.exists():
+        raise Skip(f'tokenizer not found: {chatbot_service.CHATBOT_MODEL_DIR}')
+    tokenizer = T5TokenizerFast.from_pretrained(str(chatbot_service.CHATBOT_MODEL_DIR))
+    config = T5Config(
+        vocab_size=len(tokenizer), d_model=64, d_ff=128, d_kv=16, num_layers=2, num_decoder_layers=2,
+        num_heads=4, pad_token_id=tokenizer.pad_token_id, eos_token_id=tokenizer.eos_token_id,
+        decoder_start_token_id=tokenizer.pad_token_id,
+    )
+    tf.random.set_seed(seed)
+    return tokenizer, TFT5ForConditionalGeneration(config)
+
+
+class Command(BaseCommand):
+    help = "Benchmark ML scoring, chat and dashboard endpoints in-process and compare against a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', default='', help="Comma-separated glob patterns of case names (e.g. 'ml.*,api.*')")
+        parser.add_argument('--iterations', type=int, default=50, help='Timed calls per case')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed calls per case before timing')
+        parser.add_argument('--min-time', type=float, default=0.0, help='Keep timing each case for at least this many seconds')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Payloads per call for batch ML cases')
+        parser.add_argument('--sizes', default='1000', help='Comma-separated seeded application counts for dashboard cases')
+        parser.add_argument(
+            '--chat-model', choices=['stub', 'tiny', 'saved'], default='stub',
+            help='stub: canned reply and identity translation (view overhead only); tiny: random 2-layer T5; '
+                 'saved: the model in saved-model/',
+        )
+        parser.add_argument('--seed', type=int, default=2024, help='Seed for generated data and the tiny model')
+        parser.add_argument('--output', help='Write the JSON report to this path')
+        parser.add_argument('--baseline', help='Compare against a report written earlier with --output')
+        parser.add_argument('--threshold', type=float, default=10.0, help='Allowed slowdown in percent before a case counts as regressed')
+        parser.add_argument('--json', action='store_true', help='Print the JSON report instead of a table')
+
+    def handle(self, *args, **options):
+        patterns = [p.strip() for p in options['only'].split(',') if p.strip()]
+        try:
+            sizes = sorted({int(s) for s in options['sizes'].split(',') if s.strip()})
+        except ValueError:
+            raise CommandError('--sizes must be comma-separated integers')
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as fh:
+                    baseline = json.load(fh)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline: {exc}")
+
+        self.options = options
+        self.patterns = patterns
+        self.rng = random.Random(options['seed'])
+        results = []
+        # Offline: cached Hugging Face models only
+        os.environ.setdefault('HF_HUB_OFFLINE', '1')
+        os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Request timing stays on (it is part of the cost of a request); only its log lines go.
+            # Admission control would rate-limit the benchmark's own single client.
+            with override_settings(RESPONSE_CACHE_ENABLED=False, PERF_LOG_REQUESTS=False, ADMISSION_ENABLED=False):
+                self.client = Client(raise_request_exception=True)
+                self.seeded = 0
+                self.tokens = self._create_users()
+                results += self._run(self._ml_cases())
+                results += self._run(self._chat_cases())
+                for size in sizes:
+                    dashboard = self._dashboard_cases(size)
+                    if any(self._selected(case.name) for case in dashboard):
+                        self._seed(size)
+                    results += self._run(dashboard)
+        finally:
+            from api.chat_log_service import chat_writer
+            chat_writer.flush()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {'environment': self._environment(), 'options': self._recorded_options(sizes), 'results': results}
+        if baseline is not None:
+            report['comparison'] = _compare(baseline, results, options['threshold'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as out:
+                json.dump(report, out, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+        else:
+            self._print(report)
+        regressions = [c for c in report.get('comparison', []) if c['status'] == 'regressed']
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} case(s) regressed by more than {options['threshold']}%: "
+                + ', '.join(c['name'] for c in regressions)
+            )
+
+    # ----- running -----
+
+    def _selected(self, name):
+        return not self.patterns or any(fnmatch.fnmatchcase(name, p) for p in self.patterns)
+
+    def _run(self, cases):
+        results = []
+        for case in cases:
+            if not self._selected(case.name):
+                continue
+            self.stdout.write(f"  {case.name}...", ending='')
+            self.stdout.flush()
+            try:
+                with ExitStack() as stack:
+                    fn = case.setup(stack)
+                    result = _measure(fn, max(1, self.options['iterations']), max(0, self.options['warmup']), self.options['min_time'])
+            except Skip as exc:
+                self.stdout.write(f" skipped ({exc})")
+                results.append({'name': case.name, 'skipped': str(exc)})
+                continue
+            result = {'name': case.name, 'units_per_call': case.units, **result}
+            if case.units > 1:
+                result['units_per_s'] = round(result['throughput_per_s'] * case.units, 1)
+            self.stdout.write(f" p50 {result['latency_ms']['p50']:.3f} ms")
+            results.append(result)
+        return results
+
+    # ----- cases -----
+
+    def _ml_cases(self):
+        n = max(1, self.options['batch_size'])
+        batch = [self._random_payload() for _ in range(n)]
+
+        def encode_single(stack):
+            ml = _ml_loaded()
+            return lambda: ml._payload_to_vector(SAMPLE_PAYLOAD)
+
+        def validate_batch(stack):
+            ml = _ml_loaded()
+            return lambda: ml.validate_payloads(batch)
+
+        def predict_single(stack):
+            ml = _ml_loaded()
+
+            def call():
+                # The three model calls made when a farmer submits an application
+                ml.predict_eligibility(SAMPLE_PAYLOAD)
+                ml.predict_risk(SAMPLE_PAYLOAD)
+                ml.recommend_amount(SAMPLE_PAYLOAD)
+            return call
+
+        def explain_single(stack):
+            ml = _ml_loaded()
+            return lambda: ml.explain_eligibility([SAMPLE_PAYLOAD])
+
+        def score_batch(stack):
+            ml = _ml_loaded()
+            return lambda: ml.score_batch(batch)
+
+        def score_batch_explained(stack):
+            ml = _ml_loaded()
+            return lambda: ml.score_batch(batch, explain=True)
+
+        def endpoint(path, data):
+            def setup(stack):
+                _ml_loaded()
+                return _client_call(self.client, 'post', path, data)
+            return setup
+
+        what_if = {'payload': SAMPLE_PAYLOAD, 'sweep': {'LoanAmount': {'start': 5000, 'stop': 50000, 'steps': 20},
+                                                        'LoanDuration': [12, 24, 36, 48, 60]}}
+        return [
+            Case('ml.encode_single', encode_single),
+            Case(f'ml.validate_batch[{n}]', validate_batch, units=n),
+            Case('ml.predict_single', predict_single),
+            Case('ml.explain_single', explain_single),
+            Case(f'ml.score_batch[{n}]', score_batch, units=n),
+            Case(f'ml.score_batch_explained[{n}]', score_batch_explained, units=n),
+            Case('api.eligibility', endpoint('/api/eligibility/', SAMPLE_PAYLOAD)),
+            Case('api.risk', endpoint('/api/risk/', SAMPLE_PAYLOAD)),
+            Case('api.recommend_amount', endpoint('/api/recommend-amount/', SAMPLE_PAYLOAD)),
+            Case('api.what_if[100]', endpoint('/api/what-if/', what_if), units=100),
+        ]
+
+    def _install_chat_model(self, stack):
+        """Make the chatbot use the model selected with --chat-model (greedy decoding, no reply or encoder cache, for stable timings)."""
+        from api import chatbot_service, encoder_cache
+        mode = self.options['chat_model']
+        if mode == 'stub':
+            canned = chatbot_service.ChatReply(CANNED_REPLY, 'greedy', 0, 'eos', False)
+            stack.enter_context(mock.patch.object(chatbot_service, 'decode_reply', lambda message, **kw: canned))
+            return
+        if mode == 'tiny':
+            tokenizer, model = _tiny_chat_model(self.options['seed'])
+            stack.enter_context(mock.patch.object(chatbot_service, '_tokenizer', tokenizer))
+            stack.enter_context(mock.patch.object(chatbot_service, '_model', model))
+        elif not chatbot_service.is_available():
+            raise Skip(f'saved chat model unavailable ({chatbot_service.get_load_error()})')
+        stack.enter_context(mock.patch.object(chatbot_service, 'choose_profile', lambda *args, **kw: 'greedy'))
+        stack.enter_context(mock.patch.object(chatbot_service, 'REPLY_CACHE_SIZE', 0))
+        stack.enter_context(mock.patch.object(encoder_cache.cache, 'max_bytes', 0))
+
+    def _install_translation(self, stack):
+        if self.options['chat_model'] == 'stub' or not _translation_importable():
+            stack.enter_context(mock.patch.dict(sys.modules, {'api.translation_service': _stub_translation_module()}))
+
+    def _chat_cases(self):
+        def generate(mode):
+            def setup(stack):
+                from api import chatbot_service
+                if self.options['chat_model'] == 'stub':
+                    raise Skip('generation is stubbed; use --chat-model tiny or saved')
+                self._install_chat_model(stack)
+                stack.enter_context(mock.patch.object(chatbot_service, 'GENERATION_MODE', mode))
+                # Trace and compile the graph for this input and token bucket before timing
+                chatbot_service.generate_reply(CHAT_MESSAGE, profile='greedy')
+                return lambda: chatbot_service.generate_reply(CHAT_MESSAGE, profile='greedy')
+            return setup
+
+        def chat_endpoint(language):
+            def setup(stack):
+                self._install_chat_model(stack)
+                self._install_translation(stack)
+                return _client_call(self.client, 'post', '/api/chat/', {'message': CHAT_MESSAGE, 'language': language})
+            return setup
+
+        def translate(source, target):
+            def setup(stack):
+                if self.options['chat_model'] == 'stub':
+                    raise Skip('translation is stubbed; use --chat-model tiny or saved')
+                if not _translation_importable():
+                    raise Skip('transformers is not installed')
+                from api import encoder_cache, translation_service
+                loader = getattr(translation_service, f'_{source}_{target}')
+                try:
+                    loader()
+                except Exception as exc:
+                    raise Skip(f'{source}->{target} model not available offline ({type(exc).__name__})')
+                # The same text every call: measure the encoder too
+                stack.enter_context(mock.patch.object(encoder_cache.cache, 'max_bytes', 0))
+                return lambda: translation_service._translate(TRANSLATION_TEXT, loader, pair=f'{source}-{target}')
+            return setup
+
+        cases = [Case('chat.generate', generate('eager')), Case('chat.generate[xla]', generate('xla'))]
+        cases += [Case(f'translation.{s}_{t}', translate(s, t)) for s, t in TRANSLATION_PAIRS]
+        cases += [Case(f'api.chat.{lang}', chat_endpoint(lang)) for lang in ('en', 'fr', 'rw')]
+        return cases
+
+    def _dashboard_cases(self, size):
+        def endpoint(role, path):
+            return lambda stack: _client_call(self.client, 'get', path, token=self.tokens[role])
+        return [Case(f'dashboard[{size}].{name}', endpoint(role, path)) for name, role, path in DASHBOARD_ENDPOINTS]
+
+    # ----- data -----
+
+    def _random_payload(self):
+        from api.ml_service import CATEGORICAL_OPTIONS, DEFAULT_NUMERIC
+        rng = self.rng
+        payload = {k: v * rng.uniform(0.5, 1.5) for k, v in DEFAULT_NUMERIC.items()}
+        payload.update({k: rng.choice(options) for k, options in CATEGORICAL_OPTIONS.items()})
+        payload.update(Age=rng.randint(21, 65), CreditScore=rng.randint(450, 800), LoanDuration=rng.choice([12, 24, 36, 48]))
+        return payload
+
+    def _create_users(self):
+        from api.models import UserProfile
+        from rest_framework.authtoken.models import Token
+        tokens = {}
+        for role in ('farmer', 'microfinance', 'admin'):
+            username = f'bench-{role}@test.agrifinconnect.rw'
+            user = User.objects.create_user(username=username, email=username, password=None,
+                                            is_staff=role == 'admin')
+            UserProfile.objects.create(user=user, role=role)
+            tokens['mfi' if role == 'microfinance' else role] = Token.objects.create(user=user).key
+        self.farmer = User.objects.get(username='bench-farmer@test.agrifinconnect.rw')
+        return tokens
+
+    def _seed(self, size):
+        """Top the test database up to `size` applications, with loans and repayment schedules for approved ones."""
+        from api.models import Loan, LoanApplication, Repayment, UserProfile
+        missing = size - self.seeded
+        if missing <= 0:
+            return
+        rng = self.rng
+        started = time.perf_counter()
+        with transaction.atomic():
+            # About ten applications per farmer; the benchmark farmer owns a share like any other
+            n_farmers = max(1, missing // 10)
+            first = User.objects.count()
+            farmers = User.objects.bulk_create(
+                [User(username=f'bench-seed-{first + i}@test.agrifinconnect.rw') for i in range(n_farmers)],
+                batch_size=1000,
+            )
+            UserProfile.objects.bulk_create([UserProfile(user=u, role='farmer') for u in farmers], batch_size=1000)
+            owners = farmers + [self.farmer]
+            apps = []
+            for _ in range(missing):
+                status = rng.choices(('pending', 'approved', 'rejected'), weights=(3, 5, 2))[0]
+                amount = Decimal(rng.randrange(100_000, 2_000_000, 1000))
+                apps.append(LoanApplication(
+                    user=rng.choice(owners),
+                    age=rng.randint(21, 65),
+                    annual_income=Decimal(rng.randrange(300_000, 6_000_000, 1000)),
+                    credit_score=rng.randint(450, 800),
+                    loan_amount_requested=amount,
+                    loan_duration_months=rng.choice((6, 12, 18, 24)),
+                    eligibility_approved=status != 'rejected',
+                    eligibility_reason='Seeded for benchmarks.',
+                    risk_score=round(rng.uniform(25, 75), 2),
+                    recommended_amount=amount if status != 'rejected' else None,
+                    status=status,
+                ))
+            apps = LoanApplication.objects.bulk_create(apps, batch_size=1000)
+            approved = [a for a in apps if a.status == 'approved']
+            loans = Loan.objects.bulk_create([
+                Loan(application=a, amount=a.loan_amount_requested, duration_months=a.loan_duration_months,
+                     monthly_payment=(a.loan_amount_requested / a.loan_duration_months).quantize(Decimal('0.01')))
+                for a in approved
+            ], batch_size=1000)
+            today = date.today()
+            repayments = []
+            for loan in loans:
+                start = today - timedelta(days=30 * rng.randint(0, SEED_SCHEDULE_MONTHS))
+                for month in range(min(loan.duration_months, SEED_SCHEDULE_MONTHS)):
+                    due = start + timedelta(days=30 * (month + 1))
+                    paid = due < today and rng.random() < 0.85
+                    repayments.append(Repayment(
+                        loan=loan, amount=loan.monthly_payment, due_date=due,
+                        status='paid' if paid else ('overdue' if due < today else 'pending'),
+                        amount_paid=loan.monthly_payment if paid else Decimal('0'),
+                    ))
+            Repayment.objects.bulk_create(repayments, batch_size=2000)
+        self.seeded = size
+        self.stdout.write(
+            f"Seeded {size} applications ({len(loans)} new loans, {len(repayments)} repayments) "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    # ----- reporting -----
+
+    def _environment(self):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, timeout=5,
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        import django
+        return {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'database': connection.vendor,
+            'git_commit': commit,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        }
+
+    def _recorded_options(self, sizes):
+        keys = ('only', 'iterations', 'warmup', 'min_time', 'batch_size', 'chat_model', 'seed', 'threshold')
+        return {**{k: self.options[k] for k in keys}, 'sizes': sizes}
+
+    def _print(self, report):
+        self.stdout.write('')
+        self.stdout.write(f"{'case':<44} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'calls/s':>10} {'queries':>8}")
+        for r in report['results']:
+            if 'skipped' in r:
+                self.stdout.write(f"{r['name']:<44} skipped: {r['skipped']}")
+                continue
+            lat = r['latency_ms']
+            self.stdout.write(
+                f"{r['name']:<44} {lat['p50']:>10.3f} {lat['p95']:>10.3f} {lat['p99']:>10.3f} "
+                f"{r['throughput_per_s']:>10.1f} {r['queries_per_call']:>8.1f}"
+            )
+        comparison = report.get('comparison')
+        if comparison:
+            self.stdout.write('')
+            self.stdout.write(f"{'case':<44} {'baseline p50':>12} {'p50':>10} {'change':>8}  status")
+            for c in comparison:
+                style = {'regressed': self.style.ERROR, 'improved': self.style.SUCCESS}.get(c['status'], str)
+                self.stdout.write(style(
+                    f"{c['name']:<44} {c['baseline_p50_ms']:>12.3f} {c['p50_ms']:>10.3f} {c['p50_change_pct']:>+7.1f}%  {c['status']}"
+                ))
+
+
+def _translation_importable():
+    return importlib.util.find_spec('transformers') is not None
+
+
+def _compare(baseline, results, threshold):
+    """
+    Per case present in both reports: p50 and throughput change, and regressed/improved/unchanged.
+    A case regresses when p50 grows by more than `threshold` percent or it makes more queries per call.
+    """
+    previous = {r['name']: r for r in baseline.get('results', []) if 'latency_ms' in r}
+    comparison = []
+    for r in results:
+        base = previous.get(r['name'])
+        if base is None or 'latency_ms' not in r:
+            continue
+        base_p50, p50 = base['latency_ms']['p50'], r['latency_ms']['p50']
+        change = (p50 / base_p50 - 1) * 100 if base_p50 else 0.0
+        base_tp = base.get('throughput_per_s') or 0.0
+        tp_change = (r['throughput_per_s'] / base_tp - 1) * 100 if base_tp else 0.0
+        more_queries = r['queries_per_call'] - (base.get('queries_per_call') or 0.0) >= 1
+        if change > threshold or more_queries:
+            status = 'regressed'
+        elif change < -threshold:
+            status = 'improved'
+        else:
+            status = 'unchanged'
+        comparison.append({
+            'name': r['name'],
+            'baseline_p50_ms': base_p50,
+            'p50_ms': p50,
+            'p50_change_pct': round(change, 1),
+            'throughput_change_pct': round(tp_change, 1),
+            'baseline_queries_per_call': base.get('queries_per_call'),
+            'queries_per_call': r['queries_per_call'],
+            'status': status,
+        })
+    return comparison
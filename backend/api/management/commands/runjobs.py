@@ -0,0 +1,98 @@
+"""
+Worker for the database-backed job queue (api/job_queue.py), e.g. asynchronous scoring of
+submitted loan applications.
+Run:
+  python manage.py runjobs                          # scoring queue, until SIGTERM/Ctrl-C
+  python manage.py runjobs --batch-size 500 --visibility-timeout 600
+  python manage.py runjobs --once                   # drain what is ready, then exit (cron)
+
+Each iteration claims up to --batch-size ready jobs and hands them to the queue's handler
+in one call (scoring runs the models once per batch). Several workers can run side by side,
+on one host or many: a job is claimed by exactly one of them, and if a worker dies its jobs
+are picked up again after --visibility-timeout seconds. SIGTERM finishes the current batch
+before exiting. Done jobs older than JOB_RETENTION_HOURS are pruned while idle.
+"""
+import os
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import job_queue
+
+# Seconds between prunes of finished jobs
+PRUNE_INTERVAL_SECONDS = 600
+
+
+class Command(BaseCommand):
+    help = 'Process background jobs (asynchronous application scoring) from the database queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', default='scoring', help=f"Queue to work on ({', '.join(job_queue.QUEUES)})")
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'JOB_BATCH_SIZE', 100),
+                            help='Jobs claimed and processed together (default JOB_BATCH_SIZE)')
+        parser.add_argument('--visibility-timeout', type=int,
+                            default=getattr(settings, 'JOB_VISIBILITY_TIMEOUT_SECONDS', 300),
+                            help='Seconds a claimed batch may take before other workers may take it over')
+        parser.add_argument('--poll-interval', type=float, default=getattr(settings, 'JOB_POLL_SECONDS', 1.0),
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit when no job is ready instead of polling')
+        parser.add_argument('--max-batches', type=int, default=0, help='Exit after this many batches (0 = no limit)')
+
+    def handle(self, *args, **options):
+        queue = options['queue']
+        if queue not in job_queue.QUEUES:
+            raise CommandError(f"Unknown queue '{queue}'; choose from {', '.join(job_queue.QUEUES)}")
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['visibility_timeout'] < 1:
+            raise CommandError('--visibility-timeout must be at least 1')
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+
+        self._stopping = False
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._stop)
+
+        self.stdout.write(f"Worker {worker_id} on queue '{queue}' (batch {batch_size}, "
+                          f"visibility timeout {options['visibility_timeout']}s)")
+        totals = {'done': 0, 'retried': 0, 'failed': 0}
+        batches = 0
+        last_prune = 0.0
+        while not self._stopping:
+            jobs = job_queue.claim(queue, batch_size, worker_id, options['visibility_timeout'])
+            if not jobs:
+                if time.monotonic() - last_prune > PRUNE_INTERVAL_SECONDS:
+                    pruned = job_queue.prune(getattr(settings, 'JOB_RETENTION_HOURS', 24))
+                    if pruned:
+                        self.stdout.write(f'Pruned {pruned} finished job(s)')
+                    last_prune = time.monotonic()
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            started = time.perf_counter()
+            done, retried, failed = job_queue.run_batch(queue, jobs)
+            elapsed = time.perf_counter() - started
+            totals['done'] += done
+            totals['retried'] += retried
+            totals['failed'] += failed
+            batches += 1
+            self.stdout.write(
+                f'Batch of {len(jobs)}: {done} done, {retried} retried, {failed} failed '
+                f'in {elapsed:.2f}s ({len(jobs) / elapsed if elapsed else 0:.1f} jobs/s)'
+            )
+            if options['max_batches'] and batches >= options['max_batches']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Stopped after {batches} batch(es): {totals['done']} done, {totals['retried']} retried, "
+            f"{totals['failed']} failed"
+        ))
+
+    def _stop(self, signum, frame):
+        self.stdout.write('Stopping after the current batch...')
+        self._stopping = True
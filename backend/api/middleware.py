@@ -0,0 +1,103 @@
+"""
+RequestTimingMiddleware: stage timings, SQL query stats, Server-Timing header,
+one structured log line and histogram aggregation per request (see api/request_metrics.py).
+
+Enabled with PERF_METRICS_ENABLED (default on); PERF_SERVER_TIMING=0 drops the
+header, PERF_LOG_REQUESTS=0 the log lines. Requests slower than
+PERF_SLOW_REQUEST_MS are logged at WARNING, the rest at INFO, which the
+`api.perf` logger drops unless PERF_LOG_LEVEL=INFO.
+
+RequestProfilingMiddleware: sampled or cProfile captures of picked and slow
+requests (see api/profiling.py). Off unless PROFILING_ENABLED=1.
+"""
+import contextlib
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import request_metrics
+
+logger = logging.getLogger('api.perf')
+
+
+class RequestTimingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERF_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'PERF_SERVER_TIMING', True)
+        self.log_requests = getattr(settings, 'PERF_LOG_REQUESTS', True)
+        self.slow_seconds = getattr(settings, 'PERF_SLOW_REQUEST_MS', 1000) / 1000
+
+    def __call__(self, request):
+        timings, token = request_metrics.begin()
+        started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.record_query))
+                response = self.get_response(request)
+        finally:
+            request_metrics.end(token)
+        total = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        # The URL pattern, not the path, keeps label cardinality bounded
+        route = match.route if match is not None else 'unmatched'
+        request_metrics.registry.observe(timings, total, request.method, route, response.status_code)
+        if self.server_timing:
+            response['Server-Timing'] = request_metrics.server_timing(timings, total)
+        if self.log_requests:
+            level = logging.WARNING if total >= self.slow_seconds else logging.INFO
+            if logger.isEnabledFor(level):
+                record = request_metrics.log_record(timings, total, request.method, route, response.status_code)
+                logger.log(level, json.dumps(record), extra={'perf': record})
+        return response
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.mode = getattr(settings, 'PROFILE_MODE', 'sample')
+        self.rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0.0)
+        self.slow_seconds = getattr(settings, 'PROFILE_SLOW_MS', 0) / 1000
+        self.interval = getattr(settings, 'PROFILE_INTERVAL_MS', 5) / 1000
+        self.paths = tuple(getattr(settings, 'PROFILE_PATHS', ()))
+
+    def __call__(self, request):
+        if self.paths and not request.path.startswith(self.paths):
+            return self.get_response(request)
+        picked = self.rate > 0 and random.random() < self.rate
+        if not picked and not self.slow_seconds:
+            return self.get_response(request)
+
+        from . import profiling
+        capture = profiling.start_capture(self.mode, self.interval)
+        if capture is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiling.stop_capture(capture)
+        duration = time.perf_counter() - started
+
+        slow = bool(self.slow_seconds) and duration >= self.slow_seconds
+        if (picked or slow) and capture.samples != 0:
+            match = getattr(request, 'resolver_match', None)
+            route = match.route if match is not None else 'unmatched'
+            try:
+                endpoint, profile_id = profiling.get_store().save(
+                    capture, route, duration, response.status_code, 'slow' if slow else 'sampled')
+            except OSError:
+                logger.exception("Could not save request profile for %s", route)
+            else:
+                response['X-Profile-Id'] = f'{endpoint}/{profile_id}'
+        return response
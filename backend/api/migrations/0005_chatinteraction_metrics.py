@@ -0,0 +1,43 @@
+# Generated migration for ChatInteraction latency/cache metrics
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_loan_workflow_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatinteraction',
+            name='model_available',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='chatinteraction',
+            name='model_latency_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatinteraction',
+            name='reply_cache_hit',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='chatinteraction',
+            name='translation_cache_hit',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='chatinteraction',
+            name='translation_latency_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='chatinteraction',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
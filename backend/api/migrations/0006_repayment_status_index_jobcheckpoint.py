@@ -0,0 +1,29 @@
+# Generated migration for overdue sweeper index and api.JobCheckpoint
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_chatinteraction_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'api_jobcheckpoint',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='repayment',
+            index=models.Index(fields=['status', 'due_date'], name='api_repay_status_due_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated migration for repayment settlement postings
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_repayment_status_index_jobcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='repayment',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='repayment',
+            name='payment_reference',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated migration for the database-backed job queue (api.Job) and the 'scoring' application status
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_repayment_amount_paid'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='loanapplication',
+            name='status',
+            field=models.CharField(choices=[('scoring', 'Scoring'), ('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queue', models.CharField(max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'api_job',
+                'indexes': [
+                    models.Index(fields=['queue', 'status', 'run_after'], name='api_job_claim_idx'),
+                    models.Index(fields=['status', 'finished_at'], name='api_job_finished_idx'),
+                ],
+            },
+        ),
+    ]
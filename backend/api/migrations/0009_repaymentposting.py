@@ -0,0 +1,41 @@
+# Generated migration for per-reference settlement postings (api.RepaymentPosting)
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_postings(apps, schema_editor):
+    """Record the one reference kept on each repayment so re-posting older files stays a duplicate."""
+    Repayment = apps.get_model('api', 'Repayment')
+    RepaymentPosting = apps.get_model('api', 'RepaymentPosting')
+    rows = Repayment.objects.exclude(payment_reference='').values_list('id', 'payment_reference', 'amount_paid')
+    RepaymentPosting.objects.bulk_create(
+        (RepaymentPosting(repayment_id=rid, reference=ref, amount=paid) for rid, ref, paid in rows.iterator()),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepaymentPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.CharField(max_length=100)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('repayment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='api.repayment')),
+            ],
+            options={
+                'db_table': 'api_repaymentposting',
+                'constraints': [models.UniqueConstraint(fields=('repayment', 'reference'), name='api_repayposting_ref_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_postings, migrations.RunPython.noop),
+    ]
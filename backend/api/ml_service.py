@@ -2,11 +2,12 @@
 Load ML models and run inference. Uses artifacts from loan_default_risk_model/.
 """
 import os
-import joblib
 import numpy as np
 from pathlib import Path
 from django.conf import settings
 
+from . import request_metrics
+
 MODELS_DIR = getattr(settings, 'MODELS_DIR', None) or Path(__file__).resolve().parent.parent.parent / 'loan_default_risk_model'
 
 # Categorical columns and their allowed values (sorted order to match sklearn LabelEncoder)
@@ -50,6 +51,39 @@ DEFAULT_NUMERIC = {
     'TotalDebtToIncomeRatio': 0.35,
 }
 
+# Plausible (low, high) per numeric feature; None = unbounded. Values outside are reported, not clipped.
+NUMERIC_BOUNDS = {
+    'Age': (18, 100),
+    'AnnualIncome': (0, None),
+    'CreditScore': (300, 850),
+    'Experience': (0, 80),
+    'LoanAmount': (0, None),
+    'LoanDuration': (1, 360),
+    'NumberOfDependents': (0, 20),
+    'MonthlyDebtPayments': (0, None),
+    'CreditCardUtilizationRate': (0, 1),
+    'NumberOfOpenCreditLines': (0, None),
+    'NumberOfCreditInquiries': (0, None),
+    'DebtToIncomeRatio': (0, None),
+    'BankruptcyHistory': (0, 1),
+    'PreviousLoanDefaults': (0, 1),
+    'PaymentHistory': (0, None),
+    'LengthOfCreditHistory': (0, 80),
+    'SavingsAccountBalance': (0, None),
+    'TotalAssets': (0, None),
+    'TotalLiabilities': (0, None),
+    'MonthlyIncome': (0, None),
+    'UtilityBillsPaymentHistory': (0, 1),
+    'JobTenure': (0, 80),
+    'BaseInterestRate': (0, 1),
+    'InterestRate': (0, 1),
+    'MonthlyLoanPayment': (0, None),
+    'TotalDebtToIncomeRatio': (0, None),
+}
+
+# 'warn': invalid values are imputed and reported; 'reject': ML endpoints answer 400 for invalid payloads
+VALIDATION_MODE = getattr(settings, 'ML_VALIDATION_MODE', 'warn')
+
 _models = {}
 
 
@@ -58,6 +92,13 @@ def _load_artifacts():
         return
     if not MODELS_DIR.exists():
         raise FileNotFoundError(f"Models directory not found: {MODELS_DIR}")
+    with request_metrics.stage('ml.load'):
+        _load_pickles()
+
+
+def _load_pickles():
+    # joblib is imported here, not at module level: it costs ~90 ms and only model loading needs it
+    import joblib
     _models['feature_cols'] = joblib.load(MODELS_DIR / 'feature_columns.pkl')
     _models['scaler'] = joblib.load(MODELS_DIR / 'scaler.pkl')
     _models['label_encoder'] = joblib.load(MODELS_DIR / 'label_encoder.pkl')
@@ -66,43 +107,245 @@ def _load_artifacts():
     _models['amount_regressor'] = joblib.load(MODELS_DIR / 'loan_amount_regressor.pkl')
 
 
-def _encode_categorical(name, value):
-    options = CATEGORICAL_OPTIONS.get(name, [])
-    if not options:
-        return 0
-    val_str = str(value).strip()
-    try:
-        return options.index(val_str)
-    except ValueError:
-        return 0
+def _schema():
+    """FeatureSchema for the loaded feature columns, compiled on first use."""
+    _load_artifacts()
+    if 'schema' not in _models:
+        from .feature_schema import FeatureSchema
+        _models['schema'] = FeatureSchema(_models['feature_cols'], CATEGORICAL_OPTIONS, DEFAULT_NUMERIC, NUMERIC_BOUNDS)
+    return _models['schema']
+
+
+def validate_payloads(payloads):
+    """
+    Validate and coerce many payloads in one pass. Returns a feature_schema.Validation:
+    .X (model matrix in feature_cols order), .imputed flags, .errors per row, .row(i), .summary().
+    """
+    schema = _schema()
+    with request_metrics.stage('ml.encode'):
+        return schema.validate(payloads)
+
+
+def _scale(X):
+    with request_metrics.stage('ml.scale'):
+        return _models['scaler'].transform(X)
 
 
 def _payload_to_vector(payload, include_loan_amount=True):
     """Build feature vector in feature_cols order. If include_loan_amount=False, exclude LoanAmount."""
+    X = validate_payloads([payload]).X
+    if not include_loan_amount:
+        X = X[:, [i for i, c in enumerate(_models['feature_cols']) if c != 'LoanAmount']]
+    return X
+
+
+def _payloads_to_matrix(payloads):
+    """Build an (n, n_features) matrix in feature_cols order for many payloads, one column at a time."""
+    return validate_payloads(payloads).X
+
+
+def score_batch(payloads, explain=False):
+    """
+    Run all three models on many payloads with one scaler pass and one predict call per model.
+    Returns dict of numpy arrays: approved (bool), risk_score, recommended_amount.
+    With explain=True also returns 'factors': per payload, the top eligibility attributions
+    (see explain_eligibility), or None when attributions are unavailable.
+    """
+    _load_artifacts()
+    if not payloads:
+        empty = np.empty(0)
+        result = {'approved': empty.astype(bool), 'risk_score': empty, 'recommended_amount': empty}
+        if explain:
+            result['factors'] = []
+        return result
+    X = _payloads_to_matrix(payloads)
+    X_scaled = _scale(X)
+    feature_cols = _models['feature_cols']
+    idx_no_loan = [i for i, c in enumerate(feature_cols) if c != 'LoanAmount']
+    with request_metrics.stage('ml.predict'):
+        result = {
+            'approved': np.asarray(_models['classifier'].predict(X_scaled)).astype(int) == 1,
+            'risk_score': np.asarray(_models['risk_regressor'].predict(X_scaled), dtype=np.float64),
+            'recommended_amount': np.asarray(_models['amount_regressor'].predict(X_scaled[:, idx_no_loan]), dtype=np.float64),
+        }
+    if explain:
+        result['factors'] = _top_factors(X, X_scaled)
+    return result
+
+
+# Attributions returned per prediction (largest absolute contribution first)
+TOP_FACTORS = 5
+_explainers = {}
+
+
+def _explainer(name):
+    """TreeExplainer for a loaded model, built on first use; None if the model is not an XGBoost ensemble."""
+    if name not in _explainers:
+        from .tree_shap import TreeExplainer
+        model = _models[name]
+        try:
+            _explainers[name] = TreeExplainer(model.get_booster())
+        except (AttributeError, ValueError):
+            _explainers[name] = None
+    return _explainers[name]
+
+
+def _top_factors(X, X_scaled, top=TOP_FACTORS):
+    explainer = _explainer('classifier')
+    if explainer is None:
+        return [None] * len(X)
+    feature_cols = _models['feature_cols']
+    # The scaler is per-feature affine, so attributions on scaled inputs name the same features
+    with request_metrics.stage('ml.explain'):
+        contributions = explainer.contributions(X_scaled)
+    order = np.argsort(-np.abs(contributions), axis=1)[:, :top]
+    factors = []
+    for i, row in enumerate(order):
+        items = []
+        for j in row:
+            col = feature_cols[j]
+            if col in CATEGORICAL_OPTIONS:
+                value = CATEGORICAL_OPTIONS[col][int(X[i, j])]
+            else:
+                value = float(X[i, j])
+            items.append({'feature': col, 'value': value, 'contribution': round(float(contributions[i, j]), 4)})
+        factors.append(items)
+    return factors
+
+
+def explain_eligibility(payloads, top=TOP_FACTORS):
+    """
+    Exact TreeSHAP attributions of the eligibility classifier for each payload: a list of
+    {feature, value, contribution} (log-odds; positive pushes towards approval), largest
+    first. Returns None per payload when the classifier cannot be explained.
+    """
     _load_artifacts()
+    if not payloads:
+        return []
+    X = _payloads_to_matrix(payloads)
+    return _top_factors(X, _scale(X), top=top)
+
+
+# Limits for what-if sweeps (score_grid)
+MAX_SWEEP_FEATURES = 2
+MAX_SWEEP_STEPS = 100
+MAX_SWEEP_CELLS = 2500
+
+
+def sweep_axis(feature, spec):
+    """
+    Resolve one sweep axis to a list of values. `spec` is either a list of values,
+    {"values": [...]}, or {"start", "stop", "steps"} for a numeric feature
+    (steps evenly spaced, inclusive). Raises ValueError on bad input.
+    """
+    _load_artifacts()
+    if feature not in _models['feature_cols']:
+        raise ValueError(f"Unknown feature: {feature}")
+    if isinstance(spec, dict) and 'values' in spec:
+        spec = spec['values']
+    if isinstance(spec, (list, tuple)):
+        values = list(spec)
+    elif isinstance(spec, dict):
+        if feature in CATEGORICAL_OPTIONS:
+            raise ValueError(f"{feature} is categorical; pass a list of values")
+        try:
+            start, stop = float(spec['start']), float(spec['stop'])
+            steps = int(spec.get('steps', 11))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{feature}: range needs numeric start, stop and optional steps")
+        if steps < 2:
+            raise ValueError(f"{feature}: steps must be at least 2")
+        values = np.linspace(start, stop, min(steps, MAX_SWEEP_STEPS)).tolist()
+    else:
+        raise ValueError(f"{feature}: expected a list of values or a start/stop/steps range")
+    if not values:
+        raise ValueError(f"{feature}: no values to sweep")
+    if len(values) > MAX_SWEEP_STEPS:
+        raise ValueError(f"{feature}: at most {MAX_SWEEP_STEPS} values")
+    if feature in CATEGORICAL_OPTIONS:
+        bad = [v for v in values if str(v).strip() not in CATEGORICAL_OPTIONS[feature]]
+        if bad:
+            raise ValueError(f"{feature}: invalid values {bad}; options are {CATEGORICAL_OPTIONS[feature]}")
+        return [str(v).strip() for v in values]
+    try:
+        return [float(v) for v in values]
+    except (TypeError, ValueError):
+        raise ValueError(f"{feature}: values must be numeric")
+
+
+def score_grid(payload, axes):
+    """
+    Score every combination of the swept feature values on top of one base payload.
+    `axes` is a list of (feature, values) with at most MAX_SWEEP_FEATURES entries.
+    The grid is built as one matrix and scored with one call per model; results
+    are numpy arrays shaped (len(values_1), [len(values_2)]).
+    """
+    _load_artifacts()
+    if not 1 <= len(axes) <= MAX_SWEEP_FEATURES:
+        raise ValueError(f"Sweep 1 to {MAX_SWEEP_FEATURES} features")
+    if len({f for f, _ in axes}) != len(axes):
+        raise ValueError("Each swept feature may appear only once")
+    shape = tuple(len(values) for _, values in axes)
+    cells = int(np.prod(shape))
+    if cells > MAX_SWEEP_CELLS:
+        raise ValueError(f"Grid has {cells} cells; the limit is {MAX_SWEEP_CELLS}")
+
     feature_cols = _models['feature_cols']
-    vec = []
-    for col in feature_cols:
-        if col == 'LoanAmount' and not include_loan_amount:
-            continue
-        if col in CATEGORICAL_OPTIONS:
-            raw = payload.get(col, list(CATEGORICAL_OPTIONS[col])[0])
-            vec.append(_encode_categorical(col, raw))
-        else:
-            raw = payload.get(col, DEFAULT_NUMERIC.get(col, 0))
-            try:
-                vec.append(float(raw))
-            except (TypeError, ValueError):
-                vec.append(DEFAULT_NUMERIC.get(col, 0))
-    return np.array(vec, dtype=np.float64).reshape(1, -1)
+    X = np.repeat(_payloads_to_matrix([payload]), cells, axis=0)
+    columns = []
+    for feature, values in axes:
+        if feature in CATEGORICAL_OPTIONS:
+            values = [CATEGORICAL_OPTIONS[feature].index(v) for v in values]
+        columns.append(np.asarray(values, dtype=np.float64))
+    # indexing='ij': axis 0 follows the first feature, axis 1 the second
+    for (feature, _), grid in zip(axes, np.meshgrid(*columns, indexing='ij')):
+        X[:, feature_cols.index(feature)] = grid.ravel()
+
+    X_scaled = _scale(X)
+    idx_no_loan = [i for i, c in enumerate(feature_cols) if c != 'LoanAmount']
+    classifier = _models['classifier']
+    with request_metrics.stage('ml.predict'):
+        result = {
+            'approved': (np.asarray(classifier.predict(X_scaled)).astype(int) == 1).reshape(shape),
+            'risk_score': np.asarray(_models['risk_regressor'].predict(X_scaled), dtype=np.float64).reshape(shape),
+            'recommended_amount': np.asarray(
+                _models['amount_regressor'].predict(X_scaled[:, idx_no_loan]), dtype=np.float64
+            ).reshape(shape),
+        }
+        if hasattr(classifier, 'predict_proba'):
+            result['approval_probability'] = np.asarray(classifier.predict_proba(X_scaled))[:, 1].reshape(shape)
+    return result
+
+
+def application_to_ml_payload(app):
+    """Build ML model payload from a LoanApplication (or any object with the same fields)."""
+    payload = dict(DEFAULT_NUMERIC)
+    payload.update({
+        'Age': int(app.age),
+        'AnnualIncome': float(app.annual_income),
+        'CreditScore': int(app.credit_score),
+        'LoanAmount': float(app.loan_amount_requested),
+        'LoanDuration': int(app.loan_duration_months),
+        'EmploymentStatus': app.employment_status or 'Self-Employed',
+        'EducationLevel': app.education_level or 'High School',
+        'MaritalStatus': app.marital_status or 'Married',
+        'LoanPurpose': app.loan_purpose or 'Other',
+        'HomeOwnershipStatus': 'Own',  # Default for farmers
+    })
+    # Ensure categorical values are valid
+    for k, opts in CATEGORICAL_OPTIONS.items():
+        if payload.get(k) not in opts:
+            payload[k] = opts[0]
+    return payload
 
 
 def predict_eligibility(payload):
     """Model 1: loan approval (0 = Denied, 1 = Approved)."""
     _load_artifacts()
     X = _payload_to_vector(payload, include_loan_amount=True)
-    X_scaled = _models['scaler'].transform(X)
-    pred = _models['classifier'].predict(X_scaled)[0]
+    X_scaled = _scale(X)
+    with request_metrics.stage('ml.predict'):
+        pred = _models['classifier'].predict(X_scaled)[0]
     # label_encoder: typically 0=Denied, 1=Approved
     return int(pred) == 1
 
@@ -111,8 +354,9 @@ def predict_risk(payload):
     """Model 2: default risk score."""
     _load_artifacts()
     X = _payload_to_vector(payload, include_loan_amount=True)
-    X_scaled = _models['scaler'].transform(X)
-    score = _models['risk_regressor'].predict(X_scaled)[0]
+    X_scaled = _scale(X)
+    with request_metrics.stage('ml.predict'):
+        score = _models['risk_regressor'].predict(X_scaled)[0]
     return float(score)
 
 
@@ -120,9 +364,10 @@ def recommend_amount(payload):
     """Model 3: recommended loan amount (trained on approved-only, 32 features)."""
     _load_artifacts()
     X = _payload_to_vector(payload, include_loan_amount=True)  # 33 cols
-    X_scaled = _models['scaler'].transform(X)
+    X_scaled = _scale(X)
     feature_cols = _models['feature_cols']
     idx_no_loan = [i for i, c in enumerate(feature_cols) if c != 'LoanAmount']
     X_amt = X_scaled[:, idx_no_loan]
-    amount = _models['amount_regressor'].predict(X_amt)[0]
+    with request_metrics.stage('ml.predict'):
+        amount = _models['amount_regressor'].predict(X_amt)[0]
     return float(amount)
@@ -139,6 +139,7 @@ class AgriculturalRecord(models.Model):
 
 
 LOAN_STATUS_CHOICES = [
+    ('scoring', 'Scoring'),  # submitted, waiting for the scoring worker (api/application_scoring.py)
     ('pending', 'Pending'),
     ('approved', 'Approved'),
     ('rejected', 'Rejected'),
@@ -225,16 +226,44 @@ class Repayment(models.Model):
     due_date = models.DateField()
     paid_at = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, default='pending')  # pending, paid, overdue
+    # Settlement postings (partial payments accumulate until amount is covered)
+    amount_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payment_reference = models.CharField(max_length=100, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'api_repayment'
         ordering = ['due_date']
+        indexes = [
+            # Overdue sweeper: pending rows by due date
+            models.Index(fields=['status', 'due_date'], name='api_repay_status_due_idx'),
+        ]
 
     def __str__(self):
         return f"Repayment {self.amount} ({self.loan_id})"
 
 
+class RepaymentPosting(models.Model):
+    """A settlement payment applied to a repayment; its reference is never applied twice."""
+    repayment = models.ForeignKey(
+        Repayment,
+        on_delete=models.CASCADE,
+        related_name='postings',
+    )
+    reference = models.CharField(max_length=100)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'api_repaymentposting'
+        constraints = [
+            models.UniqueConstraint(fields=['repayment', 'reference'], name='api_repayposting_ref_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Posting {self.reference} -> {self.repayment_id}"
+
+
 class ChatInteraction(models.Model):
     """Log chatbot interactions for analytics and audit."""
     user = models.ForeignKey(
@@ -247,7 +276,13 @@ class ChatInteraction(models.Model):
     message = models.TextField()
     reply = models.TextField()
     language = models.CharField(max_length=5, default='en')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Latency and cache metrics for chat analytics
+    model_latency_ms = models.FloatField(null=True, blank=True)
+    translation_latency_ms = models.FloatField(null=True, blank=True)
+    model_available = models.BooleanField(default=True)
+    reply_cache_hit = models.BooleanField(default=False)
+    translation_cache_hit = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
         db_table = 'api_chatinteraction'
@@ -255,3 +290,59 @@ class ChatInteraction(models.Model):
 
     def __str__(self):
         return f"Chat {self.id}"
+
+
+class JobCheckpoint(models.Model):
+    """Progress marker for incremental batch jobs (high-water mark, resume position)."""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'api_jobcheckpoint'
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+    @classmethod
+    def get_position(cls, name, default=''):
+        return cls.objects.filter(name=name).values_list('position', flat=True).first() or default
+
+    @classmethod
+    def set_position(cls, name, position):
+        cls.objects.update_or_create(name=name, defaults={'position': str(position)})
+
+
+JOB_STATUS_CHOICES = [
+    ('queued', 'Queued'),
+    ('running', 'Running'),
+    ('done', 'Done'),
+    ('failed', 'Failed'),
+]
+
+
+class Job(models.Model):
+    """Unit of background work in the database-backed job queue (api/job_queue.py)."""
+    queue = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=JOB_STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # Not claimed before this time (retry backoff)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Claim token of the worker running the job, and when the claim expires (visibility timeout)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'api_job'
+        indexes = [
+            models.Index(fields=['queue', 'status', 'run_after'], name='api_job_claim_idx'),
+            models.Index(fields=['status', 'finished_at'], name='api_job_finished_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} ({self.queue}, {self.status})"
@@ -0,0 +1,246 @@
+"""
+Portfolio credit-risk simulation for the MFI dashboard.
+
+Every active loan (one with open repayments, or not yet scheduled) contributes
+its outstanding exposure. The stored application risk_score is mapped to a
+12-month default probability through a piecewise-linear calibration table, and
+defaults are simulated for many scenarios at once with NumPy:
+
+  * a systematic factor per scenario (Gamma, mean 1, as in CreditRisk+) scales
+    every loan's PD, so defaults are correlated across the portfolio;
+  * given that factor, loans default independently. Loans are grouped into
+    PD buckets, so the number of defaults per bucket is one binomial draw per
+    (scenario, bucket) rather than one Bernoulli draw per (scenario, loan);
+  * the loss of K defaults in a bucket is drawn from the exact mean and
+    variance of the sum of K exposures sampled without replacement.
+
+Cost is O(scenarios x buckets), independent of the number of loans, so tens of
+thousands of loans and scenarios simulate in well under a second.
+"""
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast
+
+from .models import Loan, Repayment
+
+# (risk_score, 12-month probability of default); scores outside the table are clamped
+DEFAULT_CALIBRATION = (
+    (20.0, 0.005),
+    (30.0, 0.01),
+    (40.0, 0.03),
+    (50.0, 0.07),
+    (60.0, 0.14),
+    (70.0, 0.25),
+    (80.0, 0.40),
+)
+CALIBRATION = tuple(getattr(settings, 'PORTFOLIO_RISK_CALIBRATION', DEFAULT_CALIBRATION))
+# Loss given default, as a fraction of outstanding exposure
+LGD = getattr(settings, 'PORTFOLIO_RISK_LGD', 0.45)
+# Standard deviation of the systematic PD multiplier (0 = independent defaults)
+PD_VOLATILITY = getattr(settings, 'PORTFOLIO_RISK_PD_VOLATILITY', 0.6)
+# PD for loans whose application was never scored
+UNSCORED_PD = getattr(settings, 'PORTFOLIO_RISK_UNSCORED_PD', 0.10)
+DEFAULT_SCENARIOS = getattr(settings, 'PORTFOLIO_RISK_SCENARIOS', 10000)
+MAX_SCENARIOS = getattr(settings, 'PORTFOLIO_RISK_MAX_SCENARIOS', 50000)
+DEFAULT_SEED = 2024
+# numpy's default_rng rejects negative seeds; the upper bound keeps request seeds to 32 bits
+MAX_SEED = 2 ** 32 - 1
+CONFIDENCE_LEVELS = (0.95, 0.99, 0.999)
+HISTOGRAM_BINS = 40
+# Log-spaced PD buckets; bucket PDs are exposure-weighted so expected loss is preserved exactly
+PD_BUCKETS = 64
+# Same bands as explanations.risk_score_description
+RISK_BANDS = (('low', None, 35.0), ('moderate', 35.0, 55.0), ('higher', 55.0, None))
+
+OPEN_STATUSES = ('pending', 'overdue')
+
+
+def calibrate(risk_scores, table=CALIBRATION):
+    """Map risk scores to default probabilities; NaN (unscored) becomes UNSCORED_PD."""
+    scores = np.asarray(risk_scores, dtype=np.float64)
+    xs = np.array([s for s, _ in table], dtype=np.float64)
+    ps = np.array([p for _, p in table], dtype=np.float64)
+    pd_ = np.interp(scores, xs, ps)
+    pd_[np.isnan(scores)] = UNSCORED_PD
+    return pd_
+
+
+def load_exposures():
+    """
+    Return (loan ids, outstanding exposure, risk scores) as NumPy arrays for active loans.
+    Two flat queries (repayments grouped by loan, then loans), joined in NumPy;
+    unscored applications have NaN risk scores.
+    """
+    schedule = list(
+        Repayment.objects.order_by()
+        .values('loan_id')
+        .annotate(
+            n=Count('id'),
+            outstanding=Sum(
+                F('amount') - F('amount_paid'),
+                filter=Q(status__in=OPEN_STATUSES),
+                output_field=FloatField(),
+            ),
+        )
+        .values_list('loan_id', 'n', 'outstanding')
+    )
+    loans = list(
+        Loan.objects.order_by('id')
+        .values_list('id', Cast('amount', FloatField()), 'application__risk_score')
+    )
+    if not loans:
+        empty = np.array([], dtype=np.float64)
+        return np.array([], dtype=np.int64), empty, empty
+
+    ids = np.fromiter((row[0] for row in loans), dtype=np.int64, count=len(loans))
+    # Approved but no schedule yet: the full principal is at risk
+    exposure = np.fromiter((row[1] or 0.0 for row in loans), dtype=np.float64, count=len(loans))
+    scores = np.fromiter(
+        (np.nan if row[2] is None else row[2] for row in loans), dtype=np.float64, count=len(loans)
+    )
+    if schedule:
+        sched_ids = np.fromiter((row[0] for row in schedule), dtype=np.int64, count=len(schedule))
+        outstanding = np.fromiter((row[2] or 0.0 for row in schedule), dtype=np.float64, count=len(schedule))
+        pos = np.searchsorted(ids, sched_ids)
+        exposure[pos] = outstanding
+    active = exposure > 0
+    return ids[active], exposure[active], scores[active]
+
+
+def _bucket(pd_, loss_given_default, buckets=PD_BUCKETS):
+    """Group loans into log-spaced PD buckets: (pd, count, sum L, sum L^2) per non-empty bucket."""
+    lo, hi = float(pd_.min()), float(pd_.max())
+    if hi <= lo:
+        idx = np.zeros(len(pd_), dtype=np.int64)
+    else:
+        edges = np.geomspace(max(lo, 1e-6), hi, buckets + 1)[1:-1]
+        idx = np.searchsorted(edges, pd_)
+    counts = np.bincount(idx, minlength=buckets)
+    sum_l = np.bincount(idx, weights=loss_given_default, minlength=buckets)
+    sum_l2 = np.bincount(idx, weights=loss_given_default ** 2, minlength=buckets)
+    sum_pl = np.bincount(idx, weights=pd_ * loss_given_default, minlength=buckets)
+    sum_p = np.bincount(idx, weights=pd_, minlength=buckets)
+    used = counts > 0
+    counts, sum_l, sum_l2, sum_pl, sum_p = counts[used], sum_l[used], sum_l2[used], sum_pl[used], sum_p[used]
+    # Loss-weighted bucket PD keeps sum(pd * L) unchanged; fall back to the plain mean for zero-loss buckets
+    bucket_pd = np.where(sum_l > 0, sum_pl / np.where(sum_l > 0, sum_l, 1.0), sum_p / counts)
+    return bucket_pd, counts, sum_l, sum_l2
+
+
+def simulate_losses(pd_, loss_given_default, scenarios, volatility=PD_VOLATILITY, seed=DEFAULT_SEED):
+    """
+    Simulate portfolio losses. `pd_` and `loss_given_default` (exposure x LGD) are
+    per-loan arrays; returns an array of `scenarios` losses.
+    """
+    rng = np.random.default_rng(seed)
+    losses = np.zeros(scenarios, dtype=np.float64)
+    if len(pd_) == 0 or scenarios <= 0:
+        return losses
+    if volatility > 0:
+        shape = 1.0 / (volatility ** 2)
+        factors = rng.gamma(shape, 1.0 / shape, size=scenarios)
+    else:
+        factors = np.ones(scenarios)
+
+    bucket_pd, counts, sum_l, sum_l2 = _bucket(pd_, loss_given_default)
+    mean_l = sum_l / counts
+    var_l = np.maximum(sum_l2 / counts - mean_l ** 2, 0.0)
+
+    # (scenarios, buckets): conditional PD, then number of defaulted loans
+    conditional = np.minimum(factors[:, None] * bucket_pd[None, :], 1.0)
+    defaults = rng.binomial(counts[None, :], conditional)
+    # Sum of K exposures drawn without replacement from a bucket of n:
+    # mean K*mu, variance K*sigma^2*(n-K)/(n-1)
+    fpc = np.where(counts > 1, (counts[None, :] - defaults) / np.maximum(counts[None, :] - 1, 1), 0.0)
+    std = np.sqrt(defaults * var_l[None, :] * fpc)
+    bucket_losses = defaults * mean_l[None, :] + std * rng.standard_normal(defaults.shape)
+    np.clip(bucket_losses, 0.0, sum_l[None, :], out=bucket_losses)
+    losses[:] = bucket_losses.sum(axis=1)
+    return losses
+
+
+def _histogram(losses, bins=HISTOGRAM_BINS):
+    counts, edges = np.histogram(losses, bins=bins)
+    return {
+        'bin_edges': [round(float(e), 2) for e in edges],
+        'counts': counts.tolist(),
+    }
+
+
+def _bands(scores, exposure, expected):
+    result = {}
+    for name, low, high in RISK_BANDS:
+        mask = np.ones(len(scores), dtype=bool)
+        if low is not None:
+            mask &= scores >= low
+        if high is not None:
+            mask &= scores < high
+        result[name] = {
+            'loans': int(mask.sum()),
+            'exposure': round(float(exposure[mask].sum()), 2),
+            'expected_loss': round(float(expected[mask].sum()), 2),
+        }
+    unscored = np.isnan(scores)
+    result['unscored'] = {
+        'loans': int(unscored.sum()),
+        'exposure': round(float(exposure[unscored].sum()), 2),
+        'expected_loss': round(float(expected[unscored].sum()), 2),
+    }
+    return result
+
+
+def portfolio_risk(scenarios=DEFAULT_SCENARIOS, seed=DEFAULT_SEED, lgd=LGD, volatility=PD_VOLATILITY):
+    """
+    Simulate the active portfolio. Returns a JSON-ready dict with expected loss,
+    VaR and expected shortfall at CONFIDENCE_LEVELS, and the loss distribution.
+    """
+    scenarios = max(1, min(int(scenarios), MAX_SCENARIOS))
+    started = time.perf_counter()
+    _, exposure, scores = load_exposures()
+    loaded = time.perf_counter()
+
+    pd_ = calibrate(scores)
+    loss_given_default = exposure * lgd
+    expected = pd_ * loss_given_default
+    losses = simulate_losses(pd_, loss_given_default, scenarios, volatility=volatility, seed=seed)
+    simulated = time.perf_counter()
+
+    total_exposure = float(exposure.sum())
+    var = {}
+    shortfall = {}
+    for level in CONFIDENCE_LEVELS:
+        key = f'{level * 100:g}'
+        threshold = float(np.quantile(losses, level)) if len(losses) else 0.0
+        tail = losses[losses >= threshold]
+        var[key] = round(threshold, 2)
+        shortfall[key] = round(float(tail.mean()) if len(tail) else threshold, 2)
+
+    return {
+        'loans': int(len(exposure)),
+        'total_exposure': round(total_exposure, 2),
+        'expected_loss': round(float(expected.sum()), 2),
+        'simulated_mean_loss': round(float(losses.mean()), 2),
+        'loss_std': round(float(losses.std()), 2),
+        'value_at_risk': var,
+        'expected_shortfall': shortfall,
+        'unexpected_loss_99': round(var['99'] - float(expected.sum()), 2),
+        'average_pd': round(float(np.average(pd_, weights=exposure)) if total_exposure else 0.0, 4),
+        'by_risk_band': _bands(scores, exposure, expected),
+        'loss_distribution': _histogram(losses),
+        'assumptions': {
+            'scenarios': scenarios,
+            'seed': seed,
+            'lgd': lgd,
+            'pd_volatility': volatility,
+            'unscored_pd': UNSCORED_PD,
+            'horizon_months': 12,
+            'calibration': [list(row) for row in CALIBRATION],
+        },
+        'timing_ms': {
+            'load': round((loaded - started) * 1000, 1),
+            'simulate': round((simulated - loaded) * 1000, 1),
+        },
+    }
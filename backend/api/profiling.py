@@ -0,0 +1,249 @@
+"""
+Opt-in request profiling for tail-latency hunting.
+
+RequestProfilingMiddleware (api/middleware.py) arms a capture for a request when
+it is picked by PROFILE_SAMPLE_RATE, or for every request when PROFILE_SLOW_MS
+is set (slowness is only known at the end). When the request finishes, the
+capture is saved if the request was picked or ran for at least PROFILE_SLOW_MS,
+and dropped otherwise.
+
+Two capture modes (PROFILE_MODE):
+- 'sample' (default): one background thread reads the stacks of armed request
+  threads every PROFILE_INTERVAL_MS via sys._current_frames() and counts them.
+  Saved as collapsed stacks (`frame;frame;frame count` per line, *.folded), which
+  flamegraph.pl, speedscope and inferno read directly. Cheap enough to arm on
+  every request.
+- 'cprofile': cProfile on the request thread, saved as a pstats dump (*.prof,
+  for snakeviz or `python -m pstats`). Exact call counts, but roughly doubles
+  the cost of Python-heavy requests.
+
+ProfileStore keeps the files in PROFILE_DIR, one directory per URL route, and
+deletes the oldest beyond PROFILE_MAX_PER_ENDPOINT (a ring buffer per endpoint).
+Profile metadata is encoded in the file name, so listing needs no index file.
+"""
+import cProfile
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+
+FORMATS = {'sample': '.folded', 'cprofile': '.prof'}
+MAX_STACK_DEPTH = 200
+_NAME_RE = re.compile(r'^[A-Za-z0-9_]+$')
+_ID_RE = re.compile(r'^(\d{13})-(\d+)ms-(\d{3})-(sampled|slow)-([0-9a-f]{8})$')
+
+
+class SampledCapture:
+    """Collapsed-stack counts for one request thread, filled by the Sampler."""
+
+    extension = FORMATS['sample']
+
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.stacks = {}
+        self.samples = 0
+
+    def add(self, stack):
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as out:
+            # Snapshot first: a late tick of the sampler may still add to the dict
+            for stack, count in sorted(list(self.stacks.items()), key=lambda item: -item[1]):
+                out.write(f'{stack} {count}\n')
+
+
+class CProfileCapture:
+    extension = FORMATS['cprofile']
+    samples = None
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+class Sampler:
+    """Background thread that samples the stacks of registered request threads."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._captures = {}  # thread id -> SampledCapture
+        self._labels = {}    # code object -> "module:function"
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, thread_id):
+        capture = SampledCapture(thread_id)
+        self._captures[thread_id] = capture
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                    self._thread.start()
+        self._wake.set()
+        return capture
+
+    def stop(self, capture):
+        self._captures.pop(capture.thread_id, None)
+
+    def _run(self):
+        while True:
+            if not self._captures:
+                # Idle until a request is armed
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            frames = sys._current_frames()
+            for thread_id, capture in list(self._captures.items()):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    capture.add(self._collapse(frame))
+            del frames
+            time.sleep(self.interval)
+
+    def _collapse(self, frame):
+        labels = self._labels
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                module = frame.f_globals.get('__name__') or os.path.basename(code.co_filename)
+                label = labels[code] = f'{module}:{code.co_name}'.replace(';', ':').replace(' ', '_')
+            stack.append(label)
+            frame = frame.f_back
+        stack.reverse()
+        return ';'.join(stack)
+
+
+class ProfileStore:
+    """Per-endpoint ring buffer of profile files under `root`."""
+
+    def __init__(self, root, max_per_endpoint):
+        self.root = str(root)
+        self.max_per_endpoint = max_per_endpoint
+
+    @staticmethod
+    def endpoint_name(route):
+        """Directory name for a URL route, e.g. 'api/chat/' -> 'api_chat'."""
+        return re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+
+    def save(self, capture, route, duration, status, reason):
+        """Write the capture and prune the endpoint's oldest files; returns (endpoint, profile id)."""
+        endpoint = self.endpoint_name(route)
+        directory = os.path.join(self.root, endpoint)
+        os.makedirs(directory, exist_ok=True)
+        profile_id = '{}-{}ms-{:03d}-{}-{}'.format(
+            int(time.time() * 1000), int(duration * 1000), status, reason, secrets.token_hex(4))
+        path = os.path.join(directory, profile_id + capture.extension)
+        tmp = path + '.tmp'
+        capture.dump(tmp)
+        os.replace(tmp, path)
+        self._prune(directory)
+        return endpoint, profile_id
+
+    def _prune(self, directory):
+        names = sorted(n for n in os.listdir(directory) if not n.endswith('.tmp'))
+        for name in names[:-self.max_per_endpoint]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass  # pruned concurrently by another worker
+
+    def list(self, endpoint=None):
+        """Profile metadata, newest first."""
+        if endpoint is not None:
+            endpoints = [endpoint] if _NAME_RE.match(endpoint) else []
+        elif os.path.isdir(self.root):
+            endpoints = sorted(os.listdir(self.root))
+        else:
+            endpoints = []
+        profiles = []
+        for name in endpoints:
+            directory = os.path.join(self.root, name)
+            if not os.path.isdir(directory):
+                continue
+            for filename in os.listdir(directory):
+                profile_id, extension = os.path.splitext(filename)
+                match = _ID_RE.match(profile_id)
+                if match is None or extension not in FORMATS.values():
+                    continue
+                created_ms, duration_ms, status, reason, _ = match.groups()
+                try:
+                    size = os.path.getsize(os.path.join(directory, filename))
+                except FileNotFoundError:
+                    continue  # pruned since listdir()
+                profiles.append({
+                    'endpoint': name,
+                    'id': profile_id,
+                    'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(int(created_ms) / 1000)),
+                    'duration_ms': int(duration_ms),
+                    'status': int(status),
+                    'reason': reason,
+                    'format': 'collapsed' if extension == FORMATS['sample'] else 'pstats',
+                    'size_bytes': size,
+                })
+        profiles.sort(key=lambda p: p['id'], reverse=True)
+        return profiles
+
+    def path(self, endpoint, profile_id):
+        """Absolute path of a stored profile, or None (names are validated, never joined raw)."""
+        if not _NAME_RE.match(endpoint) or not _ID_RE.match(profile_id):
+            return None
+        for extension in FORMATS.values():
+            path = os.path.join(self.root, endpoint, profile_id + extension)
+            if os.path.isfile(path):
+                return path
+        return None
+
+
+_sampler = None
+_store = None
+_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        from django.conf import settings
+        _store = ProfileStore(
+            getattr(settings, 'PROFILE_DIR', os.path.join(os.getcwd(), '.cache', 'profiles')),
+            getattr(settings, 'PROFILE_MAX_PER_ENDPOINT', 20),
+        )
+    return _store
+
+
+def start_capture(mode, interval):
+    """
+    Arm profiling of the current thread; pass the result to stop_capture(). Returns
+    None when cProfile is already running (only one profiler may be active at a time
+    on Python 3.12+, so concurrent cprofile requests are skipped).
+    """
+    global _sampler
+    if mode == 'cprofile':
+        try:
+            return CProfileCapture()
+        except ValueError:
+            return None
+    if _sampler is None:
+        with _lock:
+            if _sampler is None:
+                _sampler = Sampler(interval)
+    return _sampler.start(threading.get_ident())
+
+
+def stop_capture(capture):
+    if isinstance(capture, CProfileCapture):
+        capture.stop()
+    else:
+        _sampler.stop(capture)
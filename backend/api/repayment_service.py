@@ -0,0 +1,297 @@
+"""
+Bulk posting of mobile-money settlement files against Repayment rows.
+
+Settlement files are CSV (header row) or JSON Lines, one payment per line:
+    loan_id, due_date (YYYY-MM-DD), amount, [paid_at ISO datetime], [reference]
+A JSON array is also accepted but is loaded whole rather than streamed.
+
+Rows are parsed lazily and processed in chunks. Each chunk runs in one
+transaction: it locks and resolves its repayments with one set-based query on
+(loan_id, due_date), applies payments in memory, and writes them back with one
+batched UPDATE, so overlapping uploads for the same repayments serialise
+instead of overwriting each other's amount_paid.
+Partial payments accumulate in amount_paid; a repayment becomes 'paid' once
+amount_paid covers amount. Every applied reference is recorded as a
+RepaymentPosting; a payment whose reference was already applied to the
+repayment (in an earlier file or earlier in the same file) is reported as a
+duplicate, so re-posting a file is safe.
+"""
+import codecs
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import response_cache
+from .db_utils import bulk_insert_rows, bulk_update_rows, lock_for_update
+from .models import Repayment, RepaymentPosting
+
+DEFAULT_CHUNK_SIZE = 5000
+# Max unmatched/partial/invalid rows kept in the report (counts are always exact)
+REPORT_DETAIL_LIMIT = 1000
+OPEN_STATUSES = ('pending', 'overdue')
+
+
+def detect_format(name='', content_type=''):
+    name = (name or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith(('.json', '.jsonl', '.ndjson')) or 'json' in content_type:
+        return 'json'
+    return 'csv'
+
+
+def check_utf8(stream, block_size=1 << 16):
+    """
+    Raise UnicodeDecodeError if a binary stream is not valid UTF-8, then rewind it.
+    Run before post_settlement: rows are posted chunk by chunk while the file is
+    decoded, so a bad byte found mid-file would leave the earlier chunks posted.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    for block in iter(lambda: stream.read(block_size), b''):
+        decoder.decode(block)
+    decoder.decode(b'', final=True)
+    stream.seek(0)
+
+
+def iter_rows(stream, fmt='csv'):
+    """Yield (line_number, dict) from a binary or text stream without loading it all."""
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    first = ''
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if not first:
+            first = line
+            if line.startswith('['):
+                # Plain JSON array: fall back to a full load
+                rest = line + stream.read()
+                for i, row in enumerate(json.loads(rest), start=1):
+                    yield i, row
+                return
+        try:
+            yield line_no, json.loads(line)
+        except ValueError:
+            yield line_no, None
+
+
+def _parse(line_no, raw):
+    """Return (payment dict, None) or (None, error string)."""
+    if not isinstance(raw, dict):
+        return None, 'malformed row'
+    try:
+        loan_id = int(raw.get('loan_id'))
+        due = raw.get('due_date')
+        due_date = due if isinstance(due, date) else date.fromisoformat(str(due).strip())
+        amount = Decimal(str(raw.get('amount')).strip())
+        if not amount.is_finite():
+            return None, 'amount must be a finite number'
+        if amount <= 0:
+            return None, 'amount must be positive'
+        paid_at = None
+        if raw.get('paid_at'):
+            # parse_datetime returns None for a malformed value and raises ValueError for an impossible date
+            paid_at = raw['paid_at'] if isinstance(raw['paid_at'], datetime) else parse_datetime(str(raw['paid_at']).strip())
+            if paid_at is None:
+                return None, f"invalid paid_at: {raw['paid_at']!r}"
+            if timezone.is_naive(paid_at):
+                paid_at = timezone.make_aware(paid_at)
+    except (TypeError, ValueError, InvalidOperation) as exc:
+        return None, f'invalid row: {exc}'
+    return {
+        'line': line_no,
+        'loan_id': loan_id,
+        'due_date': due_date,
+        'amount': amount,
+        'paid_at': paid_at,
+        'reference': str(raw.get('reference') or '')[:100],
+    }, None
+
+
+class Reconciliation:
+    """Counters plus bounded detail lists for the reconciliation report."""
+
+    def __init__(self, detail_limit=REPORT_DETAIL_LIMIT):
+        self.detail_limit = detail_limit
+        self.rows = 0
+        self.matched = 0
+        self.paid = 0
+        self.partial = 0
+        self.overpaid = 0
+        self.unmatched = 0
+        self.invalid = 0
+        self.amount_posted = Decimal('0')
+        self.details = {'unmatched': [], 'partial': [], 'overpaid': [], 'invalid': []}
+
+    def note(self, kind, entry):
+        setattr(self, kind, getattr(self, kind) + 1)
+        if len(self.details[kind]) < self.detail_limit:
+            self.details[kind].append(entry)
+
+    def merge(self, other):
+        """Add the counters and details of a chunk's report (rows are counted by the caller)."""
+        for kind in ('matched', 'paid', 'partial', 'overpaid', 'unmatched', 'invalid'):
+            setattr(self, kind, getattr(self, kind) + getattr(other, kind))
+        self.amount_posted += other.amount_posted
+        for kind, entries in other.details.items():
+            self.details[kind].extend(entries[:self.detail_limit - len(self.details[kind])])
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'matched': self.matched,
+            'paid': self.paid,
+            'partial': self.partial,
+            'overpaid': self.overpaid,
+            'unmatched': self.unmatched,
+            'invalid': self.invalid,
+            'amount_posted': float(self.amount_posted),
+            'details': {
+                k: [{**e, 'due_date': str(e['due_date'])} if 'due_date' in e else e for e in v]
+                for k, v in self.details.items()
+            },
+        }
+
+
+class _Row:
+    """Lightweight mutable view of a Repayment row (avoids model instantiation per match)."""
+    __slots__ = ('id', 'loan_id', 'due_date', 'amount', 'amount_paid', 'status', 'paid_at', 'payment_reference')
+
+    def __init__(self, values):
+        (self.id, self.loan_id, self.due_date, self.amount,
+         self.amount_paid, self.status, self.paid_at, self.payment_reference) = values
+
+
+_ROW_FIELDS = ('id', 'loan_id', 'due_date', 'amount', 'amount_paid', 'status', 'paid_at', 'payment_reference')
+_UPDATE_FIELDS = ('amount_paid', 'status', 'paid_at', 'payment_reference')
+
+
+def _apply_chunk(payments, report, dry_run):
+    """
+    Post one chunk in its own transaction and merge its outcome into `report`.
+    A concurrent upload can still commit a posting with the same reference first
+    (the unique constraint catches it); the chunk is then rolled back and retried
+    once, and the retry reports that payment as a duplicate.
+    """
+    for attempt in range(2):
+        chunk_report = Reconciliation(report.detail_limit)
+        try:
+            with transaction.atomic():
+                changed = _post_chunk(payments, chunk_report, dry_run)
+        except IntegrityError:
+            if attempt:
+                raise
+            continue
+        report.merge(chunk_report)
+        return changed
+
+
+def _applied_references(repayment_ids, references):
+    """(repayment id, reference) of every payment already applied to these repayments."""
+    if not references:
+        return set()
+    return set(
+        RepaymentPosting.objects.filter(repayment_id__in=repayment_ids, reference__in=references)
+        .values_list('repayment_id', 'reference')
+    )
+
+
+def _post_chunk(payments, report, dry_run):
+    keys = {(p['loan_id'], p['due_date']) for p in payments}
+    loan_ids = {k[0] for k in keys}
+    due_dates = {k[1] for k in keys}
+    # One set-based lookup per chunk; the cross product is filtered back down to exact keys.
+    # Locked (ordered by id) so amount_paid and status cannot change until this chunk commits.
+    candidates = Repayment.objects.filter(loan_id__in=loan_ids, due_date__in=due_dates).order_by('id')
+    if not dry_run:
+        candidates = lock_for_update(candidates)
+    by_key = {}
+    for values in candidates.values_list(*_ROW_FIELDS):
+        r = _Row(values)
+        if (r.loan_id, r.due_date) in keys:
+            # Several instalments on the same date: fill the earliest open one first (ordered by id)
+            by_key.setdefault((r.loan_id, r.due_date), []).append(r)
+    references = {p['reference'] for p in payments if p['reference']}
+    applied = _applied_references([r.id for rows in by_key.values() for r in rows], references)
+
+    changed = {}
+    postings = []
+    now = timezone.now()
+    for p in payments:
+        key = (p['loan_id'], p['due_date'])
+        candidates = by_key.get(key, ())
+        if p['reference'] and any((c.id, p['reference']) in applied for c in candidates):
+            report.note('unmatched', {'line': p['line'], 'loan_id': p['loan_id'], 'due_date': p['due_date'],
+                                      'amount': float(p['amount']), 'reason': 'duplicate reference'})
+            continue
+        r = next((r for r in candidates if r.status in OPEN_STATUSES), None)
+        if r is None:
+            reason = 'already paid' if candidates else 'no repayment for loan/due date'
+            report.note('unmatched', {'line': p['line'], 'loan_id': p['loan_id'], 'due_date': p['due_date'],
+                                      'amount': float(p['amount']), 'reason': reason})
+            continue
+        report.matched += 1
+        report.amount_posted += p['amount']
+        r.amount_paid = (r.amount_paid or Decimal('0')) + p['amount']
+        if p['reference']:
+            r.payment_reference = p['reference']
+            applied.add((r.id, p['reference']))
+            postings.append((r.id, p['reference'], p['amount'], now))
+        if r.amount_paid >= r.amount:
+            r.status = 'paid'
+            r.paid_at = p['paid_at'] or now
+            report.paid += 1
+            if r.amount_paid > r.amount:
+                report.note('overpaid', {'line': p['line'], 'repayment_id': r.id, 'loan_id': r.loan_id,
+                                         'due_date': r.due_date, 'excess': float(r.amount_paid - r.amount)})
+        else:
+            report.note('partial', {'line': p['line'], 'repayment_id': r.id, 'loan_id': r.loan_id,
+                                    'due_date': r.due_date, 'amount_paid': float(r.amount_paid),
+                                    'outstanding': float(r.amount - r.amount_paid)})
+        changed[r.id] = r
+
+    if changed and not dry_run:
+        bulk_update_rows(Repayment, changed.values(), _UPDATE_FIELDS)
+        bulk_insert_rows(RepaymentPosting, ('repayment_id', 'reference', 'amount', 'created_at'), postings)
+    return len(changed)
+
+
+def post_settlement(rows, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, progress=None):
+    """
+    Apply an iterable of (line_number, raw dict) payments. Returns a Reconciliation.
+    With dry_run=True nothing is written but the report is identical.
+    """
+    report = Reconciliation()
+    chunk = []
+    updated = 0
+    for line_no, raw in rows:
+        report.rows += 1
+        payment, error = _parse(line_no, raw)
+        if error:
+            report.note('invalid', {'line': line_no, 'error': error})
+            continue
+        chunk.append(payment)
+        if len(chunk) >= chunk_size:
+            updated += _apply_chunk(chunk, report, dry_run)
+            chunk = []
+            if progress:
+                progress(report)
+    if chunk:
+        updated += _apply_chunk(chunk, report, dry_run)
+        if progress:
+            progress(report)
+    if updated and not dry_run:
+        # bulk_update bypasses the model signals that normally expire cached dashboards
+        response_cache.invalidate_all()
+    return report
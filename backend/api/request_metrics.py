@@ -0,0 +1,266 @@
+"""
+Per-request stage timings and in-process latency histograms.
+
+Code on the request path wraps expensive steps in `stage(name)`:
+
+    with request_metrics.stage('ml.predict'):
+        pred = model.predict(X)
+
+RequestTimingMiddleware (api/middleware.py) opens a Timings collector for each
+request, counts and times its SQL queries, and when the response is ready:
+- adds a `Server-Timing` header (one entry per stage, plus db and total);
+- logs one JSON line on the `api.perf` logger;
+- folds the timings into the histograms served in Prometheus text format at
+  GET /api/admin/metrics/.
+
+Outside a request (management commands, background threads) `stage()` does
+nothing but yield. Repeated stages within one request are summed.
+
+Other modules count events with `registry.inc(name, amount, **labels)` (e.g.
+admission rejections, tokenizer tokens). Histograms and counters are per process: with several workers,
+each exposes its own.
+"""
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+
+# Upper bounds in seconds; wide enough for ML stages (sub-ms) and T5 generation (seconds)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRIC_PREFIX = 'agrifin'
+# HELP text of counters incremented with registry.inc()
+COUNTER_HELP = {
+    'admission_rejected_total': 'Requests rejected by admission control (reason: rate = 429, busy = 503).',
+    'tokenizer_cache_total': 'Token id lookups by result (hit = memoized encoding reused).',
+    'tokenizer_seconds_total': 'Time spent building padded model inputs (tokenizing, cache lookups, padding).',
+    'tokenizer_tokens_total': 'Real tokens in padded model inputs, by length bucket.',
+    'tokenizer_padding_tokens_total': 'Padding tokens in model inputs, by length bucket.',
+    'encoder_cache_total': 'Encoder output lookups by result (hit = encoder pass skipped).',
+    'encoder_cache_evictions_total': 'Encoder outputs evicted to stay within ENCODER_CACHE_MAX_MB.',
+}
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class Timings:
+    """Stage durations and SQL query stats collected for one request."""
+
+    __slots__ = ('stages', 'db_queries', 'db_seconds')
+
+    def __init__(self):
+        self.stages = {}  # name -> [seconds, calls], in first-seen order
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+    def add(self, name, seconds):
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def record_query(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.db_queries += 1
+
+
+def begin():
+    """Start collecting for the current request; returns (Timings, token for end())."""
+    timings = Timings()
+    return timings, _current.set(timings)
+
+
+def end(token):
+    _current.reset(token)
+
+
+def current():
+    """The Timings of the request being handled, or None."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Time the enclosed block as stage `name` of the current request."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def add(name, seconds):
+    """Record a duration measured elsewhere as stage `name` of the current request."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def server_timing(timings, total_seconds):
+    """Server-Timing header value (durations in milliseconds)."""
+    parts = [f'{name};dur={seconds * 1000:.2f}' for name, (seconds, _) in timings.stages.items()]
+    if timings.db_queries:
+        parts.append(f'db;dur={timings.db_seconds * 1000:.2f};desc="{timings.db_queries} queries"')
+    parts.append(f'total;dur={total_seconds * 1000:.2f}')
+    return ', '.join(parts)
+
+
+def log_record(timings, total_seconds, method, route, status):
+    """Dict logged as one JSON line per request."""
+    return {
+        'method': method,
+        'route': route,
+        'status': status,
+        'duration_ms': round(total_seconds * 1000, 2),
+        'db_queries': timings.db_queries,
+        'db_ms': round(timings.db_seconds * 1000, 2),
+        'stages': {
+            name: {'ms': round(seconds * 1000, 2), 'calls': calls}
+            for name, (seconds, calls) in timings.stages.items()
+        },
+    }
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Aggregated request, stage and query metrics, keyed by label tuples."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}        # (route, method, status) -> count
+        self.request_seconds = {}  # (route, method) -> Histogram
+        self.stage_seconds = {}   # (route, stage) -> Histogram
+        self.db_queries = {}      # route -> count
+        self.counters = {}        # (name, ((label, value), ...)) -> count
+
+    def observe(self, timings, total_seconds, method, route, status):
+        with self._lock:
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self._histogram(self.request_seconds, (route, method)).observe(total_seconds)
+            for name, (seconds, _) in timings.stages.items():
+                self._histogram(self.stage_seconds, (route, name)).observe(seconds)
+            if timings.db_queries:
+                self._histogram(self.stage_seconds, (route, 'db')).observe(timings.db_seconds)
+                self.db_queries[route] = self.db_queries.get(route, 0) + timings.db_queries
+
+    def inc(self, name, amount=1, **labels):
+        """Add `amount` to counter `{METRIC_PREFIX}_{name}`; describe new names in COUNTER_HELP."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @staticmethod
+    def _histogram(table, key):
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram()
+        return histogram
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.request_seconds.clear()
+            self.stage_seconds.clear()
+            self.db_queries.clear()
+            self.counters.clear()
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            requests = sorted(self.requests.items())
+            request_seconds = [(k, _copy(h)) for k, h in sorted(self.request_seconds.items())]
+            stage_seconds = [(k, _copy(h)) for k, h in sorted(self.stage_seconds.items())]
+            db_queries = sorted(self.db_queries.items())
+            counters = sorted(self.counters.items())
+        lines = []
+        name = f'{METRIC_PREFIX}_requests_total'
+        lines += [f'# HELP {name} HTTP requests handled.', f'# TYPE {name} counter']
+        for (route, method, status), count in requests:
+            lines.append(f'{name}{_labels(route=route, method=method, status=status)} {count}')
+        name = f'{METRIC_PREFIX}_request_duration_seconds'
+        lines += [f'# HELP {name} Wall time per request.', f'# TYPE {name} histogram']
+        for (route, method), histogram in request_seconds:
+            lines += _histogram_lines(name, histogram, route=route, method=method)
+        name = f'{METRIC_PREFIX}_stage_duration_seconds'
+        lines += [f'# HELP {name} Time per request spent in each stage (db, ml.*, t5.*, translate.*).',
+                  f'# TYPE {name} histogram']
+        for (route, stage_name), histogram in stage_seconds:
+            lines += _histogram_lines(name, histogram, route=route, stage=stage_name)
+        name = f'{METRIC_PREFIX}_db_queries_total'
+        lines += [f'# HELP {name} SQL queries executed while handling requests.', f'# TYPE {name} counter']
+        for route, count in db_queries:
+            lines.append(f'{name}{_labels(route=route)} {count}')
+        described = set()
+        for (counter, labels), count in counters:
+            name = f'{METRIC_PREFIX}_{counter}'
+            if counter not in described:
+                described.add(counter)
+                lines += [f'# HELP {name} {COUNTER_HELP.get(counter, counter)}', f'# TYPE {name} counter']
+            value = f'{count:.6f}' if isinstance(count, float) else count
+            lines.append(f'{name}{_labels(**dict(labels))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def render_gauges(name, help_text, samples):
+    """Prometheus lines for gauge `{METRIC_PREFIX}_{name}`; samples are (labels dict, value) pairs."""
+    name = f'{METRIC_PREFIX}_{name}'
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+    for labels, value in samples:
+        lines.append(f'{name}{_labels(**labels)} {value:.6g}')
+    return '\n'.join(lines) + '\n'
+
+
+def _copy(histogram):
+    copy = Histogram()
+    copy.counts = list(histogram.counts)
+    copy.sum = histogram.sum
+    copy.count = histogram.count
+    return copy
+
+
+def _histogram_lines(name, histogram, **labels):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(BUCKETS + ('+Inf',), histogram.counts):
+        cumulative += count
+        le = bound if isinstance(bound, str) else repr(bound)
+        lines.append(f'{name}_bucket{_labels(**labels, le=le)} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**labels)} {histogram.sum:.6f}')
+    lines.append(f'{name}_count{_labels(**labels)} {histogram.count}')
+    return lines
+
+
+def _labels(**labels):
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+registry = Registry()
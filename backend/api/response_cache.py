@@ -0,0 +1,145 @@
+"""
+Server-side response cache for polled dashboard reads.
+
+`@cached_response(scope)` caches the JSON of a GET view per scope, role, user
+and query string, with an ETag so clients revalidating with If-None-Match get
+304 Not Modified. Entries are tagged with a generation number: per-user for
+farmer scopes, global for MFI/admin scopes. Signal receivers (api/signals.py)
+bump the generations when LoanApplication, Loan, Repayment or UserProfile rows
+are saved, which makes every stale entry miss without having to enumerate keys.
+A cache hit is a single get_many() round trip and no database queries.
+
+Uses the `responses` cache alias, which settings restrict to backends shared
+between processes (file or database): invalidations made by management
+commands and the job worker must reach every web worker.
+"""
+import functools
+import hashlib
+import json
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from .authentication import resolve_role
+
+CACHE_ALIAS = 'responses'
+ENTRY_TTL_SECONDS = getattr(settings, 'RESPONSE_CACHE_SECONDS', 300)
+# Generations never expire, but a cache may still cull them (LocMem and file backends evict past
+# MAX_ENTRIES). A missing generation is therefore seeded with a fresh random value, never a
+# predictable one, so entries tagged with the evicted generation can never match again.
+_GEN_TTL_SECONDS = None
+
+_GLOBAL_GEN_KEY = 'resp:gen:global'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _user_gen_key(user_id):
+    return f'resp:gen:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    """Expire cached responses in per-user scopes for this user."""
+    if user_id is None:
+        return
+    _bump(_user_gen_key(user_id))
+
+
+def invalidate_global():
+    """Expire cached responses in global (MFI/admin) scopes."""
+    _bump(_GLOBAL_GEN_KEY)
+
+
+def invalidate_all():
+    """Expire everything; for bulk writes that bypass model signals (bulk_update, QuerySet.update)."""
+    _cache().clear()
+
+
+def _new_generation():
+    return secrets.randbits(62)
+
+
+def _bump(key):
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), _GEN_TTL_SECONDS)
+
+
+def _current_generation(cache, key):
+    """Generation stored at `key`; seeds a fresh one when it is missing (never cached or culled)."""
+    gen = _new_generation()
+    if not cache.add(key, gen, _GEN_TTL_SECONDS):
+        gen = cache.get(key, gen)
+    return gen
+
+
+def _etag(data):
+    body = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return '"{}"'.format(hashlib.md5(body.encode('utf-8')).hexdigest())
+
+
+def _etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+def _finalize(response, etag):
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    response['Vary'] = 'Authorization, Cookie'
+    return response
+
+
+def cached_response(scope, per_user=True):
+    """
+    Cache a GET view's 200 response. `per_user=False` marks a scope whose data is
+    global (e.g. MFI portfolio), invalidated by any loan write.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or not getattr(settings, 'RESPONSE_CACHE_ENABLED', True):
+                return view(request, *args, **kwargs)
+            user = request.user
+            if not user.is_authenticated:
+                return view(request, *args, **kwargs)
+            role = getattr(request, 'role', None) or resolve_role(user)
+            query = request.META.get('QUERY_STRING', '')
+            entry_key = f'resp:{scope}:{role}:{user.pk}:{query}'
+            gen_key = _user_gen_key(user.pk) if per_user else _GLOBAL_GEN_KEY
+
+            cache = _cache()
+            found = cache.get_many([entry_key, gen_key])
+            gen = found.get(gen_key)
+            if gen is None:
+                gen = _current_generation(cache, gen_key)
+            entry = found.get(entry_key)
+            if entry is not None and entry[0] == gen:
+                _, etag, data = entry
+                if _etag_matches(request, etag):
+                    return _finalize(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+                response = _finalize(Response(data), etag)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            etag = _etag(response.data)
+            cache.set(entry_key, (gen, etag, response.data), ENTRY_TTL_SECONDS)
+            if _etag_matches(request, etag):
+                return _finalize(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+            response['X-Cache'] = 'MISS'
+            return _finalize(response, etag)
+        return wrapper
+    return decorator
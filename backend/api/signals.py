@@ -0,0 +1,60 @@
+"""
+Signal receivers that keep in-process caches consistent with the database.
+Connected in ApiConfig.ready().
+"""
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import authentication, response_cache
+from .models import FarmerProfile, Loan, LoanApplication, Repayment, UserProfile
+
+
+# ----- Cached token authentication (api/authentication.py) -----
+
+@receiver(post_delete, sender=Token, dispatch_uid='api.auth_cache.token_deleted')
+def _token_deleted(sender, instance, **kwargs):
+    authentication.invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=UserProfile, dispatch_uid='api.auth_cache.role_saved')
+@receiver(post_delete, sender=UserProfile, dispatch_uid='api.auth_cache.role_deleted')
+@receiver(post_save, sender=FarmerProfile, dispatch_uid='api.auth_cache.farmer_profile_saved')
+@receiver(post_delete, sender=FarmerProfile, dispatch_uid='api.auth_cache.farmer_profile_deleted')
+def _profile_changed(sender, instance, **kwargs):
+    authentication.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL, dispatch_uid='api.auth_cache.user_saved')
+def _user_saved(sender, instance, created, **kwargs):
+    # is_active / is_staff changes affect authentication and the resolved role
+    if not created:
+        authentication.invalidate_user(instance.pk)
+
+
+# ----- Dashboard response cache (api/response_cache.py) -----
+
+@receiver(post_save, sender=LoanApplication, dispatch_uid='api.response_cache.application_saved')
+@receiver(post_delete, sender=LoanApplication, dispatch_uid='api.response_cache.application_deleted')
+def _application_changed(sender, instance, **kwargs):
+    response_cache.invalidate_user(instance.user_id)
+    response_cache.invalidate_global()
+
+
+@receiver(post_save, sender=Loan, dispatch_uid='api.response_cache.loan_saved')
+@receiver(post_delete, sender=Loan, dispatch_uid='api.response_cache.loan_deleted')
+def _loan_changed(sender, instance, **kwargs):
+    if Loan.application.is_cached(instance):
+        user_id = instance.application.user_id
+    else:
+        user_id = LoanApplication.objects.filter(pk=instance.application_id).values_list('user_id', flat=True).first()
+    response_cache.invalidate_user(user_id)
+    response_cache.invalidate_global()
+
+
+@receiver(post_save, sender=Repayment, dispatch_uid='api.response_cache.repayment_saved')
+@receiver(post_delete, sender=Repayment, dispatch_uid='api.response_cache.repayment_deleted')
+@receiver(post_save, sender=UserProfile, dispatch_uid='api.response_cache.role_saved')
+def _global_changed(sender, instance, **kwargs):
+    response_cache.invalidate_global()
@@ -0,0 +1,488 @@
+"""
+Synthetic farmers, MFIs, applications, loans, repayments, activity events and chat
+interactions for load and scale testing (see `manage.py generatesyntheticdata`).
+
+Values are drawn column-wise with NumPy from plausible distributions: log-normal
+incomes in RWF, loan sizes tied to income, credit scores around 620, and risk
+scores derived from them. Defaults follow the portfolio risk calibration, so
+repayment histories match the risk scores. Rows are written with bulk_create, one
+transaction per chunk of farmers, so memory stays bounded for millions of rows.
+Timestamps are spread over the last `days` days rather than set to "now".
+
+Generated users are named `<prefix>-...@synthetic.agrifinconnect.rw`, so
+`delete_synthetic(prefix)` can remove everything again.
+"""
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .db_utils import bulk_insert_rows
+from .models import (
+    AgriculturalRecord,
+    ChatInteraction,
+    FarmerProfile,
+    GetStartedEvent,
+    Loan,
+    LoanApplication,
+    PasswordResetToken,
+    Repayment,
+    RepaymentPosting,
+    UserProfile,
+)
+
+User = get_user_model()
+
+EMAIL_DOMAIN = 'synthetic.agrifinconnect.rw'
+DEFAULT_SEED = 2024
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_DAYS = 365
+# Applications younger than this are still waiting for review
+PENDING_DAYS = 7
+
+FIRST_NAMES = ('Jean', 'Marie', 'Claude', 'Aline', 'Eric', 'Diane', 'Patrick', 'Grace', 'Emmanuel', 'Josiane',
+               'Olivier', 'Chantal', 'Innocent', 'Vestine', 'Theogene', 'Solange')
+LAST_NAMES = ('Uwimana', 'Niyonzima', 'Mukamana', 'Habimana', 'Uwase', 'Nshimiyimana', 'Mukeshimana',
+              'Hakizimana', 'Ingabire', 'Bizimana', 'Nyiraneza', 'Twagirayezu')
+DISTRICTS = ('Musanze', 'Huye', 'Nyagatare', 'Rubavu', 'Muhanga', 'Kayonza', 'Rwamagana', 'Nyamagabe',
+             'Gicumbi', 'Karongi', 'Bugesera', 'Rusizi')
+CROPS = ('Maize', 'Beans', 'Irish potatoes', 'Cassava', 'Rice', 'Coffee', 'Tea', 'Bananas', 'Sorghum')
+SEASONS = ('Season A', 'Season B', 'Season C')
+
+EMPLOYMENT = (('Self-Employed', 0.65), ('Employed', 0.20), ('Unemployed', 0.15))
+EDUCATION = (('High School', 0.50), ('Associate', 0.20), ('Bachelor', 0.22), ('Master', 0.08))
+MARITAL = (('Married', 0.60), ('Single', 0.30), ('Divorced', 0.10))
+PURPOSE = (('Other', 0.50), ('Debt Consolidation', 0.20), ('Education', 0.15), ('Home', 0.15))
+DURATIONS = ((6, 0.10), (12, 0.35), (18, 0.20), (24, 0.25), (36, 0.10))
+
+EVENT_TYPES = (('modal_opened', 0.6), ('register_clicked', 0.25), ('login_clicked', 0.15))
+EVENT_ROLES = (('farmers', 0.7), ('microfinances', 0.25), ('admin', 0.05))
+USER_AGENTS = (
+    'Mozilla/5.0 (Linux; Android 12) AppleWebKit/537.36 Chrome/120.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Linux; Android 10; itel) AppleWebKit/537.36 Chrome/114.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/121.0 Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+)
+CHAT_MESSAGES = {
+    'en': ('How do I apply for a loan?', 'What interest rate will I pay?', 'Can I repay early?',
+           'Why was my application rejected?', 'How is my risk score calculated?'),
+    'fr': ('Comment demander un prêt ?', 'Quel taux d\'intérêt vais-je payer ?', 'Puis-je rembourser plus tôt ?'),
+    'rw': ('Nasaba inguzanyo nte?', 'Inyungu ni angahe?', 'Nshobora kwishyura mbere y\'igihe?'),
+}
+CHAT_LANGUAGES = (('en', 0.5), ('rw', 0.3), ('fr', 0.2))
+CHAT_REPLY = 'Thank you for your question. Please check the loan eligibility tool for details.'
+
+
+def _choice(rng, options, size):
+    """Weighted draw of `size` values from ((value, weight), ...), as a NumPy array."""
+    values = [v for v, _ in options]
+    weights = np.array([w for _, w in options], dtype=np.float64)
+    return np.array(values)[rng.choice(len(values), size=size, p=weights / weights.sum())]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values set on the objects instead of auto_now(_add)."""
+    fields = [
+        f for model in models for f in model._meta.concrete_fields
+        if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+    ]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+class Stats:
+    """Rows inserted and seconds spent inserting, per model."""
+
+    def __init__(self):
+        self.rows = {}
+        self.seconds = {}
+        # Whole run including data generation, set by SyntheticDataGenerator.generate()
+        self.wall_seconds = 0.0
+
+    def add(self, name, rows, seconds):
+        self.rows[name] = self.rows.get(name, 0) + rows
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def as_dict(self):
+        total_rows = sum(self.rows.values())
+        total_seconds = sum(self.seconds.values())
+        return {
+            'tables': {
+                name: {
+                    'rows': rows,
+                    'seconds': round(self.seconds[name], 2),
+                    'rows_per_s': round(rows / self.seconds[name]) if self.seconds[name] else None,
+                }
+                for name, rows in self.rows.items()
+            },
+            'total_rows': total_rows,
+            'insert_seconds': round(total_seconds, 2),
+            'wall_seconds': round(self.wall_seconds, 2),
+            'rows_per_s': round(total_rows / self.wall_seconds) if self.wall_seconds else None,
+        }
+
+
+class SyntheticDataGenerator:
+    def __init__(self, seed=DEFAULT_SEED, batch_size=DEFAULT_BATCH_SIZE, prefix='synthetic', days=DEFAULT_DAYS,
+                 score_with_models=False, progress=None):
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = max(1, batch_size)
+        self.prefix = prefix
+        self.days = max(1, days)
+        self.score_with_models = score_with_models
+        self.progress = progress
+        self.now = datetime.now(dt_timezone.utc).replace(microsecond=0)
+        self.stats = Stats()
+        # Continue numbering after earlier runs with the same prefix, so usernames stay unique
+        self._next_user = User.objects.filter(username__startswith=f'{prefix}-').count()
+
+    # ----- helpers -----
+
+    def _timed_bulk_create(self, model, objs, name=None):
+        started = time.perf_counter()
+        created = model.objects.bulk_create(objs, batch_size=self.batch_size)
+        self.stats.add(name or model._meta.model_name, len(objs), time.perf_counter() - started)
+        return created
+
+    def _timed_insert(self, model, fields, rows):
+        """Leaf tables: plain tuples through db_utils.bulk_insert_rows (no model instances, no ids back)."""
+        started = time.perf_counter()
+        bulk_insert_rows(model, fields, rows, batch_size=self.batch_size)
+        self.stats.add(model._meta.model_name, len(rows), time.perf_counter() - started)
+
+    def _timestamps(self, size, max_age_days=None, min_age_days=0.0):
+        """UTC datetimes between max_age_days and min_age_days ago (uniform)."""
+        max_age = self.days if max_age_days is None else max_age_days
+        ages = self.rng.uniform(min_age_days * 86400, max_age * 86400, size=size)
+        return [self.now - timedelta(seconds=float(s)) for s in ages]
+
+    def _users(self, role, count, joined):
+        start = self._next_user
+        self._next_user += count
+        first = self.rng.integers(len(FIRST_NAMES), size=count)
+        last = self.rng.integers(len(LAST_NAMES), size=count)
+        users = [
+            User(
+                username=f'{self.prefix}-{role}-{start + i}@{EMAIL_DOMAIN}',
+                email=f'{self.prefix}-{role}-{start + i}@{EMAIL_DOMAIN}',
+                password='!',  # unusable; hashing millions of passwords would dominate the run
+                first_name=FIRST_NAMES[first[i]],
+                last_name=LAST_NAMES[last[i]],
+                date_joined=joined[i],
+            )
+            for i in range(count)
+        ]
+        users = self._timed_bulk_create(User, users, 'user')
+        self._timed_insert(UserProfile, ('user_id', 'role'), [(u.id, role) for u in users])
+        return users
+
+    # ----- public -----
+
+    def generate(self, farmers, applications, mfis=3, events=0, chats=0):
+        """Insert everything; returns Stats.as_dict()."""
+        started = time.perf_counter()
+        with explicit_timestamps(LoanApplication, Loan):
+            with transaction.atomic():
+                self.mfis = self._users('microfinance', max(1, mfis), self._timestamps(max(1, mfis)))
+            self.farmer_ids = []
+            done_apps = 0
+            for start in range(0, farmers, self.batch_size):
+                n = min(self.batch_size, farmers - start)
+                # Spread applications evenly over the farmer chunks; the last chunk takes the remainder
+                n_apps = applications - done_apps if start + n >= farmers else applications * n // farmers
+                with transaction.atomic():
+                    self._farmer_chunk(n, n_apps)
+                done_apps += n_apps
+                self._report()
+            for start in range(0, events, self.batch_size):
+                with transaction.atomic():
+                    self._events(min(self.batch_size, events - start))
+            if events:
+                self._report()
+            for start in range(0, chats, self.batch_size):
+                with transaction.atomic():
+                    self._chats(min(self.batch_size, chats - start))
+            if chats:
+                self._report()
+        self.stats.wall_seconds += time.perf_counter() - started
+        return self.stats.as_dict()
+
+    def _report(self):
+        if self.progress:
+            self.progress(self.stats)
+
+    # ----- farmers and their loans -----
+
+    def _farmer_chunk(self, n, n_apps):
+        rng = self.rng
+        users = self._users('farmer', n, self._timestamps(n, min_age_days=min(30, self.days)))
+        self.farmer_ids.extend(u.id for u in users)
+        district = rng.integers(len(DISTRICTS), size=n)
+        phone = rng.integers(1_000_000, 10_000_000, size=n)
+        self._timed_insert(FarmerProfile, ('user_id', 'location', 'phone', 'cooperative_name', 'created_at', 'updated_at'), [
+            (u.id, DISTRICTS[district[i]], f'+25078{phone[i]}', f'{DISTRICTS[district[i]]} Farmers Cooperative',
+             u.date_joined, u.date_joined)
+            for i, u in enumerate(users)
+        ])
+        crop = rng.integers(len(CROPS), size=n)
+        season = rng.integers(len(SEASONS), size=n)
+        land = np.round(rng.gamma(2.0, 0.4, size=n) + 0.1, 2)
+        yields = np.round(land * rng.uniform(800, 3000, size=n), 2)
+        land, yields = land.tolist(), yields.tolist()
+        self._timed_insert(AgriculturalRecord, ('user_id', 'crop_type', 'land_size_hectares', 'estimated_yield', 'season', 'created_at'), [
+            (u.id, CROPS[crop[i]], land[i], yields[i], SEASONS[season[i]], u.date_joined)
+            for i, u in enumerate(users)
+        ])
+        if n_apps <= 0:
+            return
+        apps = self._applications(users, n_apps)
+        loans = self._loans(apps)
+        self._repayments(loans, {a.id: a.risk_score for a in apps})
+
+    def _applications(self, users, n):
+        rng = self.rng
+        owners = rng.integers(len(users), size=n)
+        age = np.clip(rng.normal(38, 10, size=n), 18, 70).astype(int)
+        income = np.round(rng.lognormal(np.log(1_500_000), 0.6, size=n), -3)
+        credit = np.clip(rng.normal(620, 75, size=n), 300, 850).astype(int)
+        # Requested amount as a share of annual income
+        share = 0.05 + 0.8 * rng.beta(2, 5, size=n)
+        amount = np.maximum(np.round(income * share, -3), 50_000)
+        duration = _choice(rng, DURATIONS, n).astype(int)
+        employment = _choice(rng, EMPLOYMENT, n)
+        education = _choice(rng, EDUCATION, n)
+        marital = _choice(rng, MARITAL, n)
+        purpose = _choice(rng, PURPOSE, n)
+        created = self._timestamps(n, min_age_days=0)
+        age_days = np.array([(self.now - c).total_seconds() / 86400 for c in created])
+
+        # Heuristic scores: worse credit, higher leverage and no income raise risk
+        risk = np.clip(
+            50 + (620 - credit) / 15 + (share - 0.3) * 20 + (employment == 'Unemployed') * 6
+            + rng.normal(0, 4, size=n),
+            20, 85,
+        )
+        approved = rng.random(n) < 1 / (1 + np.exp((risk - 52) / 3))
+        recommended = np.where(approved, np.round(amount * np.clip(1.1 - (risk - 40) / 50, 0.3, 1.2), -3), np.nan)
+
+        reviewed = age_days > PENDING_DAYS
+        accepted = rng.random(n) < 0.9
+        status = np.where(~reviewed, 'pending', np.where(approved & accepted, 'approved', 'rejected'))
+        review_delay = rng.uniform(0.5, PENDING_DAYS, size=n)
+        reviewer = rng.integers(len(self.mfis), size=n)
+
+        # Plain Python values for the per-row loop
+        age, income, credit, amount, duration = age.tolist(), income.tolist(), credit.tolist(), amount.tolist(), duration.tolist()
+        employment, education, marital, purpose = employment.tolist(), education.tolist(), marital.tolist(), purpose.tolist()
+        status, approved, reviewed, risk = status.tolist(), approved.tolist(), reviewed.tolist(), risk.tolist()
+        recommended, review_delay, owners, reviewer = recommended.tolist(), review_delay.tolist(), owners.tolist(), reviewer.tolist()
+        apps = []
+        for i in range(n):
+            reviewed_at = created[i] + timedelta(days=review_delay[i]) if reviewed[i] else None
+            apps.append(LoanApplication(
+                user=users[owners[i]],
+                age=age[i],
+                annual_income=income[i],
+                credit_score=credit[i],
+                loan_amount_requested=amount[i],
+                loan_duration_months=duration[i],
+                employment_status=employment[i],
+                education_level=education[i],
+                marital_status=marital[i],
+                loan_purpose=purpose[i],
+                eligibility_approved=approved[i],
+                eligibility_reason='',
+                risk_score=round(risk[i], 2),
+                recommended_amount=None if recommended[i] != recommended[i] else recommended[i],
+                status=status[i],
+                reviewed_by=self.mfis[reviewer[i]] if reviewed[i] else None,
+                reviewed_at=reviewed_at,
+                rejection_reason='Affordability below policy threshold' if status[i] == 'rejected' else '',
+                created_at=created[i],
+                updated_at=reviewed_at or created[i],
+            ))
+        if self.score_with_models:
+            self._score(apps)
+        return self._timed_bulk_create(LoanApplication, apps)
+
+    def _score(self, apps):
+        """Replace the heuristic scores with the real models (one batch call per model)."""
+        from .explanations import eligibility_reason
+        from .ml_service import application_to_ml_payload, score_batch
+        started = time.perf_counter()
+        payloads = [application_to_ml_payload(a) for a in apps]
+        scores = score_batch(payloads)
+        for app, payload, ok, risk, amount in zip(
+            apps, payloads, scores['approved'].tolist(), scores['risk_score'].tolist(), scores['recommended_amount'].tolist()
+        ):
+            app.eligibility_approved = ok
+            app.eligibility_reason = eligibility_reason(payload, ok)
+            app.risk_score = risk
+            app.recommended_amount = round(amount, 2) if ok else None
+            if app.status == 'approved' and not ok:
+                app.status = 'rejected'
+        self.stats.add('ml_scoring', 0, time.perf_counter() - started)
+
+    def _loans(self, apps):
+        approved = [a for a in apps if a.status == 'approved']
+        if not approved:
+            return []
+        rate = np.round(self.rng.uniform(0.12, 0.24, size=len(approved)), 4)
+        loans = []
+        for app, r in zip(approved, rate.tolist()):
+            principal = float(app.recommended_amount or app.loan_amount_requested)
+            months = app.loan_duration_months
+            monthly_rate = r / 12
+            payment = principal * monthly_rate / (1 - (1 + monthly_rate) ** -months)
+            disbursed = app.reviewed_at + timedelta(days=1)
+            loans.append(Loan(
+                application=app, amount=principal, interest_rate=r, duration_months=months,
+                monthly_payment=round(payment, 2), disbursed_at=disbursed, created_at=disbursed,
+            ))
+        return self._timed_bulk_create(Loan, loans)
+
+    def _repayments(self, loans, risk_by_app):
+        """Monthly schedules; loans that default stop paying from a random month onwards."""
+        if not loans:
+            return
+        from .portfolio_risk_service import calibrate
+        rng = self.rng
+        months = np.array([lo.duration_months for lo in loans])
+        pd_ = calibrate([risk_by_app.get(lo.application_id, np.nan) for lo in loans])
+        # A defaulting loan stops at a uniform month of its term (np.inf = never defaults)
+        default_month = np.where(rng.random(len(loans)) < pd_, np.floor(rng.random(len(loans)) * months), np.inf)
+        loan_index = np.repeat(np.arange(len(loans)), months)
+        month = np.arange(len(loan_index)) - np.repeat(np.cumsum(months) - months, months)
+        pay_offset = rng.integers(-5, 11, size=len(loan_index))
+        partial = rng.random(len(loan_index)) < 0.05
+        today = self.now.date()
+        repayments = []
+        for k, (li, m) in enumerate(zip(loan_index.tolist(), month.tolist())):
+            loan = loans[li]
+            due = (loan.disbursed_at + timedelta(days=30 * (m + 1))).date()
+            amount = loan.monthly_payment
+            status, paid_at, amount_paid = 'pending', None, 0.0
+            if m >= default_month[li]:
+                status = 'overdue' if due < today else 'pending'
+            elif due < today:
+                paid_day = due + timedelta(days=int(pay_offset[k]))
+                if paid_day <= today:
+                    paid_at = datetime(paid_day.year, paid_day.month, paid_day.day, 9, tzinfo=dt_timezone.utc)
+                    if partial[k]:
+                        status, amount_paid = 'overdue', round(amount * 0.5, 2)
+                    else:
+                        status, amount_paid = 'paid', amount
+                else:
+                    status = 'overdue'
+            repayments.append((
+                loan.id, amount, due, paid_at, status, amount_paid,
+                f'SYN-{loan.id}-{m + 1}' if paid_at else '', loan.created_at,
+            ))
+        self._timed_insert(Repayment, (
+            'loan_id', 'amount', 'due_date', 'paid_at', 'status', 'amount_paid', 'payment_reference', 'created_at',
+        ), repayments)
+
+    # ----- activity and chat -----
+
+    def _events(self, n):
+        rng = self.rng
+        event_type = _choice(rng, EVENT_TYPES, n).tolist()
+        role = _choice(rng, EVENT_ROLES, n).tolist()
+        octets = rng.integers(1, 255, size=(n, 4)).tolist()
+        agent = rng.integers(len(USER_AGENTS), size=n).tolist()
+        created = self._timestamps(n)
+        self._timed_insert(GetStartedEvent, ('event_type', 'role', 'ip_address', 'user_agent', 'created_at'), [
+            (event_type[i], role[i], '.'.join(map(str, octets[i])), f'{USER_AGENTS[agent[i]]} {self.prefix}', created[i])
+            for i in range(n)
+        ])
+
+    def _chats(self, n):
+        rng = self.rng
+        user_ids = self.farmer_ids or list(
+            User.objects.filter(username__startswith=f'{self.prefix}-farmer-').values_list('id', flat=True)[:100_000]
+        )
+        if not user_ids:
+            raise ValueError('Chat interactions need synthetic farmers; generate some first')
+        users = rng.choice(np.array(user_ids), size=n)
+        language = _choice(rng, CHAT_LANGUAGES, n)
+        pick = rng.integers(1_000_000, size=n)
+        model_ms = rng.lognormal(np.log(900), 0.5, size=n)
+        translation_ms = np.where(language == 'en', 0.0, rng.lognormal(np.log(400), 0.5, size=n))
+        available = rng.random(n) < 0.97
+        reply_hit = rng.random(n) < 0.2
+        created = self._timestamps(n)
+        users, pick, available, reply_hit = users.tolist(), pick.tolist(), available.tolist(), reply_hit.tolist()
+        model_ms, translation_ms, language = model_ms.tolist(), translation_ms.tolist(), language.tolist()
+        chats = []
+        for i in range(n):
+            messages = CHAT_MESSAGES[language[i]]
+            chats.append((
+                users[i], messages[pick[i] % len(messages)], CHAT_REPLY, language[i], round(model_ms[i], 1),
+                round(translation_ms[i], 1), available[i], reply_hit[i], reply_hit[i] and language[i] != 'en', created[i],
+            ))
+        self._timed_insert(ChatInteraction, (
+            'user_id', 'message', 'reply', 'language', 'model_latency_ms', 'translation_latency_ms',
+            'model_available', 'reply_cache_hit', 'translation_cache_hit', 'created_at',
+        ), chats)
+
+
+def delete_synthetic(prefix='synthetic', batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Delete every row generated with `prefix`; returns deleted counts per model.
+
+    Rows are removed with raw set-based DELETEs (QuerySet._raw_delete), children first,
+    `batch_size` users per transaction: ORM delete() would load every row to collect
+    cascades and send a post_delete signal per row, which takes hours for millions of
+    rows. Caches those signals would have expired are cleared once at the end.
+    """
+    from rest_framework.authtoken.models import Token
+
+    from . import authentication, response_cache
+
+    user_ids = list(
+        User.objects.filter(username__startswith=f'{prefix}-', username__endswith=f'@{EMAIL_DOMAIN}')
+        .order_by('id').values_list('id', flat=True)
+    )
+    # (model, lookup from the model to the user id), in foreign-key order
+    children = (
+        (RepaymentPosting, 'repayment__loan__application__user_id__in'),
+        (Repayment, 'loan__application__user_id__in'),
+        (Loan, 'application__user_id__in'),
+        (LoanApplication, 'user_id__in'),
+        (ChatInteraction, 'user_id__in'),
+        (AgriculturalRecord, 'user_id__in'),
+        (FarmerProfile, 'user_id__in'),
+        (UserProfile, 'user_id__in'),
+        (PasswordResetToken, 'user_id__in'),
+        (Token, 'user_id__in'),
+        (User.groups.through, 'user_id__in'),
+        (User.user_permissions.through, 'user_id__in'),
+    )
+    counts = {model._meta.model_name: 0 for model, _ in children}
+    counts['user'] = 0
+    for start in range(0, len(user_ids), batch_size):
+        ids = user_ids[start:start + batch_size]
+        with transaction.atomic():
+            # on_delete=SET_NULL, done by hand since the ORM collector is bypassed
+            LoanApplication.objects.filter(reviewed_by_id__in=ids).update(reviewed_by=None)
+            for model, lookup in children:
+                qs = model.objects.filter(**{lookup: ids})
+                counts[model._meta.model_name] += qs._raw_delete(qs.db)
+            qs = User.objects.filter(id__in=ids)
+            counts['user'] += qs._raw_delete(qs.db)
+    events = GetStartedEvent.objects.filter(user_agent__endswith=f' {prefix}')
+    counts['getstartedevent'] = events._raw_delete(events.db)
+
+    response_cache.invalidate_global()
+    authentication.clear_cache()
+    return counts
@@ -0,0 +1,340 @@
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import application_scoring, authentication, job_queue, repayment_service, response_cache
+from api.encoder_cache import EncoderCache
+from api.models import FarmerProfile, Job, Loan, LoanApplication, Repayment, RepaymentPosting, UserProfile
+
+User = get_user_model()
+
+
+def create_user(username, role):
+    user = User.objects.create_user(username, username, 'pw')
+    UserProfile.objects.create(user=user, role=role)
+    return user
+
+
+class FileResponseCacheMixin:
+    """Points the `responses` cache at a temporary directory for the duration of each test."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        responses = {**settings.CACHES['responses'], 'LOCATION': directory.name}
+        override = override_settings(CACHES={**settings.CACHES, 'responses': responses})
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class FakeEncoderOutput:
+    """Stand-in for transformers' BaseModelOutput (only `last_hidden_state`)."""
+
+    def __init__(self, last_hidden_state):
+        self.last_hidden_state = last_hidden_state
+
+
+def beam_generate(encoder_outputs, num_beams=4):
+    """Mutates encoder_outputs the way generate() does when expanding inputs for beam search."""
+    assert encoder_outputs.last_hidden_state.shape[0] == 1, 'encoder batch was already expanded'
+    encoder_outputs.last_hidden_state = np.repeat(encoder_outputs.last_hidden_state, num_beams, axis=0)
+    return encoder_outputs.last_hidden_state.shape[0]
+
+
+class EncoderCacheTests(SimpleTestCase):
+    def test_beam_decode_does_not_corrupt_cached_outputs(self):
+        cache = EncoderCache(max_bytes=1024 * 1024)
+        model = object()
+        input_ids = np.array([[5, 6, 7, 1]], dtype='int64')
+        calls = []
+
+        def encode():
+            calls.append(1)
+            return FakeEncoderOutput(np.ones((1, 4, 8), dtype='float32'))
+
+        for expected_hit in (False, True, True):
+            outputs, hit = cache.get_or_encode('t5', model, input_ids, encode)
+            self.assertEqual(hit, expected_hit)
+            self.assertEqual(beam_generate(outputs), 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.bytes, 1 * 4 * 8 * 4)
+
+
+class ResponseCacheGenerationTests(FileResponseCacheMixin, SimpleTestCase):
+    def test_culled_generation_is_not_reused(self):
+        cache = response_cache._cache()
+        key = response_cache._user_gen_key('test-culled')
+        cache.delete(key)
+        first = response_cache._current_generation(cache, key)
+        self.assertEqual(response_cache._current_generation(cache, key), first)
+        cache.delete(key)  # evicted past MAX_ENTRIES
+        self.assertNotEqual(response_cache._current_generation(cache, key), first)
+        cache.delete(key)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        authentication.clear_cache()
+        self.user = User.objects.create_user('auth-farmer', 'auth-farmer@example.com', 'pw')
+        UserProfile.objects.create(user=self.user, role='farmer')
+        FarmerProfile.objects.create(user=self.user, location='Musanze')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = authentication.CachedTokenAuthentication()
+
+    def tearDown(self):
+        authentication.clear_cache()
+
+    def test_cache_hits_return_fresh_instances(self):
+        first, _ = self.auth.authenticate_credentials(self.token.key)
+        first.farmer_profile.location = 'edited by another request'
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+            self.assertEqual(user.farmer_profile.location, 'Musanze')
+            self.assertEqual(authentication.resolve_role(user), 'farmer')
+            self.assertIs(token.user, user)
+        self.assertIsNot(user, first)
+
+    def test_invalidate_user_drops_all_tokens_of_that_user(self):
+        self.auth.authenticate_credentials(self.token.key)
+        other = User.objects.create_user('auth-other', 'auth-other@example.com', 'pw')
+        other_key = Token.objects.create(user=other).key
+        self.auth.authenticate_credentials(other_key)
+        authentication.invalidate_user(self.user.pk)
+        self.assertIsNone(authentication._cache_get(self.token.key))
+        self.assertIsNotNone(authentication._cache_get(other_key))
+
+
+class ResponseCacheInvalidationTests(FileResponseCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        farmer = create_user('cache-farmer@example.com', 'farmer')
+        app = LoanApplication.objects.create(user=farmer, status='approved')
+        loan = Loan.objects.create(application=app, amount=Decimal('100000'), duration_months=12)
+        Repayment.objects.create(loan=loan, amount=Decimal('10000'), due_date=timezone.localdate() - timedelta(days=1))
+        self.client = APIClient()
+        mfi = create_user('cache-mfi@example.com', 'microfinance')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=mfi).key}')
+
+    def test_management_command_invalidation_reaches_later_requests(self):
+        first = self.client.get('/api/mfi/portfolio/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(first.data['repayments']['overdue'], 0)
+        self.assertEqual(self.client.get('/api/mfi/portfolio/')['X-Cache'], 'HIT')
+
+        # The command gets its own cache connection, as it would in a separate process
+        other_process = caches.create_connection(response_cache.CACHE_ALIAS)
+        with mock.patch.object(response_cache, '_cache', return_value=other_process):
+            call_command('markoverdue', stdout=StringIO())
+
+        after = self.client.get('/api/mfi/portfolio/')
+        self.assertEqual(after['X-Cache'], 'MISS')
+        self.assertEqual(after.data['repayments']['overdue'], 1)
+
+
+class MarkOverdueTests(FileResponseCacheMixin, TestCase):
+    def test_rows_inserted_after_a_run_with_earlier_due_dates_are_marked(self):
+        farmer = create_user('overdue-farmer@example.com', 'farmer')
+        app = LoanApplication.objects.create(user=farmer, status='approved')
+        loan = Loan.objects.create(application=app, amount=Decimal('100000'), duration_months=12)
+        today = timezone.localdate()
+        call_command('markoverdue', stdout=StringIO())
+
+        backfilled = Repayment.objects.create(loan=loan, amount=Decimal('10000'), due_date=today - timedelta(days=30))
+        not_due = Repayment.objects.create(loan=loan, amount=Decimal('10000'), due_date=today)
+        call_command('markoverdue', stdout=StringIO())
+
+        backfilled.refresh_from_db()
+        not_due.refresh_from_db()
+        self.assertEqual(backfilled.status, 'overdue')
+        self.assertEqual(not_due.status, 'pending')
+
+
+class RepaymentPostingTests(FileResponseCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        farmer = create_user('posting-farmer@example.com', 'farmer')
+        app = LoanApplication.objects.create(user=farmer, status='approved')
+        loan = Loan.objects.create(application=app, amount=Decimal('100000'), duration_months=12)
+        self.due = timezone.localdate()
+        self.repayment = Repayment.objects.create(loan=loan, amount=Decimal('1000'), due_date=self.due)
+
+    def row(self, amount, reference):
+        return {'loan_id': self.repayment.loan_id, 'due_date': self.due.isoformat(),
+                'amount': amount, 'reference': reference}
+
+    def test_reference_committed_by_a_concurrent_upload_is_reported_as_duplicate(self):
+        RepaymentPosting.objects.create(repayment=self.repayment, reference='MM-1', amount=Decimal('400'))
+        Repayment.objects.filter(pk=self.repayment.pk).update(amount_paid=Decimal('400'))
+        lookup = repayment_service._applied_references
+        calls = []
+
+        def applied_references(repayment_ids, references):
+            # The first lookup misses the posting, as if the other upload committed right after it
+            calls.append(references)
+            return set() if len(calls) == 1 else lookup(repayment_ids, references)
+
+        with mock.patch.object(repayment_service, '_applied_references', applied_references):
+            report = repayment_service.post_settlement([(1, self.row('400', 'MM-1'))])
+        self.assertEqual(report.matched, 0)
+        self.assertEqual(report.details['unmatched'][0]['reason'], 'duplicate reference')
+        self.repayment.refresh_from_db()
+        self.assertEqual(self.repayment.amount_paid, Decimal('400'))
+        self.assertEqual(self.repayment.status, 'pending')
+
+    def test_partial_payments_from_separate_uploads_accumulate(self):
+        repayment_service.post_settlement([(1, self.row('600', 'MM-1'))])
+        report = repayment_service.post_settlement([(1, self.row('400', 'MM-2')), (2, self.row('400', 'MM-1'))])
+        self.assertEqual((report.matched, report.paid, report.unmatched), (1, 1, 1))
+        self.repayment.refresh_from_db()
+        self.assertEqual(self.repayment.amount_paid, Decimal('1000'))
+        self.assertEqual(self.repayment.status, 'paid')
+
+    def test_unparseable_rows_are_reported_as_invalid(self):
+        rows = [
+            (1, {**self.row('100', 'A'), 'paid_at': '2024-02-30T10:00:00'}),
+            (2, {**self.row('100', 'B'), 'paid_at': 'yesterday'}),
+            (3, self.row('Infinity', 'C')),
+            (4, self.row('NaN', 'D')),
+        ]
+        report = repayment_service.post_settlement(rows)
+        self.assertEqual((report.invalid, report.matched), (4, 0))
+        self.assertEqual([d['line'] for d in report.details['invalid']], [1, 2, 3, 4])
+
+    def test_upload_that_is_not_utf8_is_rejected(self):
+        client = APIClient()
+        mfi = create_user('posting-mfi@example.com', 'microfinance')
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=mfi).key}')
+        body = f'loan_id,due_date,amount,reference\n{self.repayment.loan_id},{self.due},400,caf\xe9\n'
+        upload = SimpleUploadedFile('settlement.csv', body.encode('latin-1'), content_type='text/csv')
+        response = client.post('/api/mfi/repayments/bulk/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.repayment.refresh_from_db()
+        self.assertEqual(self.repayment.amount_paid, Decimal('0'))
+
+
+class PortfolioRiskParamsTests(FileResponseCacheMixin, TestCase):
+    def test_out_of_range_seed_is_rejected(self):
+        client = APIClient()
+        mfi = create_user('risk-mfi@example.com', 'microfinance')
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=mfi).key}')
+        for seed in ('-1', str(2 ** 32)):
+            response = client.get('/api/mfi/portfolio/risk/', {'seed': seed, 'scenarios': 100})
+            self.assertEqual(response.status_code, 400, seed)
+        self.assertEqual(client.get('/api/mfi/portfolio/risk/', {'seed': 0, 'scenarios': 100}).status_code, 200)
+
+
+def fake_scores(approved=True, risk=0.2, amount=5000.0):
+    """score_batch stand-in returning the same scores for every payload."""
+    def score_batch(payloads, explain=False):
+        n = len(payloads)
+        return {'approved': [approved] * n, 'risk_score': [risk] * n,
+                'recommended_amount': [amount] * n, 'factors': [[]] * n}
+    return score_batch
+
+
+class ScoringJobQueueTests(FileResponseCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.farmer = create_user('jobs-farmer@example.com', 'farmer')
+
+    def submit(self, max_attempts=None):
+        app = LoanApplication.objects.create(user=self.farmer, status='scoring')
+        job = job_queue.enqueue(application_scoring.QUEUE, {'application_id': app.id}, max_attempts=max_attempts)
+        return app, job
+
+    def test_racing_claims_never_share_a_job(self):
+        jobs = [self.submit()[1] for _ in range(3)]
+        uuid4 = job_queue.uuid.uuid4
+        other = []
+        raced = []
+
+        def other_worker_claims_first():
+            # Runs after worker A selected its ids and before its UPDATE
+            if not raced:
+                raced.append(True)
+                other.extend(job_queue.claim('scoring', 10, 'worker-b', 60))
+            return uuid4()
+
+        with mock.patch.object(job_queue.uuid, 'uuid4', other_worker_claims_first):
+            mine = job_queue.claim('scoring', 10, 'worker-a', 60)
+        self.assertEqual(mine, [])
+        self.assertEqual(sorted(job.id for job in other), sorted(job.id for job in jobs))
+        self.assertEqual(set(Job.objects.values_list('attempts', flat=True)), {1})
+
+    def test_failed_batch_is_retried_with_backoff(self):
+        app, job = self.submit()
+        claimed = job_queue.claim('scoring', 10, 'worker', 60)
+        before = timezone.now()
+        with mock.patch('api.ml_service.score_batch', side_effect=RuntimeError('model exploded')), \
+                self.assertLogs('api', 'ERROR'):
+            self.assertEqual(job_queue.run_batch('scoring', claimed), (0, 1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_until), (job_queue.QUEUED, 1, None))
+        self.assertIn('model exploded', job.last_error)
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=job_queue.RETRY_BASE_SECONDS))
+        self.assertEqual(job_queue.claim('scoring', 10, 'worker', 60), [])  # not due yet
+        app.refresh_from_db()
+        self.assertEqual(app.status, 'scoring')
+
+    def test_last_failed_attempt_hands_application_to_review(self):
+        app, job = self.submit(max_attempts=1)
+        claimed = job_queue.claim('scoring', 10, 'worker', 60)
+        with mock.patch('api.ml_service.score_batch', side_effect=RuntimeError('model exploded')), \
+                self.assertLogs('api', 'ERROR'):
+            self.assertEqual(job_queue.run_batch('scoring', claimed), (0, 0, 1))
+        job.refresh_from_db()
+        app.refresh_from_db()
+        self.assertEqual(job.status, job_queue.FAILED)
+        self.assertEqual(app.status, 'pending')
+        self.assertEqual(app.eligibility_reason, application_scoring.SCORING_FAILED_REASON)
+        self.assertIsNone(app.risk_score)
+
+    def test_expired_claim_is_taken_over_and_stale_worker_is_ignored(self):
+        app, job = self.submit()
+        stale = job_queue.claim('scoring', 10, 'worker-a', 60)
+        Job.objects.filter(id=job.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        fresh = job_queue.claim('scoring', 10, 'worker-b', 60)
+        self.assertEqual([j.id for j in fresh], [job.id])
+        self.assertEqual(fresh[0].attempts, 2)
+        with mock.patch('api.ml_service.score_batch', fake_scores(approved=True, risk=0.2)):
+            self.assertEqual(job_queue.run_batch('scoring', fresh), (1, 0, 0))
+
+        # Worker A wakes up with different scores: neither the job nor the application changes
+        with mock.patch('api.ml_service.score_batch', fake_scores(approved=False, risk=0.9)):
+            self.assertEqual(job_queue.run_batch('scoring', stale), (0, 0, 0))
+        job.refresh_from_db()
+        app.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (job_queue.DONE, fresh[0].locked_by))
+        self.assertEqual((app.status, app.risk_score, app.eligibility_approved), ('pending', 0.2, True))
+
+    def test_worker_invalidation_refreshes_cached_application_list(self):
+        self.submit()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.farmer).key}')
+        client.get('/api/farmer/applications/')
+        cached = client.get('/api/farmer/applications/')
+        self.assertEqual((cached['X-Cache'], cached.data['applications'][0]['status']), ('HIT', 'scoring'))
+
+        # The worker runs in its own process, with its own cache connection
+        worker_cache = caches.create_connection(response_cache.CACHE_ALIAS)
+        with mock.patch.object(response_cache, '_cache', return_value=worker_cache), \
+                mock.patch('api.ml_service.score_batch', fake_scores()):
+            job_queue.run_batch('scoring', job_queue.claim('scoring', 10, 'worker', 60))
+
+        fresh = client.get('/api/farmer/applications/')
+        self.assertEqual((fresh['X-Cache'], fresh.data['applications'][0]['status']), ('MISS', 'pending'))
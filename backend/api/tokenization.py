@@ -0,0 +1,112 @@
+"""
+Memoized, length-bucketed tokenization for the chatbot (T5) and translation (MarianMT) models.
+
+TokenEncoder wraps a Hugging Face tokenizer:
+- ids(text) memoizes the token ids of recent inputs in an LRU (TOKENIZER_CACHE_SIZE), so
+  repeated questions (and repeated replies to translate back) skip the tokenizer;
+- batch(texts) groups inputs by length bucket, so a short message is never padded to the
+  length of a long one, and fills per-thread padded buffers that are allocated once per
+  bucket and reused. With pad_to_bucket=True every batch is padded to its bucket's full
+  width (fixed shapes for XLA); otherwise only to its longest member.
+
+Arrays handed out by batch() are views into the calling thread's buffers and are
+overwritten by that thread's next batch() call for the same bucket: convert them
+(tf.constant copies) or finish with them (generate) first.
+
+Each encoder counts, per bucket, the real and padding tokens it produced and the time
+spent tokenizing, as `tokenizer_*` counters at GET /api/admin/metrics/:
+  tokens/s:       rate(agrifin_tokenizer_tokens_total[5m]) / rate(agrifin_tokenizer_seconds_total[5m])
+  padding waste:  agrifin_tokenizer_padding_tokens_total / (… + agrifin_tokenizer_tokens_total), per bucket
+"""
+import collections
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from . import request_metrics
+
+DEFAULT_BUCKETS = getattr(settings, 'TOKENIZER_BUCKETS', (16, 32, 64, 128, 256, 512))
+CACHE_SIZE = getattr(settings, 'TOKENIZER_CACHE_SIZE', 4096)
+
+PaddedBatch = collections.namedtuple('PaddedBatch', 'indices input_ids attention_mask bucket')
+PaddedBatch.__doc__ = "Inputs texts[i] for i in indices, padded to the same width; rows follow `indices`."
+
+
+class TokenEncoder:
+    def __init__(self, tokenizer, name, max_length, buckets=None, cache_size=None, dtype='int64'):
+        self.tokenizer = tokenizer
+        self.name = name
+        self.max_length = max_length
+        buckets = DEFAULT_BUCKETS if buckets is None else buckets
+        self.buckets = tuple(sorted({b for b in buckets if b < max_length} | {max_length}))
+        self.cache_size = CACHE_SIZE if cache_size is None else cache_size
+        self.dtype = dtype
+        self.pad_token_id = tokenizer.pad_token_id or 0
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def ids(self, text):
+        """Token ids of `text` (with special tokens, truncated to max_length), memoized."""
+        with self._lock:
+            ids = self._cache.get(text)
+            if ids is not None:
+                self._cache.move_to_end(text)
+        request_metrics.registry.inc('tokenizer_cache_total', tokenizer=self.name,
+                                     result='miss' if ids is None else 'hit')
+        if ids is None:
+            ids = tuple(self.tokenizer(text, truncation=True, max_length=self.max_length)['input_ids'][:self.max_length])
+            if self.cache_size > 0:
+                with self._lock:
+                    self._cache[text] = ids
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        return ids
+
+    def bucket(self, length):
+        """Smallest bucket that holds `length` tokens."""
+        return next((b for b in self.buckets if b >= length), self.buckets[-1])
+
+    def batch(self, texts, pad_to_bucket=False):
+        """[PaddedBatch] for `texts`, one per length bucket in use, shortest bucket first."""
+        started = time.perf_counter()
+        groups = {}
+        encoded = [self.ids(text) for text in texts]
+        for i, ids in enumerate(encoded):
+            groups.setdefault(self.bucket(len(ids)), []).append(i)
+        batches = []
+        for bucket in sorted(groups):
+            indices = groups[bucket]
+            width = bucket if pad_to_bucket else max(len(encoded[i]) for i in indices)
+            input_ids, attention_mask = self._buffers(bucket, len(indices))
+            input_ids, attention_mask = input_ids[:len(indices), :width], attention_mask[:len(indices), :width]
+            input_ids.fill(self.pad_token_id)
+            attention_mask.fill(0)
+            real = 0
+            for row, i in enumerate(indices):
+                ids = encoded[i]
+                input_ids[row, :len(ids)] = ids
+                attention_mask[row, :len(ids)] = 1
+                real += len(ids)
+            request_metrics.registry.inc('tokenizer_tokens_total', real, tokenizer=self.name, bucket=bucket)
+            request_metrics.registry.inc('tokenizer_padding_tokens_total', len(indices) * width - real,
+                                         tokenizer=self.name, bucket=bucket)
+            batches.append(PaddedBatch(indices, input_ids, attention_mask, bucket))
+        request_metrics.registry.inc('tokenizer_seconds_total', time.perf_counter() - started, tokenizer=self.name)
+        return batches
+
+    def _buffers(self, bucket, rows):
+        """This thread's (input_ids, attention_mask) buffers for `bucket` with at least `rows` rows."""
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        pair = buffers.get(bucket)
+        if pair is None or pair[0].shape[0] < rows:
+            pair = buffers[bucket] = (np.empty((rows, bucket), dtype=self.dtype), np.empty((rows, bucket), dtype=self.dtype))
+        return pair
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
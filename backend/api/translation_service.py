@@ -8,19 +8,30 @@ and use small MarianMT models to translate:
 
 This gives more reliable non-English answers than relying on the
 financial model itself to translate.
+
+Inputs go through api/tokenization.py and encoder outputs through
+api/encoder_cache.py, so a repeated message skips both tokenization and the
+MarianMT encoder. translate_to_english()/translate_from_english() also report
+whether the encoder pass was served from that cache (logged with each chat).
 """
+import collections
 import logging
 from functools import lru_cache
 
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+from . import request_metrics
 
 logger = logging.getLogger(__name__)
 
+Translation = collections.namedtuple('Translation', 'text cache_hit')
+
 
 def _load_marian(model_name: str):
     """Load a MarianMT tokenizer + model pair."""
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    # Imported on first use so importing this module (views, management commands) stays cheap
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+    with request_metrics.stage("translate.load"):
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
     return tokenizer, model
 
 
@@ -44,48 +55,75 @@ def _rw_en():
     return _load_marian("Helsinki-NLP/opus-mt-rw-en")
 
 
-def _translate(text: str, pair_loader, max_length: int = 512) -> str:
-    """Translate text using a cached (tokenizer, model) loader."""
+_encoders = {}
+
+
+def _encoder(tokenizer, pair: str, max_length: int):
+    """Memoizing, length-bucketed TokenEncoder per language pair (see api/tokenization.py)."""
+    encoder = _encoders.get(pair)
+    if encoder is None or encoder.tokenizer is not tokenizer or encoder.max_length != max_length:
+        from .tokenization import TokenEncoder
+        encoder = _encoders[pair] = TokenEncoder(tokenizer, f"marian.{pair}", max_length)
+    return encoder
+
+
+def _translate(text: str, pair_loader, max_length: int = 512, pair: str = "") -> Translation:
+    """Translate text using a cached (tokenizer, model) loader; timed as stage translate.<pair>."""
     if not text:
-        return text
+        return Translation(text, False)
     try:
+        import torch
+
+        from . import encoder_cache
+
         tokenizer, model = pair_loader()
-        inputs = tokenizer(
-            [text],
-            return_tensors="pt",
-            padding=True,
-            truncation=True,
-            max_length=max_length,
-        )
-        outputs = model.generate(
-            **inputs,
-            max_length=max_length,
-        )
-        out = tokenizer.batch_decode(outputs, skip_special_tokens=True)[0]
-        return out.strip() if out else text
+        with request_metrics.stage(f"translate.{pair}"):
+            batch, = _encoder(tokenizer, pair, max_length).batch([text])
+            inputs = {
+                "input_ids": torch.from_numpy(batch.input_ids),
+                "attention_mask": torch.from_numpy(batch.attention_mask),
+            }
+
+            def encode():
+                with torch.no_grad():
+                    return model.get_encoder()(**inputs, return_dict=True)
+            inputs["encoder_outputs"], cache_hit = encoder_cache.cache.get_or_encode(
+                f"marian.{pair}", model, batch.input_ids, encode
+            )
+            outputs = model.generate(**inputs, max_length=max_length)
+            out = tokenizer.batch_decode(outputs, skip_special_tokens=True)[0]
+        return Translation(out.strip() if out else text, cache_hit)
     except Exception as exc:  # pragma: no cover - fail soft
         logger.exception("Translation failed: %s", exc)
-        return text
+        return Translation(text, False)
 
 
-def to_english(text: str, source_lang: str) -> str:
+def translate_to_english(text: str, source_lang: str) -> Translation:
     """Translate user message from FR/RW to English for the chatbot."""
     lang = (source_lang or "en").lower()
     if lang == "fr":
-        return _translate(text, _fr_en)
+        return _translate(text, _fr_en, pair="fr-en")
     if lang == "rw":
-        return _translate(text, _rw_en)
+        return _translate(text, _rw_en, pair="rw-en")
     # Already English or unsupported code
-    return text
+    return Translation(text, False)
 
 
-def from_english(text: str, target_lang: str) -> str:
+def translate_from_english(text: str, target_lang: str) -> Translation:
     """Translate chatbot answer from English to FR/RW (best-effort)."""
     lang = (target_lang or "en").lower()
     if lang == "fr":
-        return _translate(text, _en_fr)
+        return _translate(text, _en_fr, pair="en-fr")
     if lang == "rw":
-        return _translate(text, _en_rw)
+        return _translate(text, _en_rw, pair="en-rw")
     # Default: English / unsupported code
-    return text
+    return Translation(text, False)
+
+
+def to_english(text: str, source_lang: str) -> str:
+    return translate_to_english(text, source_lang).text
+
+
+def from_english(text: str, target_lang: str) -> str:
+    return translate_from_english(text, target_lang).text
 
@@ -0,0 +1,176 @@
+"""
+Exact path-dependent TreeSHAP for the XGBoost models, vectorized over trees.
+
+For one leaf, the SHAP value of a feature on its root-to-leaf path depends on
+the input only through which of the path's splits the input satisfies (one bit
+per distinct feature on the path). Trees here are at most a few levels deep, so
+every leaf has at most 2^depth such bit patterns. TreeExplainer precomputes the
+contribution of every path feature for every pattern, once per model. Explaining
+a row is then:
+
+  1. evaluate all path splits of all leaves at once -> one pattern per leaf,
+  2. gather the precomputed contributions for those patterns,
+  3. sum them per feature with one matrix product.
+
+Results match xgboost's `pred_contribs=True` (minus its bias column) while
+costing a fraction of a millisecond per row instead of several.
+"""
+import json
+from math import factorial
+
+import numpy as np
+
+# Rows explained per block; bounds the (rows x leaves x depth) temporaries
+ROW_BLOCK = 128
+# Patterns per leaf grow as 2^depth and are stored as uint8 bit masks
+MAX_DEPTH = 8
+
+
+class TreeExplainer:
+    """SHAP contributions for an XGBoost booster with numeric splits (gbtree, single target)."""
+
+    def __init__(self, booster):
+        model = json.loads(booster.save_raw('json'))
+        learner = model['learner']
+        self.n_features = int(learner['learner_model_param']['num_feature'])
+        trees = learner['gradient_booster']['model']['trees']
+        paths = [path for tree in trees for path in _leaf_paths(tree)]
+        if not paths:
+            raise ValueError('Booster has no trees')
+        self._build(paths)
+
+    def _build(self, paths):
+        n_leaves = len(paths)
+        depth = max(max(len(p['nodes']) for p in paths), 1)
+        if depth > MAX_DEPTH:
+            raise ValueError(f'Trees deeper than {MAX_DEPTH} are not supported (got {depth})')
+        # Each split node is evaluated once per row; paths refer to nodes by index
+        node_ids = {}
+        node_feature, node_threshold, node_default_left = [], [], []
+        # Along each path: node index, direction taken, bit of the node's feature slot.
+        # Padding steps point at node 0 with a zero bit, so they never clear anything.
+        self.path_node = np.zeros((n_leaves, depth), dtype=np.int64)
+        self.path_left = np.ones((n_leaves, depth), dtype=bool)
+        self.path_slot_bit = np.zeros((n_leaves, depth), dtype=np.uint8)
+        # Distinct features per path ("slots") with their zero fractions (cover ratios)
+        slot_feature = np.full((n_leaves, depth), self.n_features, dtype=np.int64)
+        slot_zero = np.ones((n_leaves, depth), dtype=np.float64)
+        n_slots = np.zeros(n_leaves, dtype=np.int64)
+        leaf_value = np.zeros(n_leaves, dtype=np.float64)
+
+        for li, path in enumerate(paths):
+            leaf_value[li] = path['value']
+            slots = {}
+            for k, (key, feature, threshold, left, default_left, zero) in enumerate(path['nodes']):
+                if key not in node_ids:
+                    node_ids[key] = len(node_ids)
+                    node_feature.append(feature)
+                    node_threshold.append(threshold)
+                    node_default_left.append(default_left)
+                slot = slots.setdefault(feature, len(slots))
+                self.path_node[li, k] = node_ids[key]
+                self.path_left[li, k] = left
+                self.path_slot_bit[li, k] = 1 << slot
+                slot_feature[li, slot] = feature
+                # A feature split on twice along a path: fractions multiply
+                slot_zero[li, slot] *= zero
+            n_slots[li] = len(slots)
+
+        self.node_feature = np.array(node_feature, dtype=np.int64)
+        self.node_threshold = np.array(node_threshold, dtype=np.float32)
+        self.node_default_left = np.array(node_default_left, dtype=bool)
+        self.depth = depth
+        self.n_slots = n_slots
+        self.full_pattern = ((1 << n_slots) - 1).astype(np.uint8)
+        table = _pattern_table(leaf_value, slot_zero, n_slots, depth)
+        # Flattened to (leaf * patterns, depth) so lookups are a single np.take
+        self.table = table.reshape(-1, depth)
+        self._table_offset = np.arange(n_leaves, dtype=np.int64) * table.shape[1]
+        # (leaf, slot) -> feature one-hot, so summing contributions per feature is one matmul;
+        # padded slots map to an extra column that is dropped
+        scatter = np.zeros((n_leaves * depth, self.n_features + 1), dtype=np.float32)
+        scatter[np.arange(n_leaves * depth), slot_feature.ravel()] = 1.0
+        self.scatter = scatter
+
+    def contributions(self, X):
+        """(n_rows, n_features) SHAP values in margin (log-odds for classifiers) units."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        out = np.empty((X.shape[0], self.n_features), dtype=np.float64)
+        for start in range(0, X.shape[0], ROW_BLOCK):
+            block = X[start:start + ROW_BLOCK]
+            values = block[:, self.node_feature]  # (rows, split nodes)
+            goes_left = np.where(np.isnan(values), self.node_default_left, values < self.node_threshold)
+            # A slot's bit is cleared if any split on that feature along the path is not satisfied
+            fail_bits = np.zeros((len(block), len(self.full_pattern)), dtype=np.uint8)
+            for k in range(self.depth):
+                failed = goes_left[:, self.path_node[:, k]] != self.path_left[:, k]
+                fail_bits |= failed * self.path_slot_bit[:, k]
+            pattern = self.full_pattern & ~fail_bits
+            phi = np.take(self.table, pattern + self._table_offset, axis=0)  # (rows, leaves, depth)
+            summed = phi.reshape(len(block), -1) @ self.scatter
+            out[start:start + len(block)] = summed[:, :self.n_features]
+        return out
+
+
+def _leaf_paths(tree):
+    """Yield {'value', 'nodes': [(node key, feature, threshold, went_left, default_left, zero_fraction), ...]} per leaf."""
+    left = tree['left_children']
+    right = tree['right_children']
+    feature = tree['split_indices']
+    condition = tree['split_conditions']
+    default_left = tree['default_left']
+    cover = tree['sum_hessian']
+    if any(tree.get('split_type', ())):
+        raise ValueError('Categorical splits are not supported')
+    tree_id = tree['id']
+    stack = [(0, [])]
+    while stack:
+        node, nodes = stack.pop()
+        if left[node] == -1:
+            # Leaf: XGBoost stores the leaf value in split_conditions
+            yield {'value': float(condition[node]), 'nodes': nodes}
+            continue
+        parent_cover = cover[node] or 1.0
+        for child, went_left in ((left[node], True), (right[node], False)):
+            step = ((tree_id, node), feature[node], condition[node], went_left, bool(default_left[node]),
+                    cover[child] / parent_cover)
+            stack.append((child, nodes + [step]))
+
+
+def _pattern_table(leaf_value, slot_zero, n_slots, depth):
+    """
+    phi[leaf, pattern, slot] for every on-path pattern of satisfied splits (bit k = slot k).
+    Path-dependent TreeSHAP for feature i on a path of d distinct features:
+        v * (o_i - z_i) * sum_s w(s, d) * e_s(j != i)
+    where e_s is the sum over s-subsets S of prod_{j in S} o_j * prod_{j not in S} z_j,
+    i.e. the coefficients of prod_{j != i} (z_j + o_j t), and w(s, d) = s!(d-s-1)!/d!.
+    """
+    n_leaves = len(leaf_value)
+    n_patterns = 1 << depth
+    ones = ((np.arange(n_patterns)[:, None] >> np.arange(depth)[None, :]) & 1).astype(np.float64)  # (P, depth)
+    weights = np.zeros((n_leaves, depth), dtype=np.float64)
+    for d in range(1, depth + 1):
+        w = [factorial(s) * factorial(d - s - 1) / factorial(d) for s in range(d)]
+        weights[n_slots == d, :d] = w
+
+    table = np.zeros((n_leaves, n_patterns, depth), dtype=np.float32)
+    for i in range(depth):
+        # Build the coefficients for all patterns by doubling: adding slot j appends the
+        # patterns with bit j set, so pattern index = sum(o_j << j). Padded slots have z = 1.
+        coeffs = np.zeros((n_leaves, 1, depth), dtype=np.float64)
+        coeffs[:, :, 0] = 1.0
+        for j in range(depth):
+            if j == i:
+                coeffs = np.concatenate([coeffs, coeffs], axis=1)
+                continue
+            off = coeffs * slot_zero[:, j][:, None, None]
+            on = off.copy()
+            on[:, :, 1:] += coeffs[:, :, :-1]
+            coeffs = np.concatenate([off, on], axis=1)
+        total = np.einsum('lps,ls->lp', coeffs, weights)
+        phi = leaf_value[:, None] * (ones[None, :, i] - slot_zero[:, i][:, None]) * total
+        phi[n_slots <= i] = 0.0
+        table[:, :, i] = phi
+    return table
@@ -12,6 +12,9 @@ urlpatterns = [
     path('admin/activity/', views.admin_activity_list),
     path('admin/users/', views.admin_users_list),
     path('admin/stats/', views.admin_stats),
+    path('admin/metrics/', views.admin_metrics),
+    path('admin/profiles/', views.admin_profiles_list),
+    path('admin/profiles/<str:endpoint>/<str:profile_id>/', views.admin_profile_download),
     # Farmer dashboard APIs
     path('farmer/profile/', views.farmer_profile),
     path('farmer/applications/', views.farmer_applications),
@@ -21,9 +24,12 @@ urlpatterns = [
     path('mfi/applications/', views.mfi_applications),
     path('mfi/applications/<int:pk>/review/', views.mfi_review_application),
     path('mfi/portfolio/', views.mfi_portfolio),
+    path('mfi/portfolio/risk/', views.mfi_portfolio_risk),
+    path('mfi/repayments/bulk/', views.mfi_repayments_bulk),
     # ML model APIs
     path('eligibility/', views.eligibility),
     path('risk/', views.risk),
     path('recommend-amount/', views.recommend_amount),
+    path('what-if/', views.what_if),
     path('chat/', views.chat),
 ]
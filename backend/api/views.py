@@ -1,17 +1,22 @@
 import json
+import time
 from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
+from django.db import transaction
+from django.http import FileResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.authtoken.models import Token
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from .explanations import eligibility_reason, recommend_amount_explanation, risk_score_description
-from .ml_service import predict_eligibility, predict_risk, recommend_amount as recommend_loan_amount
+from .admission import admission_controlled, get_client_ip as _get_client_ip
+from .authentication import resolve_role
+from .explanations import eligibility_description, eligibility_reason, recommend_amount_explanation, risk_score_description
 from .models import (
     GetStartedEvent,
     PasswordResetToken,
@@ -22,6 +27,7 @@ from .models import (
     Loan,
     Repayment,
 )
+from .response_cache import cached_response
 from .serializers import LoginSerializer, RegisterSerializer
 
 User = get_user_model()
@@ -29,13 +35,13 @@ User = get_user_model()
 # Swagger: generic JSON body for ML endpoints
 _ml_request_body = openapi.Schema(
     type=openapi.TYPE_OBJECT,
-    description='JSON with feature keys (e.g. Age, AnnualIncome, CreditScore, LoanAmount, LoanDuration, EmploymentStatus, EducationLevel, etc.). See ML model feature list.',
+    description='JSON with feature keys (e.g. Age, AnnualIncome, CreditScore, LoanAmount, LoanDuration, EmploymentStatus, EducationLevel, etc.). See ML model feature list. Optional `language` (en, fr, rw) selects the language of explanation text. Responses include a `validation` report (errors, imputed fields); `?validation=reject` answers 400 for invalid values instead of imputing them.',
 )
 _eligibility_response = openapi.Response('approved (bool), prediction (0/1)', openapi.Schema(type=openapi.TYPE_OBJECT, properties={'approved': openapi.Schema(type=openapi.TYPE_BOOLEAN), 'prediction': openapi.Schema(type=openapi.TYPE_INTEGER)}))
 _risk_response = openapi.Response('risk_score (float)', openapi.Schema(type=openapi.TYPE_OBJECT, properties={'risk_score': openapi.Schema(type=openapi.TYPE_NUMBER)}))
 _amount_response = openapi.Response('recommended_amount (float)', openapi.Schema(type=openapi.TYPE_OBJECT, properties={'recommended_amount': openapi.Schema(type=openapi.TYPE_NUMBER)}))
-_chat_request = openapi.Schema(type=openapi.TYPE_OBJECT, required=['message'], properties={'message': openapi.Schema(type=openapi.TYPE_STRING), 'language': openapi.Schema(type=openapi.TYPE_STRING, enum=['en', 'fr', 'rw'])})
-_chat_response = openapi.Response('reply (string)', openapi.Schema(type=openapi.TYPE_OBJECT, properties={'reply': openapi.Schema(type=openapi.TYPE_STRING)}))
+_chat_request = openapi.Schema(type=openapi.TYPE_OBJECT, required=['message'], properties={'message': openapi.Schema(type=openapi.TYPE_STRING), 'language': openapi.Schema(type=openapi.TYPE_STRING, enum=['en', 'fr', 'rw']), 'decoding': openapi.Schema(type=openapi.TYPE_STRING, enum=['beam', 'greedy', 'sample', 'short'], description='Decoding profile; may be downgraded under load or a tight time budget')})
+_chat_response = openapi.Response('reply (string), decoding (profile used)', openapi.Schema(type=openapi.TYPE_OBJECT, properties={'reply': openapi.Schema(type=openapi.TYPE_STRING), 'decoding': openapi.Schema(type=openapi.TYPE_STRING)}))
 
 
 def _get_payload(request):
@@ -48,20 +54,48 @@ def _get_payload(request):
         return {}
 
 
-@swagger_auto_schema(method='post', operation_description='Model 1: Loan eligibility (approval/denial) prediction. POST JSON with features.', request_body=_ml_request_body, responses={200: _eligibility_response, 400: 'Error', 503: 'Models not loaded'}, tags=['ML Models'])
+def _validate_ml_payload(request, payload):
+    """
+    Validation report for one ML payload, plus a 400 Response when it must be rejected
+    (ML_VALIDATION_MODE or `?validation=` is 'reject' and the payload has errors).
+    """
+    from .ml_service import VALIDATION_MODE, validate_payloads
+    report = validate_payloads([payload]).row(0)
+    mode = request.query_params.get('validation') or VALIDATION_MODE
+    if mode == 'reject' and not report['valid']:
+        return report, Response({'error': 'Invalid input', 'validation': report}, status=status.HTTP_400_BAD_REQUEST)
+    return report, None
+
+
+def _explanation_language(request, payload):
+    """Language for explanation text: body `language`, then `?language=`; en, fr or rw (default en)."""
+    language = payload.get('language') or request.query_params.get('language') or 'en'
+    return str(language).lower()
+
+
+@swagger_auto_schema(method='post', operation_description='Model 1: Loan eligibility (approval/denial) prediction. POST JSON with features.', request_body=_ml_request_body, responses={200: _eligibility_response, 400: 'Error', 429: 'Rate limited (Retry-After)', 503: 'Models not loaded or server busy (Retry-After)'}, tags=['ML Models'])
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@admission_controlled('scoring')
 def eligibility(request):
     """POST /api/eligibility/ — Model 1: loan approval prediction."""
+    from .ml_service import explain_eligibility, predict_eligibility
     payload = _get_payload(request)
     try:
+        validation, rejected = _validate_ml_payload(request, payload)
+        if rejected:
+            return rejected
+        language = _explanation_language(request, payload)
         approved = predict_eligibility(payload)
-        reason = eligibility_reason(payload, approved)
+        factors = explain_eligibility([payload])[0]
+        reason = eligibility_reason(payload, approved, factors, language=language)
         return Response({
             'approved': approved,
             'prediction': 1 if approved else 0,
             'reason': reason,
-            'description': 'Approved means the model predicts the application would be accepted; denied means it would likely be rejected. The reason is derived from your application features (e.g. credit score, income, debt-to-income, employment, payment history).',
+            'factors': factors,
+            'description': eligibility_description(language),
+            'validation': validation,
         })
     except FileNotFoundError as e:
         return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -69,21 +103,27 @@ def eligibility(request):
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-@swagger_auto_schema(method='post', operation_description='Model 2: Default risk score (credit risk assessment). POST JSON with features.', request_body=_ml_request_body, responses={200: _risk_response, 400: 'Error', 503: 'Models not loaded'}, tags=['ML Models'])
+@swagger_auto_schema(method='post', operation_description='Model 2: Default risk score (credit risk assessment). POST JSON with features.', request_body=_ml_request_body, responses={200: _risk_response, 400: 'Error', 429: 'Rate limited (Retry-After)', 503: 'Models not loaded or server busy (Retry-After)'}, tags=['ML Models'])
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@admission_controlled('scoring')
 def risk(request):
     """POST /api/risk/ — Model 2: default risk score."""
+    from .ml_service import predict_risk
     payload = _get_payload(request)
     try:
+        validation, rejected = _validate_ml_payload(request, payload)
+        if rejected:
+            return rejected
         risk_score = predict_risk(payload)
-        risk_info = risk_score_description(risk_score)
+        risk_info = risk_score_description(risk_score, language=_explanation_language(request, payload))
         return Response({
             'risk_score': risk_score,
             'score': risk_score,
             'interpretation': risk_info['interpretation'],
             'description': risk_info['description'],
             'score_meaning': risk_info['score_meaning'],
+            'validation': validation,
         })
     except FileNotFoundError as e:
         return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -91,15 +131,20 @@ def risk(request):
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-@swagger_auto_schema(method='post', operation_description='Model 3: Recommended loan amount for approved profile. POST JSON with features.', request_body=_ml_request_body, responses={200: _amount_response, 400: 'Error', 503: 'Models not loaded'}, tags=['ML Models'])
+@swagger_auto_schema(method='post', operation_description='Model 3: Recommended loan amount for approved profile. POST JSON with features.', request_body=_ml_request_body, responses={200: _amount_response, 400: 'Error', 429: 'Rate limited (Retry-After)', 503: 'Models not loaded or server busy (Retry-After)'}, tags=['ML Models'])
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@admission_controlled('scoring')
 def recommend_amount(request):
     """POST /api/recommend-amount/ — Model 3: recommended loan amount."""
+    from .ml_service import recommend_amount as recommend_loan_amount
     payload = _get_payload(request)
     try:
+        validation, rejected = _validate_ml_payload(request, payload)
+        if rejected:
+            return rejected
         amount = recommend_loan_amount(payload)
-        amount_info = recommend_amount_explanation(payload, amount)
+        amount_info = recommend_amount_explanation(payload, amount, language=_explanation_language(request, payload))
         return Response({
             'recommended_amount': amount,
             'recommendedAmount': amount,
@@ -107,6 +152,7 @@ def recommend_amount(request):
             'prediction': amount,
             'explanation': amount_info['explanation'],
             'basis': amount_info['basis'],
+            'validation': validation,
         })
     except FileNotFoundError as e:
         return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -114,22 +160,83 @@ def recommend_amount(request):
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-@swagger_auto_schema(method='post', operation_description='Multilingual chatbot (Kinyarwanda, English, French). POST message + language. Uses saved T5 model when available, with separate translation models for FR/RW.', request_body=_chat_request, responses={200: _chat_response}, tags=['Chatbot'])
+_what_if_request = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    required=['payload', 'sweep'],
+    properties={
+        'payload': openapi.Schema(type=openapi.TYPE_OBJECT, description='Base features, as for /api/eligibility/'),
+        'sweep': openapi.Schema(type=openapi.TYPE_OBJECT, description='One or two features to vary, e.g. {"LoanAmount": {"start": 5000, "stop": 50000, "steps": 10}, "LoanDuration": [12, 24, 36, 48]}'),
+    },
+)
+
+
+@swagger_auto_schema(method='post', operation_description='What-if sweep: score a grid over one or two features (e.g. LoanAmount x LoanDuration) on top of a base payload in one request. Returns approval, approval probability, risk score and recommended amount for every grid cell.', request_body=_what_if_request, responses={400: 'Error', 429: 'Rate limited (Retry-After)', 503: 'Models not loaded or server busy (Retry-After)'}, tags=['ML Models'])
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@admission_controlled('scoring')
+def what_if(request):
+    """POST /api/what-if/ — Approval/risk surface over one or two swept features."""
+    from .ml_service import score_grid, sweep_axis
+    data = _get_payload(request)
+    payload = data.get('payload') or {}
+    sweep = data.get('sweep') or {}
+    if not isinstance(payload, dict) or not isinstance(sweep, dict) or not sweep:
+        return Response({'error': 'Send {"payload": {...}, "sweep": {"Feature": range or values}}'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        validation, rejected = _validate_ml_payload(request, payload)
+        if rejected:
+            return rejected
+        axes = [(feature, sweep_axis(feature, spec)) for feature, spec in sweep.items()]
+        grid = score_grid(payload, axes)
+    except FileNotFoundError as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'features': [feature for feature, _ in axes],
+        'axes': {feature: values for feature, values in axes},
+        'shape': list(grid['risk_score'].shape),
+        **{key: value.tolist() for key, value in grid.items()},
+        'validation': validation,
+    })
+
+
+@swagger_auto_schema(method='post', operation_description='Multilingual chatbot (Kinyarwanda, English, French). POST message + language. Uses saved T5 model when available, with separate translation models for FR/RW.', request_body=_chat_request, responses={200: _chat_response, 429: 'Rate limited (Retry-After)', 503: 'Server busy (Retry-After)'}, tags=['Chatbot'])
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@admission_controlled('chat')
 def chat(request):
     """POST /api/chat/ — Chatbot using saved T5 model (saved-model/); falls back to placeholder if unavailable."""
-    from api.chatbot_service import generate_reply
-    from api.translation_service import to_english, from_english
+    from api import admission
+    from api.chatbot_service import DECODING_PROFILES, DecodeBudget, choose_profile, decode_reply
+    from api.chat_log_service import log_interaction
+    from api.translation_service import translate_from_english, translate_to_english
+    started = time.monotonic()
     payload = _get_payload(request)
     raw_message = (payload.get('message') or '').strip()
     language = (payload.get('language') or 'en').lower()
+    requested = payload.get('decoding') or None
+    if requested is not None and (not isinstance(requested, str) or requested not in DECODING_PROFILES):
+        return Response({'error': f"decoding must be one of: {', '.join(DECODING_PROFILES)}"}, status=status.HTTP_400_BAD_REQUEST)
     if not raw_message:
         return Response({'reply': 'Please send a message.', 'response': 'Please send a message.'})
+    # Cheaper decoding when the chat pool is busy; the time budget leaves room to translate the reply back
+    profile = choose_profile(language, requested, admission.load('chat'))
+    budget_seconds = getattr(settings, 'CHAT_TIME_BUDGET_MS', 8000) / 1000
+    if language != 'en':
+        budget_seconds -= getattr(settings, 'CHAT_TRANSLATION_RESERVE_MS', 1500) / 1000
+    budget = DecodeBudget(getattr(settings, 'CHAT_MAX_NEW_TOKENS', 128), started + budget_seconds)
     # If user is not in English, first translate question to English for the
     # financial chatbot model, then translate the answer back.
-    question_for_model = to_english(raw_message, source_lang=language)
-    reply_en = generate_reply(question_for_model, language='en')
+    t0 = time.perf_counter()
+    question = translate_to_english(raw_message, source_lang=language)
+    question_for_model = question.text
+    t1 = time.perf_counter()
+    result = decode_reply(question_for_model, profile=profile, budget=budget)
+    t2 = time.perf_counter()
+    translation_ms = (t1 - t0) * 1000
+    model_ms = (t2 - t1) * 1000
+    reply_en = result.text if result else None
     reply = reply_en
     if reply is None:
         # Fallback when model not loaded or generation failed
@@ -151,26 +258,38 @@ def chat(request):
             ),
         }
         reply = replies.get(language, replies['en'])
+        log_interaction(
+            raw_message, reply, language=language, user=request.user,
+            model_latency_ms=model_ms, translation_latency_ms=translation_ms, model_available=False,
+            translation_cache_hit=question.cache_hit,
+        )
         payload = {'reply': reply, 'response': reply}
         if getattr(settings, 'DEBUG', False) and err_msg:
             payload['chatbot_load_error'] = err_msg
         return Response(payload)
     # Translate final answer back to requested language (FR/RW) when needed.
-    final_reply = from_english(reply_en, target_lang=language)
-    resp = {'reply': final_reply, 'response': final_reply}
-    if getattr(settings, 'DEBUG', False) and language != 'en':
-        resp['source_reply_en'] = reply_en
+    t3 = time.perf_counter()
+    answer = translate_from_english(reply_en, target_lang=language)
+    final_reply = answer.text
+    translation_ms += (time.perf_counter() - t3) * 1000
+    log_interaction(
+        raw_message, final_reply, language=language, user=request.user,
+        model_latency_ms=model_ms, translation_latency_ms=translation_ms, reply_cache_hit=result.cache_hit,
+        translation_cache_hit=question.cache_hit or answer.cache_hit,
+    )
+    resp = {'reply': final_reply, 'response': final_reply, 'decoding': result.profile}
+    if getattr(settings, 'DEBUG', False):
+        resp['decoding_info'] = {'tokens': result.tokens, 'stopped': result.stopped, 'cache_hit': result.cache_hit}
+        if language != 'en':
+            resp['source_reply_en'] = reply_en
     return Response(resp)
 
 
 # ----- Auth APIs (documented in Swagger) -----
 
 def _user_role(user):
-    """Return role: from UserProfile, or 'admin' if staff/superuser."""
-    try:
-        return user.agrifin_profile.role
-    except UserProfile.DoesNotExist:
-        return 'admin' if (user.is_staff or user.is_superuser) else 'farmer'
+    """Return role: from UserProfile, or 'admin' if staff/superuser. Uses the role resolved at authentication when present."""
+    return resolve_role(user)
 
 
 @csrf_exempt
@@ -300,15 +419,6 @@ def auth_reset_password(request):
 
 # ----- Activity tracking (Get Started) + Admin API -----
 
-def _get_client_ip(request):
-    """Extract client IP from request (handles proxies)."""
-    xff = request.META.get('HTTP_X_FORWARDED_FOR')
-    if xff:
-        return xff.split(',')[0].strip() or None
-    addr = request.META.get('REMOTE_ADDR')
-    return addr if addr else None
-
-
 def _is_admin(user):
     """Return True if user has admin role."""
     role = _user_role(user)
@@ -326,7 +436,7 @@ _activity_log_body = openapi.Schema(
 
 
 @csrf_exempt
-@swagger_auto_schema(method='post', operation_description='Log Get Started activity (no auth). Visitors trigger when opening modal or clicking Register/Login.', request_body=_activity_log_body, tags=['Activity'])
+@swagger_auto_schema(method='post', operation_description='Log Get Started activity (no auth). Visitors trigger when opening modal or clicking Register/Login. Events are buffered and written in batches; returns 202.', request_body=_activity_log_body, tags=['Activity'])
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def activity_log(request):
@@ -342,13 +452,10 @@ def activity_log(request):
     except Exception:
         pass
     user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
-    GetStartedEvent.objects.create(
-        event_type=event_type,
-        role=role,
-        ip_address=ip,
-        user_agent=user_agent,
-    )
-    return Response({'ok': True}, status=status.HTTP_201_CREATED)
+    from .activity_service import log_event
+    # Buffered: returns without touching the DB; a background thread bulk-inserts events
+    log_event(event_type, role=str(role)[:20], ip_address=ip, user_agent=user_agent)
+    return Response({'ok': True}, status=status.HTTP_202_ACCEPTED)
 
 
 @swagger_auto_schema(method='get', operation_description='List Get Started activity (admin only). Requires auth token with admin role.', tags=['Admin'])
@@ -371,7 +478,8 @@ def admin_activity_list(request):
         }
         for e in events
     ]
-    return Response({'events': data, 'count': len(data)})
+    from .activity_service import ingestion_stats
+    return Response({'events': data, 'count': len(data), 'ingestion': ingestion_stats()})
 
 
 # ----- Dashboard APIs: Farmer, MFI, Admin -----
@@ -384,29 +492,6 @@ def _is_microfinance(user):
     return _user_role(user) == 'microfinance'
 
 
-def _application_to_ml_payload(app):
-    """Build ML model payload from LoanApplication."""
-    from .ml_service import DEFAULT_NUMERIC, CATEGORICAL_OPTIONS
-    payload = dict(DEFAULT_NUMERIC)
-    payload.update({
-        'Age': int(app.age),
-        'AnnualIncome': float(app.annual_income),
-        'CreditScore': int(app.credit_score),
-        'LoanAmount': float(app.loan_amount_requested),
-        'LoanDuration': int(app.loan_duration_months),
-        'EmploymentStatus': app.employment_status or 'Self-Employed',
-        'EducationLevel': app.education_level or 'High School',
-        'MaritalStatus': app.marital_status or 'Married',
-        'LoanPurpose': app.loan_purpose or 'Other',
-        'HomeOwnershipStatus': 'Own',  # Default for farmers
-    })
-    # Ensure categorical values are valid
-    for k, opts in CATEGORICAL_OPTIONS.items():
-        if payload.get(k) not in opts:
-            payload[k] = opts[0]
-    return payload
-
-
 # ----- Farmer APIs -----
 
 @swagger_auto_schema(method='get', operation_description='Get farmer profile. Farmer only.', tags=['Farmer'])
@@ -417,7 +502,11 @@ def farmer_profile(request):
     """GET/PATCH /api/farmer/profile/ — Get or update farmer profile."""
     if not _is_farmer(request.user):
         return Response({'error': 'Farmer access required'}, status=status.HTTP_403_FORBIDDEN)
-    profile, _ = FarmerProfile.objects.get_or_create(user=request.user)
+    try:
+        # Loaded with the token by CachedTokenAuthentication
+        profile = request.user.farmer_profile
+    except FarmerProfile.DoesNotExist:
+        profile, _ = FarmerProfile.objects.get_or_create(user=request.user)
     if request.method == 'GET':
         return Response({
             'id': profile.id,
@@ -445,11 +534,12 @@ def farmer_profile(request):
 
 
 @swagger_auto_schema(method='get', operation_description='List farmer loan applications.', tags=['Farmer'])
-@swagger_auto_schema(method='post', operation_description='Submit new loan application. Runs ML models.', tags=['Farmer'])
+@swagger_auto_schema(method='post', operation_description="Submit new loan application. It is saved with status 'scoring' and scored by the ML models in the background (`manage.py runjobs`), then moves to 'pending'; with SCORING_ASYNC=0 the models run in the request.", tags=['Farmer'])
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@cached_response('farmer_applications')
 def farmer_applications(request):
-    """GET /api/farmer/applications/ — List my applications. POST — Submit new with ML evaluation."""
+    """GET /api/farmer/applications/ — List my applications. POST — Submit new, queued for ML evaluation."""
     if not _is_farmer(request.user):
         return Response({'error': 'Farmer access required'}, status=status.HTTP_403_FORBIDDEN)
     if request.method == 'POST':
@@ -466,17 +556,32 @@ def farmer_applications(request):
             marital_status=str(data.get('marital_status', 'Married'))[:20],
             loan_purpose=str(data.get('loan_purpose', 'Other'))[:50],
         )
-        payload = _application_to_ml_payload(app)
-        try:
-            app.eligibility_approved = predict_eligibility(payload)
-            app.eligibility_reason = eligibility_reason(payload, app.eligibility_approved)
-            app.risk_score = predict_risk(payload)
-            app.recommended_amount = recommend_loan_amount(payload) if app.eligibility_approved else None
-        except FileNotFoundError:
-            return Response({'error': 'ML models not available'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        app.save()
+        if getattr(settings, 'SCORING_ASYNC', True):
+            # Scored in batches by `manage.py runjobs`; the job commits together with the application
+            from .application_scoring import enqueue as enqueue_scoring
+            app.status = 'scoring'
+            with transaction.atomic():
+                app.save()
+                enqueue_scoring(app)
+        else:
+            from .ml_service import (
+                application_to_ml_payload,
+                explain_eligibility,
+                predict_eligibility,
+                predict_risk,
+                recommend_amount as recommend_loan_amount,
+            )
+            payload = application_to_ml_payload(app)
+            try:
+                app.eligibility_approved = predict_eligibility(payload)
+                app.eligibility_reason = eligibility_reason(payload, app.eligibility_approved, explain_eligibility([payload])[0])
+                app.risk_score = predict_risk(payload)
+                app.recommended_amount = recommend_loan_amount(payload) if app.eligibility_approved else None
+            except FileNotFoundError:
+                return Response({'error': 'ML models not available'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            except Exception as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            app.save()
         return Response({
             'id': app.id,
             'status': app.status,
@@ -507,6 +612,7 @@ def farmer_applications(request):
 @swagger_auto_schema(method='get', operation_description='List farmer approved loans.', tags=['Farmer'])
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_response('farmer_loans')
 def farmer_loans(request):
     """GET /api/farmer/loans/ — List my approved loans."""
     if not _is_farmer(request.user):
@@ -639,27 +745,85 @@ def mfi_review_application(request, pk):
     })
 
 
+_bulk_repayments_params = [
+    openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description='Settlement file: CSV or JSON Lines with loan_id, due_date, amount, optional paid_at, reference'),
+    openapi.Parameter('dry_run', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, description='Reconcile without writing'),
+]
+
+
+@swagger_auto_schema(method='post', operation_description='Bulk-post a mobile-money settlement file against repayment schedules and return a reconciliation report (unmatched, partial, overpaid). MFI only.', manual_parameters=_bulk_repayments_params, tags=['MFI'])
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser])
+def mfi_repayments_bulk(request):
+    """POST /api/mfi/repayments/bulk/ — Post settlement payments in bulk."""
+    if not _is_microfinance(request.user):
+        return Response({'error': 'Microfinance access required'}, status=status.HTTP_403_FORBIDDEN)
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'Upload the settlement file as multipart field "file"'}, status=status.HTTP_400_BAD_REQUEST)
+    from .repayment_service import check_utf8, detect_format, iter_rows, post_settlement
+    try:
+        check_utf8(upload)
+    except UnicodeDecodeError as e:
+        return Response({'error': f'Settlement file must be UTF-8 encoded: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+    dry_run = str(request.query_params.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+    fmt = detect_format(upload.name, upload.content_type)
+    report = post_settlement(iter_rows(upload, fmt), dry_run=dry_run)
+    return Response({'dry_run': dry_run, 'format': fmt, **report.as_dict()})
+
+
 @swagger_auto_schema(method='get', operation_description='Portfolio summary: approved loans and repayment stats. MFI only.', tags=['MFI'])
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_response('mfi_portfolio', per_user=False)
 def mfi_portfolio(request):
     """GET /api/mfi/portfolio/ — Portfolio and repayment performance."""
     if not _is_microfinance(request.user):
         return Response({'error': 'Microfinance access required'}, status=status.HTTP_403_FORBIDDEN)
-    total_loans = Loan.objects.count()
-    from django.db.models import Sum
-    total_disbursed = Loan.objects.aggregate(s=Sum('amount'))['s'] or 0
-    repayments = Repayment.objects.select_related('loan').all()
-    paid = sum(1 for r in repayments if r.status == 'paid')
-    overdue = sum(1 for r in repayments if r.status == 'overdue')
-    pending = sum(1 for r in repayments if r.status == 'pending')
+    from django.db.models import Count, Q, Sum
+    loans = Loan.objects.aggregate(n=Count('id'), s=Sum('amount'))
+    # Overdue counts are maintained by `manage.py markoverdue`
+    repayments = Repayment.objects.aggregate(
+        paid=Count('id', filter=Q(status='paid')),
+        overdue=Count('id', filter=Q(status='overdue')),
+        pending=Count('id', filter=Q(status='pending')),
+        total=Count('id'),
+    )
     return Response({
-        'total_loans': total_loans,
-        'total_amount_disbursed': float(total_disbursed),
-        'repayments': {'paid': paid, 'overdue': overdue, 'pending': pending, 'total': repayments.count()},
+        'total_loans': loans['n'],
+        'total_amount_disbursed': float(loans['s'] or 0),
+        'repayments': repayments,
     })
 
 
+_portfolio_risk_params = [
+    openapi.Parameter('scenarios', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Monte Carlo scenarios (default 10000, max 50000)'),
+    openapi.Parameter('seed', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Random seed (0 to 4294967295); the same seed reproduces the same distribution'),
+]
+
+
+@swagger_auto_schema(method='get', operation_description='Portfolio credit-risk simulation: maps each active loan\'s risk score to a default probability and simulates correlated defaults to return expected loss, VaR, expected shortfall and the loss distribution. MFI only.', manual_parameters=_portfolio_risk_params, tags=['MFI'])
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cached_response('mfi_portfolio_risk', per_user=False)
+def mfi_portfolio_risk(request):
+    """GET /api/mfi/portfolio/risk/ — Simulated portfolio loss distribution."""
+    if not _is_microfinance(request.user):
+        return Response({'error': 'Microfinance access required'}, status=status.HTTP_403_FORBIDDEN)
+    from .portfolio_risk_service import DEFAULT_SCENARIOS, DEFAULT_SEED, MAX_SCENARIOS, MAX_SEED, portfolio_risk
+    try:
+        scenarios = int(request.query_params.get('scenarios', DEFAULT_SCENARIOS))
+        seed = int(request.query_params.get('seed', DEFAULT_SEED))
+    except (TypeError, ValueError):
+        return Response({'error': 'scenarios and seed must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= scenarios <= MAX_SCENARIOS:
+        return Response({'error': f'scenarios must be between 1 and {MAX_SCENARIOS}'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 <= seed <= MAX_SEED:
+        return Response({'error': f'seed must be between 0 and {MAX_SEED}'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(portfolio_risk(scenarios=scenarios, seed=seed))
+
+
 # ----- Admin APIs (extended) -----
 
 @swagger_auto_schema(method='get', operation_description='List users. Admin only.', tags=['Admin'])
@@ -687,22 +851,87 @@ def admin_users_list(request):
     return Response({'users': data, 'count': len(data)})
 
 
-@swagger_auto_schema(method='get', operation_description='System stats for admin dashboard.', tags=['Admin'])
+_admin_stats_params = [
+    openapi.Parameter('bucket', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['day', 'week'], description='Trend bucket size (default day)'),
+    openapi.Parameter('days', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Trend window in days (default 30, max 366)'),
+]
+
+
+@swagger_auto_schema(method='get', operation_description='System stats for admin dashboard: role/status counts plus daily or weekly trends (applications, approvals, disbursed amounts, Get Started events).', manual_parameters=_admin_stats_params, tags=['Admin'])
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_stats(request):
-    """GET /api/admin/stats/ — Dashboard statistics."""
+    """
+    GET /api/admin/stats/ — Dashboard statistics. Not in the response cache: trends have their
+    own ADMIN_STATS_CACHE_SECONDS cache, and Get Started events are bulk-inserted without signals.
+    """
     if not _is_admin(request.user):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    from django.db.models import Count
-    farmers = UserProfile.objects.filter(role='farmer').count()
-    mfi = UserProfile.objects.filter(role='microfinance').count()
-    apps_pending = LoanApplication.objects.filter(status='pending').count()
-    apps_approved = LoanApplication.objects.filter(status='approved').count()
-    apps_rejected = LoanApplication.objects.filter(status='rejected').count()
+    from .analytics_service import DEFAULT_DAYS, admin_stats as build_admin_stats
+    bucket = request.query_params.get('bucket', 'day')
+    try:
+        days = int(request.query_params.get('days', DEFAULT_DAYS))
+    except (TypeError, ValueError):
+        days = DEFAULT_DAYS
+    return Response(build_admin_stats(bucket=bucket, days=days))
+
+
+@swagger_auto_schema(method='get', operation_description='Request latency, per-stage timing (db, ml.*, t5.*, translate.*) and query-count metrics of this worker process, plus job queue depth and throughput, in Prometheus text format. Admin only. `?reset=1` clears the histograms after reading.', tags=['Admin'])
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_metrics(request):
+    """GET /api/admin/metrics/ — Prometheus exposition of the in-process request histograms and job queue gauges."""
+    if not _is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    from .job_queue import render_metrics as render_job_metrics
+    from .request_metrics import registry
+    body = registry.render() + render_job_metrics()
+    if request.query_params.get('reset') in ('1', 'true'):
+        registry.reset()
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+_admin_profiles_params = [
+    openapi.Parameter('endpoint', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Only this endpoint (e.g. api_chat)'),
+    openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Max profiles (default 50, max 500)'),
+]
+
+
+@swagger_auto_schema(method='get', operation_description='List stored request profiles (slow or sampled requests), newest first. Admin only. Profiling is enabled with PROFILING_ENABLED=1.', manual_parameters=_admin_profiles_params, tags=['Admin'])
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_profiles_list(request):
+    """GET /api/admin/profiles/ — Profiles in the on-disk ring buffer."""
+    if not _is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    from .profiling import get_store
+    try:
+        limit = min(int(request.query_params.get('limit', 50)), 500)
+    except (TypeError, ValueError):
+        limit = 50
+    profiles = get_store().list(request.query_params.get('endpoint') or None)
     return Response({
-        'users': {'farmers': farmers, 'microfinance': mfi},
-        'applications': {'pending': apps_pending, 'approved': apps_approved, 'rejected': apps_rejected},
+        'enabled': getattr(settings, 'PROFILING_ENABLED', False),
+        'profiles': profiles[:limit],
+        'count': len(profiles),
     })
 
 
+@swagger_auto_schema(method='get', operation_description='Download one stored profile: collapsed stacks (.folded, for flamegraph.pl or speedscope) or a pstats dump (.prof). Admin only.', tags=['Admin'])
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_profile_download(request, endpoint, profile_id):
+    """GET /api/admin/profiles/<endpoint>/<profile_id>/ — Profile file as an attachment."""
+    if not _is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    from .profiling import get_store
+    path = get_store().path(endpoint, profile_id)
+    if path is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    collapsed = path.endswith('.folded')
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=f"{endpoint}-{profile_id}{'.folded' if collapsed else '.prof'}",
+        content_type='text/plain; charset=utf-8' if collapsed else 'application/octet-stream',
+    )
@@ -0,0 +1,138 @@
+"""
+Database configuration driven by environment variables.
+
+DJANGO_DB_PROFILE selects the backend:
+- ``sqlite`` (default): SQLite with WAL journal, busy_timeout and synchronous
+  pragmas applied on every new connection, plus persistent connections.
+- ``sqlite-legacy``: the original SQLite setup (default journal, no persistent
+  connections). Kept for comparison in ``manage.py loadtestsubmit``.
+- ``postgres``: PostgreSQL with Django's psycopg 3 connection pool
+  (``OPTIONS['pool']``, Django 5.1+). On older Django the profile refuses to
+  load unless DJANGO_DB_POOL=0 explicitly accepts unpooled persistent
+  connections (one per worker thread); use ``pgbouncer`` instead.
+- ``pgbouncer``: PostgreSQL through PgBouncer in transaction pooling mode
+  (default port 6432). Server-side cursors are disabled because a pooled
+  server connection does not keep a cursor between transactions.
+
+Common variables:
+  DJANGO_DB_CONN_MAX_AGE      seconds to keep connections open (default 60)
+SQLite:
+  DJANGO_DB_NAME              database file (default backend/db.sqlite3)
+  DJANGO_SQLITE_BUSY_TIMEOUT  ms to wait on a locked database (default 5000)
+  DJANGO_SQLITE_SYNCHRONOUS   OFF | NORMAL | FULL (default NORMAL, safe with WAL)
+PostgreSQL (postgres and pgbouncer):
+  DJANGO_DB_NAME, DJANGO_DB_USER, DJANGO_DB_PASSWORD, DJANGO_DB_HOST, DJANGO_DB_PORT
+  DJANGO_DB_POOL              1 = psycopg pool, 0 = unpooled (postgres only; default 1)
+  DJANGO_DB_POOL_MIN_SIZE     connections kept open per process (default 2)
+  DJANGO_DB_POOL_MAX_SIZE     connections per process at most (default 10)
+  DJANGO_DB_POOL_TIMEOUT      seconds to wait for a free connection (default 10)
+"""
+import os
+
+import django
+from django.core.exceptions import ImproperlyConfigured
+
+PROFILES = ('sqlite', 'sqlite-legacy', 'postgres', 'pgbouncer')
+DEFAULT_PROFILE = 'sqlite'
+
+SQLITE_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def current_profile():
+    profile = os.environ.get('DJANGO_DB_PROFILE', DEFAULT_PROFILE).strip().lower()
+    if profile not in PROFILES:
+        raise ValueError(f"DJANGO_DB_PROFILE must be one of {', '.join(PROFILES)}; got {profile!r}")
+    return profile
+
+
+def _int_env(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _sqlite_config(base_dir, tuned):
+    name = os.environ.get('DJANGO_DB_NAME') or str(base_dir / 'db.sqlite3')
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': _int_env('DJANGO_DB_CONN_MAX_AGE', 60) if tuned else 0,
+        'OPTIONS': {
+            # Seconds the sqlite3 driver waits for a lock before raising "database is locked"
+            'timeout': _int_env('DJANGO_SQLITE_BUSY_TIMEOUT', 5000) / 1000 if tuned else 5,
+        },
+    }
+    if tuned:
+        synchronous = os.environ.get('DJANGO_SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+        if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+            synchronous = 'NORMAL'
+        # Consumed by apply_sqlite_pragmas(); not passed to the driver
+        config['PRAGMAS'] = {
+            'journal_mode': 'WAL',
+            'busy_timeout': _int_env('DJANGO_SQLITE_BUSY_TIMEOUT', 5000),
+            'synchronous': synchronous,
+        }
+    return config
+
+
+def _postgres_config(port):
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DJANGO_DB_NAME', 'agrifinconnect'),
+        'USER': os.environ.get('DJANGO_DB_USER', 'agrifinconnect'),
+        'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', ''),
+        'HOST': os.environ.get('DJANGO_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DJANGO_DB_PORT', port),
+        'CONN_MAX_AGE': _int_env('DJANGO_DB_CONN_MAX_AGE', 60),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+
+
+def _pooled_postgres_config():
+    config = _postgres_config('5432')
+    if os.environ.get('DJANGO_DB_POOL', '1') == '0':
+        return config
+    if django.VERSION < (5, 1):
+        raise ImproperlyConfigured(
+            f"DJANGO_DB_PROFILE=postgres pools connections with psycopg_pool, which needs Django 5.1+ "
+            f"(installed: {django.get_version()}). Use DJANGO_DB_PROFILE=pgbouncer, or set "
+            f"DJANGO_DB_POOL=0 to run with unpooled persistent connections."
+        )
+    # Requires psycopg 3 with the pool extra (pip install "psycopg[binary,pool]").
+    # The pool owns connection reuse: Django rejects persistent connections alongside it.
+    config['CONN_MAX_AGE'] = 0
+    config['OPTIONS']['pool'] = {
+        'min_size': _int_env('DJANGO_DB_POOL_MIN_SIZE', 2),
+        'max_size': _int_env('DJANGO_DB_POOL_MAX_SIZE', 10),
+        'timeout': _int_env('DJANGO_DB_POOL_TIMEOUT', 10),
+    }
+    return config
+
+
+def _pgbouncer_config():
+    config = _postgres_config('6432')
+    # Transaction pooling hands each transaction to any server connection, so a named cursor
+    # opened for .iterator() may not exist on the next fetch.
+    config['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return config
+
+
+def database_config(base_dir):
+    """Return the DATABASES['default'] dict for the active profile."""
+    profile = current_profile()
+    if profile == 'postgres':
+        return _pooled_postgres_config()
+    if profile == 'pgbouncer':
+        return _pgbouncer_config()
+    return _sqlite_config(base_dir, tuned=(profile == 'sqlite'))
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """connection_created handler: apply PRAGMAS from the SQLite profile to each new connection."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS') or {}
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
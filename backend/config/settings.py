@@ -4,6 +4,10 @@ Django settings for AgriFinConnect Rwanda backend.
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
+from .database import database_config
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 # Project root (AgriFinConnect-Rwanda) for loading ML models
 PROJECT_ROOT = BASE_DIR.parent
@@ -28,12 +32,18 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # Token auth with joined user/profile/role lookup and a short-TTL cache; sets request.role
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
 }
+# Seconds a resolved token identity stays cached per process (invalidated on role change/token delete)
+AUTH_CACHE_TTL_SECONDS = int(os.environ.get('AUTH_CACHE_TTL_SECONDS', '30'))
 
 MIDDLEWARE = [
+    # Outermost, so its total covers every other middleware
+    'api.middleware.RequestTimingMiddleware',
+    'api.middleware.RequestProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -63,11 +73,9 @@ TEMPLATES = [
 ROOT_URLCONF = 'config.urls'
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Database profile from env (DJANGO_DB_PROFILE=sqlite|sqlite-legacy|postgres|pgbouncer); see config/database.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
 }
 
 LANGUAGE_CODE = 'en-us'
@@ -88,9 +96,176 @@ CORS_ALLOW_CREDENTIALS = True
 
 # ML models path (saved .pkl from notebook)
 MODELS_DIR = PROJECT_ROOT / 'loan_default_risk_model'
+# ML payload validation: 'warn' (impute invalid values and report them) or 'reject' (400)
+ML_VALIDATION_MODE = os.environ.get('ML_VALIDATION_MODE', 'warn')
 
 # Email (for password reset). Console backend prints to terminal in dev.
 EMAIL_BACKEND = os.environ.get('DJANGO_EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
 DEFAULT_FROM_EMAIL = os.environ.get('DJANGO_FROM_EMAIL', 'noreply@agrifinconnect.rw')
 # Frontend URL for reset links (set in production)
 PASSWORD_RESET_FRONTEND_URL = os.environ.get('PASSWORD_RESET_FRONTEND_URL', 'http://localhost:3000')
+
+# Get Started activity ingestion: buffered in-process and bulk-inserted by a background thread
+ACTIVITY_LOG_BUFFERED = os.environ.get('ACTIVITY_LOG_BUFFERED', '1') == '1'
+ACTIVITY_LOG_MAX_QUEUE = int(os.environ.get('ACTIVITY_LOG_MAX_QUEUE', '10000'))
+ACTIVITY_LOG_BATCH_SIZE = int(os.environ.get('ACTIVITY_LOG_BATCH_SIZE', '200'))
+ACTIVITY_LOG_FLUSH_SECONDS = float(os.environ.get('ACTIVITY_LOG_FLUSH_SECONDS', '2'))
+
+# Chat interaction logging: batched background writes, pruned by `manage.py prunechatinteractions`
+CHAT_LOG_ENABLED = os.environ.get('CHAT_LOG_ENABLED', '1') == '1'
+CHAT_LOG_MAX_QUEUE = int(os.environ.get('CHAT_LOG_MAX_QUEUE', '5000'))
+CHAT_LOG_BATCH_SIZE = int(os.environ.get('CHAT_LOG_BATCH_SIZE', '100'))
+CHAT_LOG_FLUSH_SECONDS = float(os.environ.get('CHAT_LOG_FLUSH_SECONDS', '5'))
+CHAT_LOG_RETENTION_DAYS = int(os.environ.get('CHAT_LOG_RETENTION_DAYS', '90'))
+
+# Chat decoding (api/chatbot_service.py): profile per language ("en:beam,fr:greedy"), token cap and
+# per-request wall-clock budget. Past CHAT_DEGRADE_LOAD of the chat admission pool's concurrency,
+# the chat view drops to the next cheaper profile (beam -> greedy -> short); 'short' when full.
+CHAT_DECODING_PROFILE = os.environ.get('CHAT_DECODING_PROFILE', 'greedy')
+CHAT_DECODING_BY_LANGUAGE = dict(
+    item.split(':', 1) for item in os.environ.get('CHAT_DECODING_BY_LANGUAGE', '').split(',') if ':' in item
+)
+CHAT_MAX_NEW_TOKENS = int(os.environ.get('CHAT_MAX_NEW_TOKENS', '128'))
+CHAT_TIME_BUDGET_MS = float(os.environ.get('CHAT_TIME_BUDGET_MS', '8000'))
+CHAT_TRANSLATION_RESERVE_MS = float(os.environ.get('CHAT_TRANSLATION_RESERVE_MS', '1500'))
+CHAT_DEGRADE_LOAD = float(os.environ.get('CHAT_DEGRADE_LOAD', '0.75'))
+CHAT_TOKEN_SECONDS_ESTIMATE = float(os.environ.get('CHAT_TOKEN_SECONDS_ESTIMATE', '0.02'))
+CHAT_REPLY_CACHE_SIZE = int(os.environ.get('CHAT_REPLY_CACHE_SIZE', '1024'))
+# CHAT_GENERATION_MODE=xla runs T5 generation as XLA-compiled graphs, one per input-length bucket
+# and token bucket; the WSGI/ASGI app compiles them in the background at startup (CHAT_XLA_WARMUP).
+CHAT_GENERATION_MODE = os.environ.get('CHAT_GENERATION_MODE', 'eager')
+CHAT_INPUT_BUCKETS = tuple(int(b) for b in os.environ.get('CHAT_INPUT_BUCKETS', '32,64,128,256').split(','))
+CHAT_XLA_TOKEN_BUCKETS = tuple(int(b) for b in os.environ.get('CHAT_XLA_TOKEN_BUCKETS', '16,48,128').split(','))
+CHAT_XLA_WARMUP = os.environ.get('CHAT_XLA_WARMUP', '1') == '1'
+# Tokenization layer (api/tokenization.py): memoized token ids per input text, and length buckets
+# for grouping and padding model inputs (the chatbot uses CHAT_INPUT_BUCKETS, translation these)
+TOKENIZER_CACHE_SIZE = int(os.environ.get('TOKENIZER_CACHE_SIZE', '4096'))
+TOKENIZER_BUCKETS = tuple(int(b) for b in os.environ.get('TOKENIZER_BUCKETS', '16,32,64,128,256,512').split(','))
+# Encoder outputs of recent chatbot/translation inputs (api/encoder_cache.py), shared LRU bounded
+# by tensor size; reused when a message is retried or decoded with another profile. 0 disables.
+ENCODER_CACHE_MAX_MB = float(os.environ.get('ENCODER_CACHE_MAX_MB', '64'))
+
+# Loan applications are scored in the background: submit saves them as 'scoring' and enqueues a
+# job (api/job_queue.py) that `manage.py runjobs` picks up in batches. SCORING_ASYNC=0 scores inline.
+SCORING_ASYNC = os.environ.get('SCORING_ASYNC', '1') == '1'
+JOB_BATCH_SIZE = int(os.environ.get('JOB_BATCH_SIZE', '100'))
+# A claimed job that is not finished within this time is handed to another worker
+JOB_VISIBILITY_TIMEOUT_SECONDS = int(os.environ.get('JOB_VISIBILITY_TIMEOUT_SECONDS', '300'))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', '1'))
+# Failed jobs are retried after JOB_RETRY_BASE_SECONDS * 2^(attempt-1) (capped at 10 min)
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', '5'))
+# Finished jobs are deleted by the worker after this many hours; failed jobs are kept
+JOB_RETENTION_HOURS = int(os.environ.get('JOB_RETENTION_HOURS', '24'))
+
+# Portfolio risk simulation (GET /api/mfi/portfolio/risk/); the risk-score -> PD calibration table
+# lives in api/portfolio_risk_service.py and can be overridden with PORTFOLIO_RISK_CALIBRATION.
+PORTFOLIO_RISK_LGD = float(os.environ.get('PORTFOLIO_RISK_LGD', '0.45'))
+PORTFOLIO_RISK_PD_VOLATILITY = float(os.environ.get('PORTFOLIO_RISK_PD_VOLATILITY', '0.6'))
+PORTFOLIO_RISK_SCENARIOS = int(os.environ.get('PORTFOLIO_RISK_SCENARIOS', '10000'))
+PORTFOLIO_RISK_MAX_SCENARIOS = int(os.environ.get('PORTFOLIO_RISK_MAX_SCENARIOS', '50000'))
+
+# Admission control for chat and ML scoring (api/admission.py): token buckets per client IP
+# (anonymous) or per user, and a concurrency cap per pool whose last `reserved` slots are kept
+# for authenticated farmers. Farmers wait up to ADMISSION_PRIORITY_WAIT_MS for a slot; others
+# get 503 at once. All limits are per worker process.
+ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', '1') == '1'
+ADMISSION_PRIORITY_WAIT_MS = float(os.environ.get('ADMISSION_PRIORITY_WAIT_MS', '500'))
+ADMISSION_MAX_CLIENTS = int(os.environ.get('ADMISSION_MAX_CLIENTS', '50000'))
+ADMISSION_POOLS = {
+    'chat': {
+        'concurrency': int(os.environ.get('ADMISSION_CHAT_CONCURRENCY', '2')),
+        'reserved': int(os.environ.get('ADMISSION_CHAT_RESERVED', '1')),
+        'anon_per_min': float(os.environ.get('ADMISSION_CHAT_ANON_PER_MIN', '6')),
+        'anon_burst': int(os.environ.get('ADMISSION_CHAT_ANON_BURST', '3')),
+        'user_per_min': float(os.environ.get('ADMISSION_CHAT_USER_PER_MIN', '20')),
+        'user_burst': int(os.environ.get('ADMISSION_CHAT_USER_BURST', '5')),
+    },
+    'scoring': {
+        'concurrency': int(os.environ.get('ADMISSION_SCORING_CONCURRENCY', '8')),
+        'reserved': int(os.environ.get('ADMISSION_SCORING_RESERVED', '2')),
+        'anon_per_min': float(os.environ.get('ADMISSION_SCORING_ANON_PER_MIN', '60')),
+        'anon_burst': int(os.environ.get('ADMISSION_SCORING_ANON_BURST', '20')),
+        'user_per_min': float(os.environ.get('ADMISSION_SCORING_USER_PER_MIN', '240')),
+        'user_burst': int(os.environ.get('ADMISSION_SCORING_USER_BURST', '40')),
+    },
+}
+# Reverse proxies in front of Django: client IP = the X-Forwarded-For entry added by the
+# outermost trusted proxy. 0 (default) = use REMOTE_ADDR and ignore X-Forwarded-For.
+NUM_PROXIES = int(os.environ.get('NUM_PROXIES', '0'))
+
+# Per-request timings (api/request_metrics.py): Server-Timing header, JSON log lines on the
+# `api.perf` logger and histograms at GET /api/admin/metrics/ (Prometheus text format).
+# Only requests slower than PERF_SLOW_REQUEST_MS are logged unless PERF_LOG_LEVEL=INFO.
+PERF_METRICS_ENABLED = os.environ.get('PERF_METRICS_ENABLED', '1') == '1'
+PERF_SERVER_TIMING = os.environ.get('PERF_SERVER_TIMING', '1') == '1'
+PERF_LOG_REQUESTS = os.environ.get('PERF_LOG_REQUESTS', '1') == '1'
+PERF_SLOW_REQUEST_MS = float(os.environ.get('PERF_SLOW_REQUEST_MS', '1000'))
+
+# Opt-in request profiling (api/profiling.py): captures requests picked by PROFILE_SAMPLE_RATE
+# and every request slower than PROFILE_SLOW_MS (0 = off) into a per-endpoint ring buffer
+# of PROFILE_MAX_PER_ENDPOINT files under PROFILE_DIR; listed at GET /api/admin/profiles/.
+# PROFILE_PATHS limits profiling to comma-separated path prefixes.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'sample')  # 'sample' (collapsed stacks) or 'cprofile'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', '2000'))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))
+PROFILE_PATHS = [p for p in os.environ.get('PROFILE_PATHS', '').split(',') if p]
+PROFILE_DIR = os.environ.get('PROFILE_DIR', str(BASE_DIR / '.cache' / 'profiles'))
+PROFILE_MAX_PER_ENDPOINT = int(os.environ.get('PROFILE_MAX_PER_ENDPOINT', '20'))
+
+# `manage.py checkimporttime`: cold-start import budget for `manage.py check`, in ms
+IMPORT_TIME_BUDGET_MS = float(os.environ.get('IMPORT_TIME_BUDGET_MS', '500'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.perf': {
+            'handlers': ['console'],
+            'level': os.environ.get('PERF_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Caches. `responses` holds dashboard API responses (api/response_cache.py). It must be shared by
+# every process that writes loans: gunicorn workers, the runjobs worker and management commands
+# invalidate it, and a per-process cache (LocMem) would keep serving stale dashboards elsewhere.
+# `file` (default) suits one host; `db` uses a table in the main database (run
+# `manage.py createcachetable` once) and works across hosts.
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+RESPONSE_CACHE_SECONDS = int(os.environ.get('RESPONSE_CACHE_SECONDS', '300'))
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'file')
+if RESPONSE_CACHE_BACKEND == 'file':
+    _responses_cache = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('RESPONSE_CACHE_DIR', str(BASE_DIR / '.cache' / 'responses')),
+    }
+elif RESPONSE_CACHE_BACKEND == 'db':
+    _responses_cache = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'api_response_cache',
+    }
+elif not RESPONSE_CACHE_ENABLED:
+    _responses_cache = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'agrifin-responses',
+    }
+else:
+    raise ImproperlyConfigured(
+        f"RESPONSE_CACHE_BACKEND must be 'file' or 'db' (got {RESPONSE_CACHE_BACKEND!r}); the response cache "
+        f"needs a backend shared between processes. Set RESPONSE_CACHE_ENABLED=0 to run without it."
+    )
+_responses_cache['OPTIONS'] = {'MAX_ENTRIES': int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '10000'))}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'agrifin-default',
+    },
+    'responses': {**_responses_cache, 'TIMEOUT': RESPONSE_CACHE_SECONDS},
+}
@@ -1,30 +1,56 @@
 """
 URL configuration for AgriFinConnect Rwanda backend.
+
+The Swagger/ReDoc schema view is built on the first request to /swagger/, /redoc/
+or /swagger.json: drf_yasg.views pulls in its renderers and the spec validator
+(jsonschema), which would otherwise add ~90 ms to every process start.
 """
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title='AgriFinConnect Rwanda API',
-        default_version='v1',
-        description=(
-            'Backend API: auth (register/login), ML models (eligibility, risk, recommend-amount), and chatbot. '
-            'Admin users are created in the backend; use login only for admin.'
+
+_schema_views = {}
+
+
+def _build_schema_view():
+    from drf_yasg import openapi
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    return get_schema_view(
+        openapi.Info(
+            title='AgriFinConnect Rwanda API',
+            default_version='v1',
+            description=(
+                'Backend API: auth (register/login), ML models (eligibility, risk, recommend-amount), and chatbot. '
+                'Admin users are created in the backend; use login only for admin.'
+            ),
         ),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-    urlconf='config.urls',
-)
+        public=True,
+        permission_classes=[permissions.AllowAny],
+        urlconf='config.urls',
+    )
+
+
+def _schema(renderer=None):
+    """View that builds the drf_yasg view for `renderer` ('swagger', 'redoc', or None for JSON) on first use."""
+    def view(request, *args, **kwargs):
+        if renderer not in _schema_views:
+            if 'schema_view' not in _schema_views:
+                _schema_views['schema_view'] = _build_schema_view()
+            schema_view = _schema_views['schema_view']
+            if renderer is None:
+                _schema_views[renderer] = schema_view.without_ui(cache_timeout=0)
+            else:
+                _schema_views[renderer] = schema_view.with_ui(renderer, cache_timeout=0)
+        return _schema_views[renderer](request, *args, **kwargs)
+    view.csrf_exempt = True
+    return view
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-    path('swagger.json', schema_view.without_ui(cache_timeout=0), name='schema-json'),
+    path('swagger/', _schema('swagger'), name='schema-swagger-ui'),
+    path('redoc/', _schema('redoc'), name='schema-redoc'),
+    path('swagger.json', _schema(), name='schema-json'),
 ]
@@ -6,3 +6,8 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 application = get_wsgi_application()
+
+# Compile the chatbot's XLA generation graphs in the background (no-op unless CHAT_GENERATION_MODE=xla)
+from api.chatbot_service import start_warmup  # noqa: E402
+
+start_warmup()